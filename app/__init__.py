@@ -1,32 +1,70 @@
+import os
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
 from flask import Flask
 
 db = SQLAlchemy()
+# Schema migrations, applied with `flask --app run db upgrade`
+migrate = Migrate()
 
 
 def create_app():
     # Set up the Flask app with a custom template folder
     app = Flask(__name__, template_folder="views")
 
+    # Stream uploaded files to disk, hashing them as they are written
+    from app.middleware.UploadStore import UploadRequest
+
+    app.request_class = UploadRequest
+
     # Set upload folder for file uploads
     app.config["UPLOAD_FOLDER"] = "upload_folder"
 
     # Load configuration from config.py
     app.config.from_object("config.Config")
 
+    # Engine profile: pool limits, SQLite busy timeout (options set in the
+    # config take precedence)
+    from app.middleware.DatabaseEngine import configure_engine, engine_options
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **engine_options(app.config),
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
+
     # Initialize extensions
     db.init_app(app)
+    # Batch mode lets migrations alter SQLite tables (by copying them)
+    migrate.init_app(
+        app,
+        db,
+        directory=os.path.join(os.path.dirname(app.root_path), "migrations"),
+        render_as_batch=True,
+    )
 
     # Import routes and models AFTER initializing the app and extensions
     from app.controllers import register_routes  # Import controllers
-    from app.models import UserModel  # Import your models here
+    from app.models import UserModel, DataModel, JobModel, RegistryModel, DataVersionModel, UploadSessionModel  # Import your models here
 
-    # Create database tables
+    # SQLite WAL mode and PRAGMAs, set on every new connection. The schema
+    # is not created here: it is a deployment step (`flask db upgrade`), so
+    # starting a worker never touches it
     with app.app_context():
-        db.create_all()
-        print("Database tables created successfully.")
+        configure_engine(db.engine, app.config)
 
     # Register routes
     register_routes(app)
 
+    # A local job queue starts with the first request, resuming the jobs
+    # a restart interrupted
+    if app.config["JOB_RUNNER"] == "local":
+        from app.middleware.JobQueue import start_job_queue
+
+        app.before_request(start_job_queue)
+
+    # Register CLI commands
+    from app.commands import register_commands
+
+    register_commands(app)
+
     return app
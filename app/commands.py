@@ -0,0 +1,69 @@
+import click
+from flask import current_app
+
+
+# Function to register CLI commands (run with `flask --app run <command>`)
+def register_commands(app):
+    @app.cli.group("jobs")
+    def jobs():
+        """Run background jobs."""
+
+    @jobs.command("worker")
+    @click.option("--drain", is_flag=True, help="Exit once no job is queued or running.")
+    @click.option(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Port of the worker's /metrics (default: JOB_WORKER_METRICS_PORT; 0 disables).",
+    )
+    def worker(drain, metrics_port):
+        """
+        Run queued jobs on a pool of JOB_WORKERS processes.
+
+        Run exactly one worker per deployment (with JOB_RUNNER=worker): it
+        queues the jobs it finds running again, as they were interrupted.
+        The metrics of the jobs are served on the worker's own /metrics, as
+        the web processes never see them.
+        """
+        from app.middleware.JobQueue import run_worker
+        from app.middleware.Metrics import serve_metrics
+
+        if metrics_port is None:
+            metrics_port = current_app.config["JOB_WORKER_METRICS_PORT"]
+        if metrics_port:
+            server = serve_metrics(metrics_port)
+            click.echo(
+                f"Serving job metrics on port {server.server_port} at /metrics", err=True
+            )
+
+        run_worker(
+            current_app._get_current_object(),
+            drain=drain,
+            on_requeue=lambda count: click.echo(
+                f"Requeued {count} interrupted job(s)", err=True
+            ),
+        )
+
+    @app.cli.command("score")
+    @click.argument("model_id", type=int)
+    @click.argument("input_path", type=click.Path(exists=True, dir_okay=False))
+    @click.argument("output_path", type=click.Path(dir_okay=False))
+    @click.option("--chunk-size", type=int, default=None, help="Rows scored per chunk.")
+    def score(model_id, input_path, output_path, chunk_size):
+        """Score a customer CSV with a model from the registry."""
+        from app.middleware.BatchScorer import BatchScorer
+        from app.models.RegistryModel import RegistryModel
+
+        entry = RegistryModel.find_by_id(model_id)
+        if entry is None:
+            raise click.ClickException(f"Model {model_id} not found")
+
+        scorer = BatchScorer.from_registry(
+            entry, chunk_size=chunk_size or current_app.config["SCORE_CHUNK_SIZE"]
+        )
+        summary = scorer.score_file(
+            input_path,
+            output_path,
+            on_chunk=lambda rows: click.echo(f"Scored {rows} rows", err=True),
+        )
+        click.echo(f"Wrote {summary['rows']} scores to {summary['output_path']}")
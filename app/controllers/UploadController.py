@@ -1,69 +1,361 @@
-import io
-import base64
-from flask import jsonify
-import pandas as pd  # To get the data
-from app.middleware import TrainModel
+import time
+from app.middleware import TrainModel, ModelBackends
+from app.middleware.DataLoader import DataLoader, MultiPartLoader
+from app.middleware.FeatureStore import make_feature_key
+from app.middleware.Metrics import record_cache
+from app.middleware.ModelRegistry import hash_file, make_cache_key, version_hash
+from app.middleware.UploadStore import is_supported
 
 
 class FileProcessor:
-    def __init__(self, file_path: str, target_column: str):
-        self.UploadFile(file_path, target_column)
+    """
+    Churn pipeline for a single uploaded file.
+
+    Every stage (load, preprocess, fit, score, render) runs exactly once and
+    keeps its output on the instance, so later stages reuse it instead of
+    recomputing it. The wall time of each stage is recorded in ``timings``.
+    An optional ``on_stage(stage, progress)`` callback is invoked before each
+    stage starts, e.g. to report progress of a background job.
+
+    With a ``registry`` the fitted model is looked up by dataset content,
+    target column and hyperparameters; a hit skips training entirely.
+    With ``feature_columns`` only those columns and the target are read.
+    ``backend`` selects the classifier family, see ModelBackends, and
+    ``mode="quick"`` trains on a sample sized to ``time_budget`` seconds.
+    Charts are not drawn by the pipeline: their inputs are stored in a
+    ``chart_cache`` under ``run_id`` and rendered when requested.
+
+    For a dataset with appended delta files, ``deltas`` lists the
+    ``(content_hash, loader)`` of each delta, oldest first. With
+    ``incremental`` the newest registered model of an earlier version is
+    updated with the later deltas only, instead of training on everything.
+    A ``content_hash`` recorded at upload spares hashing the file again.
+
+    With a ``feature_store`` the preprocessed feature matrix of a full fit
+    is stored once per dataset version and preprocessing configuration;
+    later runs map it (shared with every other process) and read only the
+    target column of the file, instead of loading and encoding it again.
+
+    ``evaluation="cross_validation"`` adds a stratified ``cv_folds``-fold
+    cross-validation of the backend to the score stage; every fold fits its
+    own preprocessing, so the whole file is read even with stored features.
+
+    With a ``result_store`` the metrics, chart kinds and test-set
+    predictions are stored under ``run_id`` once the run finishes, so the
+    result can be viewed again without training (see ResultStore).
+    """
+
+    # Pipeline stages, in execution order
+    STAGES = ("load", "preprocess", "fit", "score", "render")
+
+    def __init__(
+        self,
+        file_path: str,
+        target_column: str,
+        on_stage=None,
+        registry=None,
+        data_id=None,
+        data_loader=None,
+        feature_columns=None,
+        n_jobs=1,
+        backend=ModelBackends.DEFAULT_BACKEND,
+        run_id=None,
+        chart_cache=None,
+        mode="full",
+        time_budget=5.0,
+        deltas=(),
+        incremental=False,
+        content_hash=None,
+        feature_store=None,
+        evaluation="holdout",
+        cv_folds=TrainModel.ChurnModel.CV_FOLDS,
+        result_store=None,
+    ):
+        self.file_path = file_path
+        self.target_column = target_column
+        self.on_stage = on_stage
+        self.registry = registry
+        self.data_id = data_id
+        # Reader of the file, e.g. one that prefers its columnar copy
+        self.data_loader = data_loader or DataLoader(file_path)
+        self.feature_columns = feature_columns
+        self.n_jobs = n_jobs  # CPUs used for training and scoring
+        self.backend = backend
+        self.mode = mode
+        self.time_budget = time_budget
+        self.run_id = run_id  # ID of this run, e.g. the churn job id
+        self.chart_cache = chart_cache
+        self.deltas = list(deltas)
+        self.incremental = incremental
+        # SHA-256 of the upload when already known (saves hashing the file)
+        self.upload_hash = content_hash
+        self.feature_store = feature_store
+        self.evaluation = evaluation
+        self.cv_folds = cv_folds
+        self.result_store = result_store
+
+        # Intermediate results of each stage
+        self.data = None
+        self.load_report = {}
+        self.churn_model = None
+        self.predictions = None
+        self.accuracy = None
+        self.cross_validation = None
+        self.chart_data = {}
+        self.charts = []  # Kinds of the charts stored for this run
+        self.timings = {}
+
+        # Model registry state
+        self.content_hash = None
+        self.cache_key = None
+        self.registry_entry = None
+        self.cache_hit = False
+        self.base_entry = None  # Model of an earlier version being updated
+        self.update_deltas = []  # Deltas the update trains on
+
+        # Feature store state
+        self.feature_key = None
+        self.features = None  # StoredFeatures the model trains on
+        self.features_hit = False
 
     @staticmethod
     def UploadFile(file_path, target_column):
         """
-        Handles the uploaded file path and processes it based on file type.
+        Handles the uploaded file path and runs the churn pipeline on it.
         """
-        if file_path.endswith(".csv") or file_path.endswith(".xlsx"):
-            return FileProcessor.Churn(file_path, target_column)
-        else:
-            return "File type not supported"
+        return FileProcessor(file_path, target_column).run()
 
     @staticmethod
-    def Churn(file_path, target_column):
-        try:
-            data = (
-                pd.read_csv(file_path)
-                if file_path.endswith(".csv")
-                else pd.read_excel(file_path)
+    def is_supported(file_path):
+        """Whether the pipeline can read the given file type."""
+        return is_supported(file_path)
+
+    def run(self):
+        """Run every pipeline stage once and return the JSON-serializable result."""
+        if not FileProcessor.is_supported(self.file_path):
+            raise ValueError("File type not supported")
+
+        for index, stage in enumerate(self.STAGES):
+            if self.on_stage is not None:
+                self.on_stage(stage, index / len(self.STAGES))
+            self.run_stage(stage)
+        result = self.result()
+        if self.result_store is not None and self.run_id is not None:
+            self.store_result(result)
+        return result
+
+    def run_stage(self, stage):
+        """Run a single stage and record how long it took (in seconds)."""
+        start = time.perf_counter()
+        getattr(self, stage)()
+        self.timings[stage] = round(time.perf_counter() - start, 4)
+
+    def load(self):
+        """
+        Look up a cached model and read the rows to train on into a compact DataFrame.
+
+        That is the whole dataset, or for an incremental update only the
+        delta files the base model has not seen.
+        """
+        columns = None
+        if self.feature_columns:
+            # Column projection: read only the features and the target
+            columns = list(dict.fromkeys(self.feature_columns + [self.target_column]))
+
+        if self.registry is not None or self.feature_store is not None:
+            upload_hash = self.upload_hash or hash_file(self.file_path)
+            delta_hashes = [content_hash for content_hash, _ in self.deltas]
+            self.content_hash = version_hash(upload_hash, delta_hashes)
+
+        if self.registry is not None:
+            self.cache_key = self.make_key(self.content_hash, columns)
+            self.registry_entry = self.registry.lookup(self.cache_key, self.data_id)
+            self.cache_hit = self.registry_entry is not None
+            record_cache("model", self.cache_hit)
+
+            if (
+                not self.cache_hit
+                and self.incremental
+                and ModelBackends.get_backend(self.backend).supports_update
+            ):
+                # Newest earlier version with a model; newer deltas are pending
+                for applied in range(len(self.deltas) - 1, -1, -1):
+                    key = self.make_key(
+                        version_hash(upload_hash, delta_hashes[:applied]), columns
+                    )
+                    self.base_entry = self.registry.lookup(key)
+                    if self.base_entry is not None:
+                        self.update_deltas = self.deltas[applied:]
+                        break
+
+        # Quick fits train on a timing-dependent sample, updates on new rows only
+        if (
+            self.feature_store is not None
+            and self.mode == "full"
+            and self.base_entry is None
+        ):
+            self.feature_key = make_feature_key(
+                self.content_hash,
+                self.target_column,
+                TrainModel.ChurnModel.preprocessing_for(self.backend),
+                columns=columns,
             )
-        except Exception as e:
-            return f"Error loading file: {str(e)}"
-
-        try:
-            churn_model = TrainModel.ChurnModel(data, target_column)
-            churn_model.preprocess_data()
-            churn_model.train_model()
-            churn_model.predict()
-            accuracy = churn_model.evaluate_model()
-
-            # Generate charts
-            pie_chart = churn_model.generate_pie_chart()
-            feature_importance = churn_model.generate_feature_importance_chart()
-            histogram = churn_model.generate_histogram()
-
-            # If charts are images, convert them to base64
-            pie_chart_base64 = FileProcessor.to_base64(pie_chart)
-            feature_importance_base64 = FileProcessor.to_base64(feature_importance)
-            histogram_base64 = FileProcessor.to_base64(histogram)
-
-            # Return a JSON-serializable dictionary
-            return {
-                "accuracy": accuracy,
-                "pie_chart": pie_chart_base64,
-                "feature_importance": feature_importance_base64,
-                "histogram": histogram_base64,
-            }
-
-        except Exception as e:
-            return f"Error in churn prediction: {str(e)}"
+            self.features = self.feature_store.open(self.feature_key)
+            self.features_hit = self.features is not None
+            # The features replace the file; the target feeds the charts.
+            # Cross-validation refits the preprocessing per fold, on raw rows
+            if self.features_hit and self.evaluation != "cross_validation":
+                columns = [self.target_column]
 
-    @staticmethod
-    def to_base64(image):
-        """Convert an image to a base64-encoded string."""
-        if isinstance(image, bytes):
-            return base64.b64encode(image).decode("utf-8")
-        elif isinstance(image, str):
-            return image  # Assume the image is already base64 encoded
+        data_loader = self.data_loader
+        if self.base_entry is not None:
+            data_loader = MultiPartLoader([loader for _, loader in self.update_deltas])
+        self.data = data_loader.load(columns=columns)
+        self.load_report = data_loader.report
+
+    def make_key(self, content_hash, columns):
+        """Registry cache key of a model of this pipeline on a dataset version."""
+        return make_cache_key(
+            content_hash,
+            self.target_column,
+            TrainModel.ChurnModel.hyperparams_for(self.backend, self.mode),
+            columns=columns,
+        )
+
+    def preprocess(self):
+        """Encode, scale and split the loaded data."""
+        self.churn_model = TrainModel.ChurnModel(
+            self.data,
+            self.target_column,
+            n_jobs=self.n_jobs,
+            backend=self.backend,
+            mode=self.mode,
+            time_budget=self.time_budget,
+        )
+
+        # A cached model brings its fitted preprocessing and column layout,
+        # and a quick one the size of its sample: the same rows are drawn,
+        # so its test rows are never rows it was trained on
+        if self.cache_hit:
+            self.churn_model.load_artifacts(self.registry_entry.artifact_dir)
+            self.churn_model.sample_rows = self.registry_entry.get_hyperparams().get(
+                "sample_rows"
+            )
+        elif self.base_entry is not None:
+            # Only the new rows are preprocessed, into the base model's layout
+            self.churn_model.load_artifacts(self.base_entry.artifact_dir)
+            self.churn_model.preprocess_update()
+            return
+
+        if self.features_hit:
+            self.churn_model.load_features(self.features)
+            return
+        self.churn_model.preprocess_data()
+        if self.feature_key is not None:
+            # Swap the private matrices for the mapped copy, which other
+            # processes share
+            model = self.churn_model
+            self.features = self.feature_store.save(
+                self.feature_key,
+                model.X_train,
+                model.X_test,
+                model.y_train,
+                model.y_test,
+                model.preprocessor,
+            )
+            model.load_features(self.features)
+
+    def fit(self):
+        """Train the model on the training split, unless it was loaded from the registry."""
+        if self.cache_hit:
+            return
+
+        if self.base_entry is not None:
+            self.churn_model.update_model()
         else:
-            raise ValueError("Image is not in a valid format")
+            self.churn_model.train_model()
+        if self.registry is not None:
+            self.registry_entry = self.registry.register(
+                self.churn_model, self.data_id, self.content_hash, self.cache_key
+            )
+
+    def score(self):
+        """
+        Predict the test split once and evaluate against those predictions,
+        then cross-validate if asked to.
+        """
+        self.predictions = self.churn_model.predict()
+        self.accuracy = self.churn_model.evaluate_model()
+        if self.evaluation == "cross_validation":
+            self.cross_validation = self.churn_model.cross_validate(self.cv_folds)
+
+    def render(self):
+        """
+        Compute the chart inputs; the PNGs are rendered on demand.
+
+        With a ``chart_cache`` the inputs are stored under ``run_id`` and
+        served by the chart endpoints, so no chart is drawn here.
+        """
+        self.chart_data = self.churn_model.chart_data()
+        if self.chart_cache is not None and self.run_id is not None:
+            self.chart_cache.save_data(self.run_id, self.chart_data)
+            self.charts = list(self.chart_data)
+
+    # Fields of result() stored as the metrics of a run
+    METRIC_FIELDS = (
+        "accuracy",
+        "evaluation",
+        "cross_validation",
+        "backend",
+        "mode",
+        "training_rows",
+        "total_rows",
+        "version",
+        "model_id",
+    )
+
+    def store_result(self, result):
+        """Store the metrics, chart kinds and predictions of the run in the result store."""
+        self.result_store.save(
+            self.run_id,
+            metrics={field: result[field] for field in self.METRIC_FIELDS},
+            charts=self.charts,
+            actual=self.churn_model.y_test,
+            predicted=self.predictions,
+            classes=self.churn_model.preprocessor.target_classes,
+        )
+
+    def result(self):
+        """Return a JSON-serializable dictionary of the pipeline output."""
+        return {
+            "accuracy": self.accuracy,
+            "evaluation": self.evaluation,
+            # Out-of-fold metrics of a cross-validated run
+            "cross_validation": self.cross_validation,
+            "run_id": self.run_id,
+            "charts": self.charts,
+            "model_id": self.registry_entry.id if self.registry_entry else None,
+            "cache_hit": self.cache_hit,
+            # Features mapped from the feature store instead of preprocessed
+            "features_hit": self.features_hit,
+            "timings": self.timings,
+            "memory": {
+                "frame_mb": self.load_report.get("frame_mb"),
+                "peak_rss_mb": DataLoader.peak_rss_mb(),
+            },
+            "source": self.load_report.get("source"),
+            "n_jobs": self.n_jobs,
+            "backend": self.backend,
+            "mode": self.mode,
+            # Rows trained and tested on (a sample in quick mode)
+            "training_rows": self.churn_model.training_rows,
+            "total_rows": len(self.data),
+            "version": len(self.deltas) + 1,
+            # Model of an earlier version this run updated with the new rows
+            "updated_model_id": self.base_entry.id if self.base_entry else None,
+            # Columns the preprocessing did not use as features
+            "excluded_columns": {
+                "id": self.churn_model.preprocessor.id_columns,
+                "ignored": self.churn_model.preprocessor.ignored_columns,
+            },
+        }
@@ -58,7 +58,7 @@ class UserController:
     @staticmethod
     def update_user(user_id, name, email, password):
         # get the user from the database
-        user = UserModel.query.get(user_id)
+        user = UserModel.find_by_id(user_id)
         # found the user
         if user:
             # update the user information
@@ -1,9 +1,17 @@
 # This file allows the directory to be treated as a Python package.
 
 from app.routes import main
-from .UploadController import FileProcessor
 from .UserController import UserController
 
+
+# FileProcessor is imported on first access, with the ML stack it needs
+def __getattr__(name):
+    if name == "FileProcessor":
+        from .UploadController import FileProcessor
+
+        return FileProcessor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # Function to register controllers
 
 
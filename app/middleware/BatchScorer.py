@@ -0,0 +1,97 @@
+import os
+from app.middleware.DataLoader import DataLoader
+from app.middleware.TrainModel import ChurnModel
+from app.middleware.ModelBackends import DEFAULT_BACKEND
+
+
+class BatchScorer:
+    """
+    Applies a stored churn model to new customer files.
+
+    The input CSV is streamed in chunks; each chunk goes through the model's
+    fitted Preprocessor and its churn probabilities are appended to the
+    result file straight away, so memory stays bounded by the chunk size
+    whatever the size of the input.
+    """
+
+    # Output column holding the churn probability
+    PROBABILITY_COLUMN = "churn_probability"
+
+    def __init__(self, churn_model: ChurnModel, chunk_size=100_000):
+        self.churn_model = churn_model
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_registry(cls, entry, chunk_size=100_000, n_jobs=1):
+        """
+        Build a scorer from a model registry entry.
+
+        :param entry: RegistryModel row of a trained model.
+        :param chunk_size: Number of rows scored at a time.
+        :param n_jobs: CPUs used to score each chunk.
+        """
+        # Entries registered before backends existed are random forests
+        backend = entry.get_hyperparams().get("backend", DEFAULT_BACKEND)
+        churn_model = ChurnModel(
+            target_column=entry.target_column, n_jobs=n_jobs, backend=backend
+        )
+        churn_model.load_artifacts(entry.artifact_dir)
+        return cls(churn_model, chunk_size=chunk_size)
+
+    def input_columns(self, data_loader):
+        """Columns of the input the model needs: identifiers and raw features."""
+        preprocessor = self.churn_model.preprocessor
+        wanted = set(preprocessor.id_columns) | set(preprocessor.input_columns)
+        return [col for col in data_loader.columns() if col in wanted]
+
+    def score_file(self, source, output_path, on_chunk=None):
+        """
+        Score a file chunk by chunk and write the probabilities to a CSV.
+
+        The identifier columns of the input (e.g. CustomerId) are copied to the
+        output so every probability can be matched to its customer.
+
+        :param source: CSV path, or a DataLoader (which may read a columnar
+            copy) with the raw columns of the training file.
+        :param output_path: CSV file the results are written to.
+        :param on_chunk: Optional callback invoked with the rows scored so far.
+        :return: Summary of the run (rows, chunks and output path).
+        """
+        data_loader = (
+            DataLoader(source, chunk_size=self.chunk_size)
+            if isinstance(source, str)
+            else source
+        )
+        if not (data_loader.is_csv() or data_loader.has_columnar()):
+            # Excel files can only be streamed from their columnar copy
+            raise ValueError("Batch scoring needs a CSV file or its columnar copy")
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        rows = 0
+        chunks = 0
+        # Write to a temporary file so a failed run never leaves a partial result
+        tmp_path = f"{output_path}.part"
+        with open(tmp_path, "w", newline="") as output:
+            for chunk in data_loader.iter_chunks(
+                chunk_size=self.chunk_size, columns=self.input_columns(data_loader)
+            ):
+                result = chunk[
+                    [
+                        col
+                        for col in self.churn_model.preprocessor.id_columns
+                        if col in chunk
+                    ]
+                ].copy()
+                result[self.PROBABILITY_COLUMN] = self.churn_model.predict_proba(chunk)
+                result.to_csv(output, header=chunks == 0, index=False)
+
+                rows += len(chunk)
+                chunks += 1
+                if on_chunk is not None:
+                    on_chunk(rows)
+        os.replace(tmp_path, output_path)
+
+        return {"rows": rows, "chunks": chunks, "output_path": output_path}
@@ -1,64 +1,176 @@
-import base64
-import random
+import time
 import string
-from PIL import Image, ImageDraw, ImageFont
+import secrets
+import threading
 from io import BytesIO
-from flask import session, request
+from collections import deque
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from flask import current_app, session, request
+from app.middleware.Metrics import record_cache
+
+
+# Characters of the CAPTCHA texts
+CAPTCHA_ALPHABET = string.ascii_uppercase + string.digits
+
+# Image size (pixels) and colours of the noise dots
+WIDTH, HEIGHT = 150, 50
+NOISE_COLORS = np.array([(128, 128, 128), (0, 0, 0), (0, 0, 255)], dtype=np.uint8)
+
+
+# Generate a random CAPTCHA text with a max length of 6
+def generate_captcha_text(length=6):
+    return ''.join(secrets.choice(CAPTCHA_ALPHABET) for _ in range(length))
+
+
+# The font is loaded once per process, not for every image
+@lru_cache(maxsize=None)
+def load_font(size=36):
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+def render_captcha(text, rng):
+    """
+    Render a CAPTCHA text as a PNG image.
+
+    The 100-200 noise dots are set in one vectorized assignment on the pixel
+    array, then the text is drawn centred over them.
+
+    :param rng: NumPy Generator the noise is drawn from.
+    :return: PNG bytes.
+    """
+    pixels = np.full((HEIGHT, WIDTH, 3), 255, dtype=np.uint8)
+    n_dots = rng.integers(100, 201)
+    rows = rng.integers(0, HEIGHT, n_dots)
+    columns = rng.integers(0, WIDTH, n_dots)
+    pixels[rows, columns] = NOISE_COLORS[rng.integers(0, len(NOISE_COLORS), n_dots)]
+
+    image = Image.fromarray(pixels)
+    draw = ImageDraw.Draw(image)
+    font = load_font()
+    bbox = draw.textbbox((0, 0), text, font=font)  # Get bounding box of the text
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+    text_position = ((WIDTH - text_width) // 2, (HEIGHT - text_height) // 2)
+    draw.text(text_position, text, fill=(0, 0, 0), font=font)
+
+    byte_io = BytesIO()
+    image.save(byte_io, 'PNG')
+    return byte_io.getvalue()
+
+
+class CaptchaPool:
+    """
+    In-process pool of pre-rendered CAPTCHAs, served straight from memory.
+
+    Each entry (text and PNG bytes) is handed out once. When the pool falls
+    below half of ``size``, a background thread renders it full again, so
+    requests normally never render; an empty pool renders one inline.
+    Entries older than ``ttl`` seconds are dropped instead of served, so an
+    idle pool does not keep the same images around indefinitely.
+    """
+
+    def __init__(self, size=64, ttl=600):
+        self.size = size
+        self.ttl = ttl
+        self.entries = deque()  # (text, png, rendered_at), oldest first
+        self.lock = threading.Lock()
+        self.refilling = False
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(size=config["CAPTCHA_POOL_SIZE"], ttl=config["CAPTCHA_POOL_TTL"])
+
+    def take(self):
+        """Return the ``(text, png)`` of a CAPTCHA nobody was given before."""
+        now = time.monotonic()
+        with self.lock:
+            while self.entries and now - self.entries[0][2] > self.ttl:
+                self.entries.popleft()
+            entry = self.entries.popleft() if self.entries else None
+        record_cache("captcha", entry is not None)
+        self.refill()
+        if entry is None:
+            entry = self._render(np.random.default_rng())
+        return entry[0], entry[1]
+
+    def refill(self):
+        """Start filling the pool in the background, unless it is half full."""
+        with self.lock:
+            if self.refilling or len(self.entries) >= max(1, self.size // 2):
+                return
+            self.refilling = True
+        threading.Thread(target=self._fill, name="captcha-pool", daemon=True).start()
+
+    def _fill(self):
+        rng = np.random.default_rng()
+        try:
+            while True:
+                with self.lock:
+                    if len(self.entries) >= self.size:
+                        return
+                # Render outside the lock so requests can take entries meanwhile
+                entry = self._render(rng)
+                with self.lock:
+                    self.entries.append(entry)
+        finally:
+            with self.lock:
+                self.refilling = False
+
+    @staticmethod
+    def _render(rng):
+        text = generate_captcha_text()
+        return text, render_captcha(text, rng), time.monotonic()
+
 
 class CaptchaMiddleware:
+    """
+    CAPTCHA of the login and registration forms.
+
+    ``issue()`` serves the next image of the process' CaptchaPool and keeps
+    its text in the session; ``check()`` validates the answer of a form
+    once. The pool is created on first use, and loading the login page
+    starts filling it, before the browser asks for the image.
+    """
+
     def __init__(self, app):
         self.app = app
+        self.pool = None
+        self.pool_lock = threading.Lock()
         app.before_request(self.before_request)
 
-    # Generate a random CAPTCHA text with a max length of 6
-    def generate_captcha_text(self, length=6):
-        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
-
-    # Create a CAPTCHA image
-    def generate_captcha_image(self, text):
-        width, height = 150, 50
-        image = Image.new("RGB", (width, height), color=(255, 255, 255))
-        draw = ImageDraw.Draw(image)
-
-        try:
-            font = ImageFont.truetype("arial.ttf", 36)
-        except IOError:
-            font = ImageFont.load_default()
-
-        # Add random noise
-        for _ in range(random.randint(100, 200)):
-            draw.point((random.randint(0, width), random.randint(0, height)), fill=random.choice(["gray", "black", "blue"]))
-
-        # Draw the text
-        if not text:
-            text = self.generate_captcha_text()
-            session['captcha'] = text
-
-        bbox = draw.textbbox((0, 0), text, font=font)  # Get bounding box of the text
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        text_position = ((width - text_width) // 2, (height - text_height) // 2)
-        draw.text(text_position, text, fill=(0, 0, 0), font=font)
-
-        byte_io = BytesIO()
-        image.save(byte_io, 'PNG')
-        byte_io.seek(0)
-        
-        captcha_image_base64 = base64.b64encode(byte_io.read()).decode('utf-8')
-        return captcha_image_base64
+    def get_pool(self):
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = CaptchaPool.from_config(current_app.config)
+            return self.pool
 
     # Middleware before each request
     def before_request(self):
         if request.endpoint == 'main.login' and request.method == 'GET':
-            captcha_text = self.generate_captcha_text()  # Generate random 6-character CAPTCHA text
-            session['captcha'] = captcha_text
-            captcha_image_base64 = self.generate_captcha_image(captcha_text)  # Use this text for image generation
-            # session['captcha_image'] = captcha_image_base64  # Store the base64-encoded CAPTCHA image in session
-
-    # Serve the CAPTCHA image when requested
-    def serve_captcha_image(self):
-        captcha_image_base64 = session.get('captcha_image')
-        if captcha_image_base64:
-            return f'<img src="data:image/png;base64,{captcha_image_base64}" alt="captcha">'
-        return 'Captcha image not found', 404
+            self.get_pool().refill()
+
+    def issue(self):
+        """Give the session a new CAPTCHA and return its PNG image."""
+        text, png = self.get_pool().take()
+        session['captcha'] = text
+        session['captcha_issued_at'] = time.time()
+        return png
+
+    def check(self, answer):
+        """
+        Validate a CAPTCHA answer; every issued CAPTCHA can be answered once.
+
+        :return: None if the answer is right, otherwise the error to show.
+        """
+        text = session.pop('captcha', None)
+        issued_at = session.pop('captcha_issued_at', 0)
+        if not text or time.time() - issued_at > current_app.config["CAPTCHA_MAX_AGE"]:
+            return "CAPTCHA expired. Please refresh."
+        if answer != text:
+            return "Incorrect CAPTCHA. Try again."
+        return None
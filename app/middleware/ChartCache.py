@@ -0,0 +1,172 @@
+import os
+import json
+import uuid
+import threading
+from io import BytesIO
+import numpy as np
+from app.middleware.Metrics import record_cache, timed
+
+
+# Figures are reused per thread and per chart kind. They are created with the
+# object-oriented API, so pyplot never keeps a reference to them. matplotlib
+# and seaborn are imported on the first render: serving cached charts never
+# loads them
+_figures = threading.local()
+
+
+def _figure(kind, figsize):
+    """Return this thread's figure for a chart kind, cleared for a new render."""
+    figures = _figures.__dict__.setdefault("by_kind", {})
+    fig = figures.get(kind)
+    if fig is None:
+        from matplotlib.figure import Figure
+
+        fig = figures[kind] = Figure(figsize=figsize)
+    else:
+        fig.clear()
+    return fig
+
+
+def _to_png(fig):
+    """Render a figure to PNG bytes and release its artists."""
+    img = BytesIO()
+    fig.savefig(img, format="png")
+    fig.clear()
+    return img.getvalue()
+
+
+@timed("chart.pie_chart")
+def render_pie_chart(data):
+    """Render the churn distribution from ``{"labels", "counts"}``."""
+    fig = _figure("pie_chart", (6, 6))
+    ax = fig.subplots()
+    ax.pie(
+        data["counts"],
+        labels=data["labels"],
+        autopct="%1.1f%%",
+        startangle=90,
+        colors=["#ff9999", "#66b3ff"],
+    )
+    ax.set_title("Churn Distribution")
+    return _to_png(fig)
+
+
+@timed("chart.histogram")
+def render_histogram(data):
+    """Render a pre-binned histogram from ``{"column", "counts", "edges"}``."""
+    fig = _figure("histogram", (8, 6))
+    ax = fig.subplots()
+    edges = np.asarray(data["edges"])
+    ax.hist(
+        edges[:-1],
+        bins=edges,
+        weights=data["counts"],
+        color="#66b3ff",
+        edgecolor="black",
+    )
+    ax.grid(True)
+    ax.set_title(f"Distribution of {data['column']}")
+    ax.set_xlabel(data["column"])
+    ax.set_ylabel("Frequency")
+    return _to_png(fig)
+
+
+@timed("chart.feature_importance")
+def render_feature_importance(data):
+    """Render a bar chart from ``{"features", "importances"}``."""
+    import seaborn as sns
+
+    fig = _figure("feature_importance", (10, 6))
+    ax = fig.subplots()
+    sns.barplot(
+        x=data["importances"],
+        y=data["features"],
+        hue=data["features"],
+        palette="viridis",
+        legend=False,
+        ax=ax,
+    )
+    ax.set_title("Feature Importance")
+    ax.set_xlabel("Importance")
+    ax.set_ylabel("Features")
+    return _to_png(fig)
+
+
+# Renderer of every chart kind
+RENDERERS = {
+    "pie_chart": render_pie_chart,
+    "histogram": render_histogram,
+    "feature_importance": render_feature_importance,
+}
+
+
+class ChartCache:
+    """
+    On-disk cache of the charts of churn runs.
+
+    A run only stores the small inputs of its charts (``chart_data.json``);
+    each PNG is rendered the first time it is requested and kept next to
+    them, so charts nobody opens are never drawn. Directories are keyed by
+    the run (churn job) id, whose charts never change once written.
+    """
+
+    DATA_FILE = "chart_data.json"
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["CHART_CACHE_FOLDER"])
+
+    def run_dir(self, run_id):
+        return os.path.join(self.folder, str(run_id))
+
+    def save_data(self, run_id, chart_data):
+        """Store the chart inputs of a run, dropping previously rendered charts."""
+        run_dir = self.run_dir(run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        for kind in RENDERERS:
+            png_path = os.path.join(run_dir, f"{kind}.png")
+            if os.path.exists(png_path):
+                os.remove(png_path)
+        self._write(
+            os.path.join(run_dir, self.DATA_FILE),
+            json.dumps(chart_data).encode("utf-8"),
+        )
+
+    def get_or_render(self, run_id, kind):
+        """
+        Return the path of a chart PNG, rendering it on the first request.
+
+        :return: Path of the PNG, or None if the run has no such chart.
+        """
+        if kind not in RENDERERS:
+            return None
+
+        run_dir = self.run_dir(run_id)
+        png_path = os.path.join(run_dir, f"{kind}.png")
+        hit = os.path.exists(png_path)
+        record_cache("chart", hit)
+        if hit:
+            return png_path
+
+        data_path = os.path.join(run_dir, self.DATA_FILE)
+        if not os.path.exists(data_path):
+            return None
+        with open(data_path, "r", encoding="utf-8") as f:
+            chart_data = json.load(f)
+        if kind not in chart_data:
+            return None
+
+        self._write(png_path, RENDERERS[kind](chart_data[kind]))
+        return png_path
+
+    @staticmethod
+    def _write(path, content):
+        # Write to a private file first, so concurrent requests rendering the
+        # same chart never serve a half-written one
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
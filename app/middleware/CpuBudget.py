@@ -0,0 +1,57 @@
+import os
+from threadpoolctl import threadpool_limits
+
+
+def job_cpu_budget(config):
+    """
+    Number of CPUs one background job may use.
+
+    The ``TRAINING_MAX_CPUS`` cap is split evenly between every job that can
+    run at the same time, which keeps concurrent trainings from
+    oversubscribing the machine:
+
+    - ``JOB_RUNNER = "worker"``: the job worker is the only process with a
+      job pool, so at most ``JOB_WORKERS`` jobs run at once.
+    - ``JOB_RUNNER = "local"``: each of the ``WEB_PROCESSES`` web processes
+      has its own pool of ``JOB_WORKERS``, and the cap is split between all
+      of them.
+    """
+    max_cpus = config.get("TRAINING_MAX_CPUS") or os.cpu_count() or 1
+    concurrent_jobs = max(1, config.get("JOB_WORKERS", 1))
+    if config.get("JOB_RUNNER", "local") == "local":
+        concurrent_jobs *= max(1, config.get("WEB_PROCESSES", 1))
+    return max(1, max_cpus // concurrent_jobs)
+
+
+def resolve_n_jobs(requested, budget):
+    """
+    Clip a requested ``n_jobs`` to the CPU budget.
+
+    :param requested: n_jobs asked for (None or -1 means "as many as allowed").
+    :param budget: CPUs available to the job.
+    """
+    if requested is None or requested < 1:
+        return budget
+    return min(requested, budget)
+
+
+class CpuBudget:
+    """
+    Context manager limiting the threads native libraries may start.
+
+    joblib workers are bounded by ``n_jobs`` already; this also caps the
+    BLAS/OpenMP thread pools (numpy, scikit-learn) so they stay within the
+    same budget.
+    """
+
+    def __init__(self, n_jobs):
+        self.n_jobs = n_jobs
+        self.limits = None
+
+    def __enter__(self):
+        self.limits = threadpool_limits(limits=self.n_jobs)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.limits.restore_original_limits()
+        return False
@@ -0,0 +1,479 @@
+import os
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from app.middleware.Metrics import record_bytes_read, record_rows, timed
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+
+class DataLoader:
+    """
+    Memory-lean reader for uploaded CSV/XLSX files.
+
+    The schema is inferred from a sample of the file: floats are read as
+    float32, integers are downcast to int32 when they fit, and low-cardinality
+    strings (e.g. Gender, Region, ContractType) become ``category``. CSV files
+    are read in chunks, so the whole file is never held as default
+    int64/float64/object columns. ``report`` describes the last load.
+
+    When a columnar (Parquet) copy of the upload exists it is read instead of
+    the original, and only the requested columns are touched.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        columnar_path=None,
+        schema=None,
+        chunk_size=200_000,
+        sample_rows=10_000,
+        category_max_unique=100,
+    ):
+        """
+        :param file_path: Path of the CSV or XLSX file.
+        :param columnar_path: Optional path of the Parquet copy of the file.
+        :param schema: Optional schema saved by a previous ``infer_schema()``.
+        :param chunk_size: Number of CSV rows read at a time.
+        :param sample_rows: Number of rows used to infer the schema.
+        :param category_max_unique: String columns with at most this many
+            distinct values in the sample are read as ``category``.
+        """
+        self.file_path = file_path
+        self.columnar_path = columnar_path
+        self.chunk_size = chunk_size
+        self.sample_rows = sample_rows
+        self.category_max_unique = category_max_unique
+        self.schema = schema
+        self.report = {}
+
+    def is_csv(self):
+        return self.file_path.endswith(".csv")
+
+    def has_columnar(self):
+        """Whether a columnar copy of the file is available."""
+        return bool(self.columnar_path) and os.path.exists(self.columnar_path)
+
+    def columns(self):
+        """Column names of the file, in file order."""
+        if self.schema is None:
+            self.infer_schema()
+        return list(self.schema)
+
+    def infer_schema(self):
+        """Infer the dtype of every column from the first ``sample_rows`` rows."""
+        if self.has_columnar():
+            return self._columnar_schema()
+
+        sample = (
+            pd.read_csv(self.file_path, nrows=self.sample_rows)
+            if self.is_csv()
+            else pd.read_excel(self.file_path, nrows=self.sample_rows)
+        )
+
+        schema = {}
+        for col in sample.columns:
+            series = sample[col]
+            if pd.api.types.is_float_dtype(series) and not self.is_whole(series):
+                schema[col] = "float32"
+            elif pd.api.types.is_integer_dtype(series) or pd.api.types.is_float_dtype(
+                series
+            ):
+                # Integers with missing values are sampled as floats; all are
+                # downcast per chunk, once their range is known
+                schema[col] = "integer"
+            elif series.dtype == object and series.nunique() <= self.category_max_unique:
+                schema[col] = "category"
+            else:
+                schema[col] = None  # Keep pandas' default
+        self.schema = schema
+        return schema
+
+    @staticmethod
+    def is_whole(values):
+        """Whether a float column holds integers (and missing values) only."""
+        present = values.dropna().to_numpy()
+        return len(present) > 0 and bool(np.array_equal(present, np.floor(present)))
+
+    def read_dtypes(self):
+        """dtypes passed to the pandas reader (integers are handled later)."""
+        if self.schema is None:
+            self.infer_schema()
+        return {
+            col: dtype
+            for col, dtype in self.schema.items()
+            if dtype in ("float32", "category")
+        }
+
+    def downcast(self, frame):
+        """Downcast the integer columns of a frame in place."""
+        for col, dtype in self.schema.items():
+            if dtype == "integer" and col in frame:
+                frame[col] = self.downcast_integers(frame[col])
+        return frame
+
+    @staticmethod
+    def downcast_integers(values):
+        """
+        A column of integers in the narrowest dtype that holds them exactly.
+
+        That is int32, or int64 when the values need it; narrower types only
+        save little and risk overflow in later arithmetic. Missing values
+        (which the readers turn into floats) give the nullable Int32/Int64
+        instead: float32 would round integers above 2**24, e.g. merge
+        distinct customer IDs. Columns with fractional values stay floats.
+        """
+        if pd.api.types.is_float_dtype(values):
+            if values.count() and not DataLoader.is_whole(values):
+                return values
+            values = values.astype("Int64")
+        elif not pd.api.types.is_integer_dtype(values):
+            return values
+
+        fits_int32 = values.count() == 0 or (
+            values.min() >= np.iinfo(np.int32).min
+            and values.max() <= np.iinfo(np.int32).max
+        )
+        if values.hasnans:
+            return values.astype("Int32" if fits_int32 else "Int64")
+        return values.astype(np.int32 if fits_int32 else np.int64)
+
+    def iter_chunks(self, chunk_size=None, columns=None):
+        """
+        Yield the file as downcast DataFrames of at most ``chunk_size`` rows.
+
+        :param columns: Optional subset of columns to read.
+        """
+        if self.has_columnar():
+            return self._iter_columnar_chunks(chunk_size, columns)
+        return self._iter_original_chunks(chunk_size, columns)
+
+    def _iter_original_chunks(self, chunk_size=None, columns=None):
+        dtypes = self.read_dtypes()
+        if columns is not None:
+            dtypes = {col: dtype for col, dtype in dtypes.items() if col in columns}
+
+        if not self.is_csv():
+            # Excel files cannot be read incrementally
+            yield self.downcast(
+                pd.read_excel(self.file_path, dtype=dtypes, usecols=columns)
+            )
+            record_bytes_read("xlsx", os.path.getsize(self.file_path))
+            return
+
+        for chunk in pd.read_csv(
+            self.file_path,
+            dtype=dtypes,
+            usecols=columns,
+            chunksize=chunk_size or self.chunk_size,
+        ):
+            yield self.downcast(chunk)
+        # The parser reads the whole file, whichever columns it keeps
+        record_bytes_read("csv", os.path.getsize(self.file_path))
+
+    def _iter_columnar_chunks(self, chunk_size=None, columns=None):
+        import pyarrow.parquet as pq
+
+        if self.schema is None:
+            self.infer_schema()
+        parquet_file = pq.ParquetFile(self.columnar_path)
+        for batch in parquet_file.iter_batches(
+            batch_size=chunk_size or self.chunk_size, columns=columns
+        ):
+            yield self.downcast(self.arrow_to_pandas(batch))
+        n_bytes = self.columnar_bytes(parquet_file.metadata, columns)
+        record_bytes_read("parquet", n_bytes)
+
+    @staticmethod
+    def arrow_to_pandas(table):
+        """Arrow table or batch as a DataFrame, integers with nulls kept exact."""
+        import pyarrow as pa
+
+        # Not float64, which would round integers above 2**53
+        return table.to_pandas(
+            types_mapper=lambda dtype: (
+                pd.Int64Dtype() if pa.types.is_integer(dtype) else None
+            )
+        )
+
+    @staticmethod
+    def columnar_bytes(metadata, columns=None):
+        """Compressed size of the (projected) columns of a Parquet file."""
+        n_bytes = 0
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            for j in range(row_group.num_columns):
+                column = row_group.column(j)
+                if columns is None or column.path_in_schema in columns:
+                    n_bytes += column.total_compressed_size
+        return n_bytes
+
+    def _columnar_schema(self):
+        """Schema of the columnar copy, in the same terms as ``infer_schema()``."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = {}
+        for field in pq.read_schema(self.columnar_path):
+            if pa.types.is_floating(field.type):
+                schema[field.name] = "float32"
+            elif pa.types.is_integer(field.type):
+                schema[field.name] = "integer"
+            elif pa.types.is_dictionary(field.type):
+                schema[field.name] = "category"
+            else:
+                schema[field.name] = None
+        self.schema = schema
+        return schema
+
+    @timed("read.to_columnar")
+    def to_columnar(self, output_path):
+        """
+        Convert the original file to Parquet, one row group per chunk.
+
+        Integers are stored as (nullable) int64 and downcast again on read,
+        categories as dictionary-encoded strings.
+
+        :param output_path: Path of the Parquet file to write.
+        :return: The schema of the file.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.schema is None:
+            self.infer_schema()
+        # Private temporary name: identical uploads may be converted at once
+        tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+        writer = None
+        try:
+            for chunk in self._iter_original_chunks():
+                if writer is None:
+                    arrow_schema = self._arrow_schema(chunk)
+                    writer = pq.ParquetWriter(tmp_path, arrow_schema)
+                writer.write_table(
+                    pa.Table.from_pandas(chunk, schema=arrow_schema, preserve_index=False)
+                )
+        finally:
+            if writer is not None:
+                writer.close()
+        os.replace(tmp_path, output_path)
+        return self.schema
+
+    def _arrow_schema(self, chunk):
+        """Fixed Arrow schema for every chunk of the file."""
+        import pyarrow as pa
+
+        inferred = pa.Schema.from_pandas(chunk, preserve_index=False)
+        fields = []
+        for field in inferred:
+            dtype = self.schema.get(field.name)
+            if dtype == "float32":
+                fields.append(pa.field(field.name, pa.float32()))
+            elif dtype == "integer":
+                # Chunks with missing values arrive as floats
+                fields.append(pa.field(field.name, pa.int64()))
+            elif dtype == "category":
+                fields.append(
+                    pa.field(field.name, pa.dictionary(pa.int32(), pa.string()))
+                )
+            else:
+                fields.append(field)
+        return pa.schema(fields)
+
+    @timed("read.head")
+    def head(self, rows):
+        """
+        Read only the first ``rows`` rows of the file, e.g. for a preview.
+
+        :param rows: Number of rows to read.
+        """
+        if self.has_columnar():
+            import pyarrow.parquet as pq
+
+            batch = next(
+                pq.ParquetFile(self.columnar_path).iter_batches(batch_size=rows), None
+            )
+            return batch.to_pandas() if batch is not None else pd.DataFrame()
+        if self.is_csv():
+            return pd.read_csv(self.file_path, nrows=rows)
+        # openpyxl stops parsing the sheet once nrows rows are read
+        return pd.read_excel(self.file_path, nrows=rows)
+
+    @timed("read.stats")
+    def stats(self):
+        """
+        Row count, column dtypes and null counts from one streaming pass.
+
+        :return: JSON-serializable dictionary of the dataset statistics.
+        """
+        rows = 0
+        dtypes = {}
+        nulls = {}
+        for chunk in self.iter_chunks():
+            rows += len(chunk)
+            for col, count in chunk.isna().sum().items():
+                nulls[col] = nulls.get(col, 0) + int(count)
+            for col, dtype in chunk.dtypes.items():
+                # A column may widen across chunks (e.g. ints with missing values)
+                dtypes[col] = str(dtype)
+        record_rows("stats", rows)
+
+        return {
+            "rows": rows,
+            "columns": {
+                col: {"dtype": dtypes[col], "nulls": nulls[col]} for col in dtypes
+            },
+        }
+
+    @timed("read.load")
+    def load(self, columns=None):
+        """
+        Read the whole file into one compact DataFrame.
+
+        :param columns: Optional subset of columns to read.
+        """
+        start = time.perf_counter()
+        if self.has_columnar():
+            import pyarrow.parquet as pq
+
+            # Parquet is read whole and column-projected in one call
+            if self.schema is None:
+                self.infer_schema()
+            table = pq.read_table(self.columnar_path, columns=columns)
+            chunks = [self.downcast(self.arrow_to_pandas(table))]
+            del table
+            metadata = pq.read_metadata(self.columnar_path)
+            record_bytes_read("parquet", self.columnar_bytes(metadata, columns))
+        else:
+            chunks = list(self.iter_chunks(columns=columns))
+
+        frame = self.concat(chunks)
+        del chunks
+        record_rows("load", len(frame))
+
+        self.report = {
+            "rows": len(frame),
+            "columns": frame.shape[1],
+            "frame_mb": round(float(frame.memory_usage(index=False).sum()) / 1024**2, 2),
+            "peak_rss_mb": self.peak_rss_mb(),
+            "seconds": round(time.perf_counter() - start, 4),
+            "source": "columnar" if self.has_columnar() else "original",
+        }
+        return frame
+
+    @staticmethod
+    def concat(chunks):
+        """
+        Concatenate frames read from one dataset into one DataFrame.
+
+        The result is built one column at a time, each column being removed
+        from the frames once it is copied, so the data is not held twice
+        (the frames are emptied). Categories are aligned so a column stays
+        categorical; integer columns that are nullable in some frames (see
+        downcast_integers) become nullable in the result.
+        """
+        if len(chunks) == 1:
+            return chunks[0]
+
+        columns = {}
+        for col in list(chunks[0].columns):
+            parts = [chunk.pop(col) for chunk in chunks]
+            if isinstance(parts[0].dtype, pd.CategoricalDtype):
+                categories = pd.Index([])
+                for part in parts:
+                    categories = categories.union(part.cat.categories)
+                parts = [part.cat.set_categories(categories) for part in parts]
+            columns[col] = pd.concat(parts, ignore_index=True)
+            del parts
+        # Not consolidated, so the columns are not copied once more
+        return pd.DataFrame(columns, copy=False)
+
+    @staticmethod
+    def merge_stats(stats, other):
+        """Statistics of two datasets read one after the other (see stats())."""
+        columns = dict(stats["columns"])
+        for col, column in other["columns"].items():
+            if col in columns:
+                columns[col] = {
+                    "dtype": column["dtype"],
+                    "nulls": columns[col]["nulls"] + column["nulls"],
+                }
+            else:
+                columns[col] = column
+        return {"rows": stats["rows"] + other["rows"], "columns": columns}
+
+    @staticmethod
+    def peak_rss_mb():
+        """Peak resident memory of this process in MB (None where unsupported)."""
+        # On Linux ru_maxrss survives exec, so a spawned worker would report
+        # its parent's peak; the VmHWM of /proc is the process's own
+        try:
+            with open("/proc/self/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 2)
+        except OSError:
+            pass
+        if resource is None:
+            return None
+        # ru_maxrss is in kilobytes on Linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+
+
+class MultiPartLoader:
+    """
+    Reader for a versioned dataset: the original upload followed by the
+    delta files appended to it, each read by its own DataLoader.
+
+    It offers the DataLoader methods the pipelines use, reading the parts
+    one after the other.
+    """
+
+    def __init__(self, parts):
+        """
+        :param parts: DataLoaders of the upload and its deltas, oldest first.
+        """
+        self.parts = parts
+        self.file_path = parts[0].file_path
+        self.report = {}
+
+    def is_csv(self):
+        # Parts with a columnar copy stream like CSV files
+        return all(part.is_csv() or part.has_columnar() for part in self.parts)
+
+    def has_columnar(self):
+        return all(part.has_columnar() for part in self.parts)
+
+    def columns(self):
+        return self.parts[0].columns()
+
+    def iter_chunks(self, chunk_size=None, columns=None):
+        for part in self.parts:
+            yield from part.iter_chunks(chunk_size=chunk_size, columns=columns)
+
+    def head(self, rows):
+        return self.parts[0].head(rows)
+
+    def stats(self):
+        stats = self.parts[0].stats()
+        for part in self.parts[1:]:
+            stats = DataLoader.merge_stats(stats, part.stats())
+        return stats
+
+    def load(self, columns=None):
+        start = time.perf_counter()
+        frame = DataLoader.concat([part.load(columns=columns) for part in self.parts])
+        self.report = {
+            "rows": len(frame),
+            "columns": frame.shape[1],
+            "frame_mb": round(float(frame.memory_usage(index=False).sum()) / 1024**2, 2),
+            "peak_rss_mb": DataLoader.peak_rss_mb(),
+            "seconds": round(time.perf_counter() - start, 4),
+            "source": "columnar" if self.has_columnar() else "original",
+            "parts": len(self.parts),
+        }
+        return frame
@@ -0,0 +1,73 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+# Engine profiles: "tuned" configures the engine for concurrent web and job
+# processes, "plain" leaves SQLAlchemy's defaults (e.g. for comparisons)
+PROFILES = ("tuned", "plain")
+
+
+def is_sqlite(database_uri):
+    return make_url(database_uri).get_backend_name() == "sqlite"
+
+
+def engine_options(config):
+    """
+    SQLAlchemy engine options of the configured database and profile.
+
+    - SQLite: the driver waits up to ``SQLITE_BUSY_TIMEOUT`` ms for a lock
+      instead of failing with "database is locked" (the PRAGMAs are set on
+      every connection, see configure_engine).
+    - Other servers (PostgreSQL): a bounded pool of ``DB_POOL_SIZE``
+      connections plus ``DB_MAX_OVERFLOW`` extra ones under bursts, waiting
+      at most ``DB_POOL_TIMEOUT`` seconds for one; connections are recycled
+      after ``DB_POOL_RECYCLE`` seconds and checked before use, so ones the
+      server or a proxy dropped are replaced instead of failing a request.
+    """
+    profile = config.get("DB_ENGINE_PROFILE", "tuned")
+    if profile not in PROFILES:
+        raise ValueError(
+            f"Unknown DB_ENGINE_PROFILE '{profile}'. Choose one of: {', '.join(PROFILES)}"
+        )
+    if profile == "plain":
+        return {}
+
+    if is_sqlite(config["SQLALCHEMY_DATABASE_URI"]):
+        return {"connect_args": {"timeout": config["SQLITE_BUSY_TIMEOUT"] / 1000}}
+
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": True,
+    }
+
+
+def configure_engine(engine, config):
+    """
+    Connection settings that cannot be passed as engine options.
+
+    SQLite connections switch to write-ahead logging, so readers (job status
+    polls, listings) never block the writer and the writer never blocks
+    them; with WAL, ``synchronous=NORMAL`` only syncs at checkpoints, which
+    keeps the database consistent after a crash (the last commits may be
+    lost on power failure). The busy timeout also covers locks taken inside
+    SQLite itself.
+    """
+    if config.get("DB_ENGINE_PROFILE", "tuned") == "plain":
+        return
+    if engine.dialect.name != "sqlite":
+        return
+
+    in_memory = engine.url.database in (None, "", ":memory:")
+    busy_timeout = int(config["SQLITE_BUSY_TIMEOUT"])
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cursor.close()
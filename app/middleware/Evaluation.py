@@ -0,0 +1,173 @@
+import copy
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.model_selection import StratifiedKFold
+from app.middleware.CpuBudget import CpuBudget
+from app.middleware.Metrics import timed
+
+
+# Decision thresholds precision and recall are reported at
+THRESHOLDS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+# Threshold of the confusion matrix (that of the model's own predictions)
+DECISION_THRESHOLD = 0.5
+
+
+def _ratio(numerator, denominator):
+    """Element-wise ratio, None where the denominator is zero."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    ratio = np.divide(
+        numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0
+    )
+    return [
+        float(value) if valid else None for value, valid in zip(ratio, denominator > 0)
+    ]
+
+
+def classification_report(y_true, scores, thresholds=THRESHOLDS):
+    """
+    Ranking and threshold metrics of binary scores, from a single sort.
+
+    The scores are sorted once; cumulative true positive counts along that
+    order give the ROC and precision/recall curves, and a binary search of
+    each threshold in the same order gives the counts above it. No metric
+    re-scans the predictions.
+
+    :param y_true: Boolean array, True for the positive class.
+    :param scores: Probability of the positive class of every row.
+    :param thresholds: Thresholds to report precision and recall at.
+    :return: JSON-serializable dict (ROC-AUC and PR-AUC are None when only
+        one class is present).
+    """
+    y_true = np.asarray(y_true, dtype=bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    n_rows = len(scores)
+    positives = int(y_true.sum())
+    negatives = n_rows - positives
+
+    order = np.argsort(-scores, kind="mergesort")
+    sorted_scores = scores[order]
+    # True positives among the k highest scores, for k = 0..n_rows
+    true_positives = np.concatenate(([0], np.cumsum(y_true[order])))
+
+    # Curve points at every distinct score (tied scores form one point)
+    ends = np.append(np.flatnonzero(np.diff(sorted_scores)), n_rows - 1) + 1
+    tps = true_positives[ends]
+    fps = ends - tps
+
+    roc_auc = pr_auc = None
+    if positives and negatives:
+        # Area under the curve of the counts, normalized once (exact for
+        # integer counts, so a perfect ranking is exactly 1.0)
+        area = np.trapezoid(np.concatenate(([0], tps)), np.concatenate(([0], fps)))
+        roc_auc = float(area / (positives * negatives))
+        # Average precision: precision weighted by each step in recall
+        recall_steps = np.diff(np.concatenate(([0], tps))) / positives
+        pr_auc = float(np.sum(recall_steps * tps / ends))
+
+    # Rows scored at or above each threshold (the scores sorted descending)
+    cutoffs = np.asarray(list(thresholds) + [DECISION_THRESHOLD])
+    predicted = np.searchsorted(-sorted_scores, -cutoffs, side="right")
+    tp = true_positives[predicted]
+    fp = predicted - tp
+    precision = _ratio(tp, predicted)
+    recall = _ratio(tp, np.full(len(cutoffs), positives))
+
+    tp, fp = int(tp[-1]), int(fp[-1])
+    return {
+        "rows": n_rows,
+        "positives": positives,
+        "roc_auc": roc_auc,
+        "pr_auc": pr_auc,
+        "thresholds": [
+            {"threshold": float(t), "precision": p, "recall": r}
+            for t, p, r in zip(cutoffs[:-1], precision[:-1], recall[:-1])
+        ],
+        "confusion_matrix": {
+            "threshold": DECISION_THRESHOLD,
+            "true_negative": negatives - fp,
+            "false_positive": fp,
+            "false_negative": positives - tp,
+            "true_positive": tp,
+        },
+    }
+
+
+def _fit_fold(
+    backend, hyperparams, preprocessor, train_rows, y_train, test_rows, n_jobs
+):
+    """
+    Fit a fold's preprocessing and model on its training rows and return the
+    churn probabilities of its held-out rows.
+    """
+    preprocessor = copy.deepcopy(preprocessor).fit(train_rows)
+    X_train = preprocessor.encode(train_rows, scale=False)
+    X_test = preprocessor.encode(test_rows, scale=False)
+    preprocessor.fit_scaler(X_train)
+    X_train = preprocessor.apply_scaler(X_train)
+    X_test = preprocessor.apply_scaler(X_test)
+
+    model = backend.build(
+        hyperparams, n_jobs, categorical_features=preprocessor.categorical_mask
+    )
+    with CpuBudget(n_jobs):
+        model.fit(X_train, y_train)
+        return model.predict_proba(X_test)[:, -1]
+
+
+@timed("model.cross_validate")
+def cross_validate(backend, hyperparams, frame, y, preprocessor, folds=5, n_jobs=1):
+    """
+    Stratified k-fold cross-validation of a backend on raw rows.
+
+    Each fold fits its own copy of the unfitted ``preprocessor`` (typing,
+    imputation values, vocabularies and scaler) on its training rows only,
+    so no held-out row shapes the model that scores it. Folds are fitted in
+    parallel worker processes (at most ``n_jobs``, the CPUs being split
+    between them), each receiving only its own rows. Every row is scored by
+    the one model that did not train on it, and the metrics are computed
+    once over these out-of-fold predictions.
+
+    :param backend: ModelBackend to fit.
+    :param frame: Raw rows, target column included.
+    :param y: Encoded target; the highest class is the positive one.
+    :param preprocessor: Unfitted Preprocessor configured for the backend.
+    :param folds: Number of folds.
+    :return: classification_report() of the out-of-fold predictions, plus
+        the ROC-AUC of each fold.
+    """
+    y = np.asarray(y)
+    splitter = StratifiedKFold(
+        n_splits=folds, shuffle=True, random_state=hyperparams["random_state"]
+    )
+    splits = list(splitter.split(np.zeros(len(y)), y))
+
+    workers = max(1, min(folds, n_jobs))
+    fold_jobs = max(1, n_jobs // workers)
+    fold_scores = Parallel(n_jobs=workers)(
+        delayed(_fit_fold)(
+            backend,
+            hyperparams,
+            preprocessor,
+            frame.iloc[train],
+            y[train],
+            frame.iloc[test],
+            fold_jobs,
+        )
+        for train, test in splits
+    )
+
+    scores = np.empty(len(y), dtype=np.float64)
+    for (_, test), fold_score in zip(splits, fold_scores):
+        scores[test] = fold_score
+    positive = y == np.max(y)
+
+    report = classification_report(positive, scores)
+    report["folds"] = folds
+    report["fold_roc_auc"] = [
+        classification_report(positive[test], scores[test], thresholds=())["roc_auc"]
+        for _, test in splits
+    ]
+    return report
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from app.middleware.Metrics import record_cache
+from app.middleware.ModelRegistry import directory_size
+
+
+def make_feature_key(content_hash, target_column, preprocessing, columns=None):
+    """
+    Key of a preprocessed feature matrix: dataset content, target column and
+    preprocessing configuration (including the train/test split).
+
+    :param columns: Column projection the features were built from (None for all).
+    """
+    payload = json.dumps(
+        {
+            "content_hash": content_hash,
+            "target_column": target_column,
+            "preprocessing": preprocessing,
+            "columns": sorted(columns) if columns else None,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StoredFeatures:
+    """
+    Preprocessed features of a dataset, memory-mapped from a FeatureStore entry.
+
+    The rows are stored training split first, so both splits are slices of
+    the same file and never copied: every process opening an entry shares
+    one page-cache copy of it.
+    """
+
+    def __init__(self, entry_dir):
+        with open(os.path.join(entry_dir, FeatureStore.META_FILE), "r") as f:
+            self.meta = json.load(f)
+        self.entry_dir = entry_dir
+        self.n_rows = self.meta["n_rows"]
+        self.n_train = self.meta["n_train"]
+        self.feature_names = self.meta["feature_names"]
+        self.y = self._open("y.npy")
+        if self.meta["sparse"]:
+            self.data = self._open("data.npy")
+            self.indices = self._open("indices.npy")
+            self.indptr = self._open("indptr.npy")
+        else:
+            self.X = self._open("X.npy")
+        self._preprocessor = None
+
+    def _open(self, name):
+        return np.load(os.path.join(self.entry_dir, name), mmap_mode="r")
+
+    @property
+    def preprocessor(self):
+        """The Preprocessor (with its scaler) the features were encoded with."""
+        if self._preprocessor is None:
+            self._preprocessor = joblib.load(
+                os.path.join(self.entry_dir, FeatureStore.PREPROCESSOR_FILE)
+            )
+        return self._preprocessor
+
+    def rows(self, start, stop):
+        """Feature matrix of the rows ``start:stop``, a view of the mapped file."""
+        if not self.meta["sparse"]:
+            return self.X[start:stop]
+        # Only the (small) row pointer is rebased; values and column indices
+        # stay slices of the mapped arrays
+        indptr = self.indptr[start : stop + 1]
+        begin, end = int(indptr[0]), int(indptr[-1])
+        return sp.csr_matrix(
+            (self.data[begin:end], self.indices[begin:end], indptr - begin),
+            shape=(stop - start, len(self.feature_names)),
+            copy=False,
+        )
+
+    def split(self):
+        """``(X_train, X_test, y_train, y_test)`` as stored."""
+        return (
+            self.rows(0, self.n_train),
+            self.rows(self.n_train, self.n_rows),
+            self.y[: self.n_train],
+            self.y[self.n_train :],
+        )
+
+
+class FeatureStore:
+    """
+    On-disk store of preprocessed feature matrices, shared by every process.
+
+    ``ChurnModel.preprocess_data`` encodes, splits and scales a whole
+    dataset; the resulting float32 matrix is written here once, as ``.npy``
+    files keyed by dataset content and preprocessing configuration (see
+    make_feature_key), and later runs on the same data open it memory-mapped
+    instead of parsing and encoding the file again. Sparse (one-hot)
+    matrices are stored as their three CSR arrays. Entries never change once
+    written; the least recently used ones are evicted past ``max_bytes``.
+
+    :param folder: Directory of the entries.
+    :param max_bytes: Total size the entries may take on disk.
+    """
+
+    META_FILE = "meta.json"
+    PREPROCESSOR_FILE = "preprocessor.pkl"
+
+    def __init__(self, folder, max_bytes=10 * 1024**3):
+        self.folder = folder
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config["FEATURE_STORE_FOLDER"], max_bytes=config["FEATURE_STORE_MAX_BYTES"]
+        )
+
+    def entry_dir(self, key):
+        return os.path.join(self.folder, key)
+
+    def open(self, key):
+        """Return the stored features of a key (recording the hit), or None on a miss."""
+        entry_dir = self.entry_dir(key)
+        meta_path = os.path.join(entry_dir, self.META_FILE)
+        hit = os.path.exists(meta_path)
+        record_cache("features", hit)
+        if not hit:
+            return None
+        # The modification time of the metadata orders entries for eviction
+        os.utime(meta_path)
+        return StoredFeatures(entry_dir)
+
+    def save(self, key, X_train, X_test, y_train, y_test, preprocessor):
+        """
+        Write the preprocessed splits of a dataset and map them back.
+
+        :param X_train: Training features (NumPy array or CSR matrix).
+        :param X_test: Test features, same layout.
+        :param preprocessor: Fitted Preprocessor the features were encoded with.
+        :return: StoredFeatures of the entry.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        entry_dir = self.entry_dir(key)
+
+        # Write to a private directory first, so concurrent runs on the same
+        # data never map half-written files
+        tmp_dir = f"{entry_dir}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp_dir)
+        try:
+            sparse = sp.issparse(X_train)
+            if sparse:
+                self._write_csr(tmp_dir, X_train, X_test)
+            else:
+                self._write_rows(
+                    os.path.join(tmp_dir, "X.npy"),
+                    np.asarray(X_train, dtype=np.float32),
+                    np.asarray(X_test, dtype=np.float32),
+                )
+            self._write_rows(
+                os.path.join(tmp_dir, "y.npy"), np.asarray(y_train), np.asarray(y_test)
+            )
+            joblib.dump(preprocessor, os.path.join(tmp_dir, self.PREPROCESSOR_FILE))
+            # Written last: an entry exists once its metadata does
+            with open(os.path.join(tmp_dir, self.META_FILE), "w") as f:
+                json.dump(
+                    {
+                        "n_rows": X_train.shape[0] + X_test.shape[0],
+                        "n_train": X_train.shape[0],
+                        "feature_names": list(preprocessor.feature_names),
+                        "sparse": sparse,
+                        "created_at": time.time(),
+                    },
+                    f,
+                )
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another run stored the same features first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.exists(os.path.join(entry_dir, self.META_FILE)):
+                raise
+
+        self.evict()
+        return StoredFeatures(entry_dir)
+
+    @staticmethod
+    def _write_rows(path, first, second):
+        # The two blocks are copied into the mapped file one after the other,
+        # never concatenated in memory
+        shape = (first.shape[0] + second.shape[0],) + first.shape[1:]
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=first.dtype, shape=shape)
+        out[: first.shape[0]] = first
+        out[first.shape[0] :] = second
+        out.flush()
+        del out
+
+    def _write_csr(self, entry_dir, X_train, X_test):
+        X_train, X_test = X_train.tocsr(), X_test.tocsr()
+        self._write_rows(
+            os.path.join(entry_dir, "data.npy"),
+            X_train.data.astype(np.float32, copy=False),
+            X_test.data.astype(np.float32, copy=False),
+        )
+        index_dtype = np.result_type(X_train.indices, X_test.indices)
+        self._write_rows(
+            os.path.join(entry_dir, "indices.npy"),
+            X_train.indices.astype(index_dtype, copy=False),
+            X_test.indices.astype(index_dtype, copy=False),
+        )
+        # The test rows' pointers continue after the training values
+        self._write_rows(
+            os.path.join(entry_dir, "indptr.npy"),
+            X_train.indptr.astype(np.int64),
+            X_test.indptr[1:].astype(np.int64) + X_train.nnz,
+        )
+
+    def evict(self):
+        """Delete least recently used entries until the store fits ``max_bytes``."""
+        if not os.path.isdir(self.folder):
+            return
+        entries = []
+        for name in os.listdir(self.folder):
+            meta_path = os.path.join(self.folder, name, self.META_FILE)
+            if os.path.exists(meta_path):
+                entries.append((os.path.getmtime(meta_path), name))
+        entries.sort()
+
+        sizes = {name: directory_size(self.entry_dir(name)) for _, name in entries}
+        total_bytes = sum(sizes.values())
+        # Always keep the most recently used entry; processes that mapped an
+        # evicted entry keep reading it until they unmap it
+        for _, name in entries[:-1]:
+            if total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(self.entry_dir(name), ignore_errors=True)
+            total_bytes -= sizes[name]
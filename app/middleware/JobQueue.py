@@ -0,0 +1,332 @@
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+
+
+# Flask app of a worker process, created once by the pool initializer
+_worker_app = None
+
+# Guards the lazy creation of the per-app job queue
+_queue_lock = threading.Lock()
+
+
+def _init_worker():
+    """Create the Flask app used by every job that runs in this worker process."""
+    global _worker_app
+    from app import create_app
+
+    _worker_app = create_app()
+
+
+def run_churn_job(job):
+    """Run the churn pipeline for a job, reporting each stage as it starts."""
+    from flask import current_app
+    from app.controllers.UploadController import FileProcessor
+    from app.middleware.CpuBudget import job_cpu_budget, resolve_n_jobs
+    from app.middleware.ChartCache import ChartCache
+    from app.middleware.FeatureStore import FeatureStore
+    from app.middleware.ModelBackends import DEFAULT_BACKEND
+    from app.middleware.ModelRegistry import ModelRegistry
+    from app.middleware.ResultStore import ResultStore
+    from app.middleware.TrainModel import ChurnModel
+
+    params = job.get_params()
+    data_loader = job.data.loader()
+    # Appended delta files, oldest first, read with the upload's schema
+    schema = job.data.get_schema()
+    deltas = [
+        (delta.content_hash, delta.loader(schema=schema)) for delta in job.data.versions
+    ]
+    file_processor = FileProcessor(
+        job.data.file_path,
+        params["target_column"],
+        on_stage=job.set_stage,
+        registry=ModelRegistry.from_config(current_app.config),
+        data_id=job.data_id,
+        data_loader=data_loader,
+        feature_columns=params.get("feature_columns"),
+        n_jobs=resolve_n_jobs(params.get("n_jobs"), job_cpu_budget(current_app.config)),
+        backend=params.get("backend") or DEFAULT_BACKEND,
+        run_id=job.id,
+        chart_cache=ChartCache.from_config(current_app.config),
+        mode=params.get("mode") or "full",
+        time_budget=current_app.config["QUICK_TIME_BUDGET"],
+        deltas=deltas,
+        incremental=bool(params.get("incremental")),
+        content_hash=job.data.content_hash,
+        feature_store=FeatureStore.from_config(current_app.config),
+        evaluation=params.get("evaluation") or "holdout",
+        cv_folds=params.get("cv_folds") or ChurnModel.CV_FOLDS,
+        result_store=ResultStore.from_config(current_app.config),
+    )
+    return file_processor.run()
+
+
+def run_score_job(job):
+    """Score an uploaded CSV with a registered model, writing a result CSV."""
+    import os
+    from flask import current_app
+    from app.middleware.BatchScorer import BatchScorer
+    from app.middleware.CpuBudget import job_cpu_budget
+    from app.models.RegistryModel import RegistryModel
+
+    params = job.get_params()
+    entry = RegistryModel.find_by_id(params["model_id"])
+    if entry is None:
+        raise ValueError(f"Model {params['model_id']} not found")
+
+    job.set_stage("score", 0.0)
+    scorer = BatchScorer.from_registry(
+        entry,
+        chunk_size=params.get("chunk_size", current_app.config["SCORE_CHUNK_SIZE"]),
+        n_jobs=job_cpu_budget(current_app.config),
+    )
+    output_path = os.path.abspath(
+        os.path.join(current_app.config["SCORE_OUTPUT_FOLDER"], f"score_{job.id}.csv")
+    )
+    return scorer.score_file(job.data.loader(), output_path)
+
+
+def run_convert_job(job):
+    """
+    Convert an upload to its columnar (Parquet) copy and compute its statistics,
+    recording both on DataModel.
+
+    With a ``version`` parameter the delta file of that version is converted
+    instead, and its statistics are merged into the dataset's.
+    """
+    from app.middleware.DataLoader import DataLoader
+    from app.models.DataVersionModel import DataVersionModel
+
+    version = job.get_params().get("version")
+    if version:
+        delta = DataVersionModel.find_by_version(job.data_id, version)
+        job.set_stage("convert", 0.0)
+        columnar_path = f"{delta.file_path}.parquet"
+        # The upload's schema keeps the dtypes of every part identical
+        DataLoader(delta.file_path, schema=job.data.get_schema()).to_columnar(
+            columnar_path
+        )
+        delta.set_columnar(columnar_path)
+
+        job.set_stage("stats", 0.5)
+        stats = job.data.get_stats()
+        delta_stats = delta.loader(schema=job.data.get_schema()).stats()
+        if stats is not None:
+            job.data.set_stats(DataLoader.merge_stats(stats, delta_stats))
+        return {"columnar_path": columnar_path, "version": version}
+
+    job.set_stage("convert", 0.0)
+    columnar_path = f"{job.data.file_path}.parquet"
+    schema = DataLoader(job.data.file_path).to_columnar(columnar_path)
+    job.data.set_columnar(columnar_path, schema)
+
+    # The stats pass streams the columnar copy, which is much cheaper to scan
+    job.set_stage("stats", 0.5)
+    job.data.set_stats(job.data.loader().stats())
+    return {"columnar_path": columnar_path, "columns": len(schema)}
+
+
+# Handlers for each job kind; they receive the JobModel and return its result
+JOB_HANDLERS = {
+    "churn": run_churn_job,
+    "score": run_score_job,
+    "convert": run_convert_job,
+}
+
+
+def run_job(job_id):
+    """
+    Entry point of a job inside a worker process.
+
+    :param job_id: ID of the JobModel row to run.
+    """
+    from app import db
+    from app.middleware.Metrics import METRICS
+    from app.models.JobModel import JobModel
+
+    with _worker_app.app_context():
+        # Another process may have been handed the same job; only the one
+        # that claims it runs it
+        if not JobModel.claim(job_id):
+            return None
+        job = JobModel.find_by_id(job_id)
+
+        try:
+            job.complete(JOB_HANDLERS[job.kind](job))
+        except Exception as e:
+            current_app.logger.exception(f"Job {job_id} ({job.kind}) failed")
+            db.session.rollback()
+            job.fail(e)
+        METRICS.inc("churn_jobs_total", kind=job.kind, status=job.status)
+
+    # The metrics recorded by this job, for the web process's /metrics
+    return METRICS.drain()
+
+
+class JobQueue:
+    """
+    Runs long jobs (e.g. churn training) on a bounded local process pool.
+
+    Job state lives in the ``jobs`` table, so the request that submits a job
+    returns immediately and status, stage and result can be polled, even after
+    a restart. A job runs only once it is claimed (see JobModel.claim), so a
+    job handed to several queues still runs once.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.executor = self._new_executor()
+        # Guards the executor, which is replaced when its pool breaks
+        self.lock = threading.Lock()
+        # IDs of jobs already handed to the pool by this process, and of
+        # those still running
+        self.submitted = set()
+        self.active = set()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.app.config["JOB_WORKERS"],
+            # Forked workers would inherit the parent's DB connections
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def submit(self, job):
+        """Queue a saved JobModel for execution (at most once per process)."""
+        with self.lock:
+            if job.id in self.submitted:
+                return None
+            try:
+                future = self.executor.submit(run_job, job.id)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM), which leaves the whole pool
+                # unusable: replace it; the jobs it was running have failed
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._new_executor()
+                future = self.executor.submit(run_job, job.id)
+            self.submitted.add(job.id)
+            self.active.add(job.id)
+
+        future.add_done_callback(lambda f, job_id=job.id: self._on_done(job_id, f))
+        return future
+
+    def resume(self):
+        """
+        Queue the jobs left running by a previous process again and submit
+        every queued job; returns the number of jobs requeued.
+
+        Only for the one process that runs the deployment's jobs: the jobs it
+        finds running were interrupted by its restart.
+        """
+        from app.models.JobModel import JobModel
+
+        with self.app.app_context():
+            requeued = JobModel.requeue_interrupted()
+            for job in JobModel.find_queued():
+                self.submit(job)
+        return requeued
+
+    def _on_done(self, job_id, future):
+        from app.middleware.Metrics import METRICS
+
+        with self.lock:
+            self.active.discard(job_id)
+
+        error = future.exception()
+        if error is None:
+            if future.result() is not None:
+                METRICS.merge(future.result())
+            return
+
+        # A worker that dies (e.g. OOM) never gets to record its failure
+        from app.models.JobModel import JobModel
+
+        with self.app.app_context():
+            job = JobModel.find_by_id(job_id)
+            if job is not None and job.status != "completed":
+                job.fail(error)
+                METRICS.inc("churn_jobs_total", kind=job.kind, status=job.status)
+
+
+class WorkerQueue:
+    """
+    Job queue of web processes when a job worker runs the jobs.
+
+    A saved JobModel is queued in the ``jobs`` table already, where the
+    worker picks it up (see run_worker); nothing is run in this process.
+    """
+
+    def submit(self, job):
+        return None
+
+
+def get_job_queue():
+    """
+    Return the job queue of the current app, creating it on first use.
+
+    With ``JOB_RUNNER = "local"`` jobs run on a pool of this process; with
+    ``"worker"`` they are left to the job worker (``flask jobs worker``).
+    A local queue of the only web process (``WEB_PROCESSES = 1``) starts by
+    resuming the jobs interrupted by a restart (see JobQueue.resume).
+    """
+    app = current_app._get_current_object()
+    with _queue_lock:
+        if "job_queue" not in app.extensions:
+            if app.config["JOB_RUNNER"] == "worker":
+                app.extensions["job_queue"] = WorkerQueue()
+            else:
+                queue = JobQueue(app)
+                # With several web processes, a running job may be another's
+                if app.config["WEB_PROCESSES"] == 1:
+                    queue.resume()
+                app.extensions["job_queue"] = queue
+    return app.extensions["job_queue"]
+
+
+def start_job_queue():
+    """Start the job queue with the first request (see get_job_queue)."""
+    get_job_queue()
+
+
+def run_worker(app, drain=False, on_requeue=None):
+    """
+    Run queued jobs on a pool of ``JOB_WORKERS`` processes.
+
+    This is the job worker of a deployment: the one process that runs jobs
+    (``JOB_RUNNER = "worker"``), so the jobs it finds running at start-up
+    were interrupted and are queued again first. It then polls the jobs
+    table every ``JOB_POLL_INTERVAL`` seconds, handing queued jobs to the
+    pool as it has room for them.
+
+    :param drain: Return once no job is queued or running, instead of
+        polling forever.
+    :param on_requeue: Called with the number of interrupted jobs requeued.
+    """
+    from app import db
+    from app.models.JobModel import JobModel
+
+    with app.app_context():
+        requeued = JobModel.requeue_interrupted()
+    if on_requeue is not None:
+        on_requeue(requeued)
+
+    queue = JobQueue(app)
+    try:
+        while True:
+            with app.app_context():
+                free = app.config["JOB_WORKERS"] - len(queue.active)
+                queued = JobModel.find_queued(limit=app.config["JOB_WORKERS"] * 2)
+                # Jobs handed to the pool stay queued until a worker claims them
+                waiting = [job for job in queued if job.id not in queue.submitted]
+                for job in waiting[: max(0, free)]:
+                    queue.submit(job)
+                db.session.remove()
+            if drain and not queued and not queue.active:
+                return
+            time.sleep(app.config["JOB_POLL_INTERVAL"])
+    finally:
+        queue.executor.shutdown(wait=True)
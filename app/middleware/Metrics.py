@@ -0,0 +1,231 @@
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300
+)
+
+# Every metric this app exposes: name -> (type, help)
+METRIC_TYPES = {
+    "churn_http_request_duration_seconds": (
+        "histogram",
+        "Latency of HTTP requests by endpoint, method and status.",
+    ),
+    "churn_stage_duration_seconds": (
+        "histogram",
+        "Duration of pipeline stages (model methods, file readers).",
+    ),
+    "churn_bytes_read_total": ("counter", "Bytes of data files read, by format."),
+    "churn_rows_processed_total": ("counter", "Rows processed, by stage."),
+    "churn_cache_requests_total": (
+        "counter",
+        "Cache lookups by cache (model, preview, chart) and result.",
+    ),
+    "churn_jobs_total": ("counter", "Background jobs finished, by kind and status."),
+}
+
+
+class Metrics:
+    """
+    Thread-safe, in-process store of counters and histograms.
+
+    Samples are keyed by metric name and a sorted tuple of label pairs and
+    rendered in the Prometheus text format by ``render()``. Job worker
+    processes keep their own store and ship it with each job's outcome
+    (``drain()``); the process running the pool adds it to its own
+    (``merge()``), so its metrics cover the work done in the pool as well.
+    That is a web process serving ``/metrics``, or the job worker command,
+    which serves them itself (``serve_metrics()``).
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters = {}
+        # (name, labels) -> [count per bucket..., count of +Inf, sum]
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        if name not in METRIC_TYPES:
+            raise ValueError(f"Unknown metric '{name}'")
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """Add ``value`` to a counter."""
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record one observation (e.g. a duration in seconds) in a histogram."""
+        key = self._key(name, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        """Picklable copy of every sample."""
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {key: list(h) for key, h in self.histograms.items()},
+            }
+
+    def drain(self):
+        """Return every sample and reset the store."""
+        with self.lock:
+            snapshot = {"counters": self.counters, "histograms": self.histograms}
+            self.counters = {}
+            self.histograms = {}
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add the samples of a snapshot (e.g. from a worker process)."""
+        with self.lock:
+            for key, value in snapshot["counters"].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, other in snapshot["histograms"].items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    self.histograms[key] = list(other)
+                else:
+                    for i, value in enumerate(other):
+                        histogram[i] += value
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format (0.0.4)."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, (kind, help_text) in METRIC_TYPES.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (key_name, labels), value in sorted(snapshot["counters"].items()):
+                    if key_name == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+
+            for (key_name, labels), histogram in sorted(snapshot["histograms"].items()):
+                if key_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), histogram[:-1]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _number(bound)
+                    bucket_labels = _labels(labels + (("le", le),))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(histogram[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        for k, v in labels
+    )
+    return "{" + pairs + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Store of this process
+METRICS = Metrics()
+
+
+@contextmanager
+def stage_timer(stage):
+    """Record the duration of a block in the stage histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe(
+            "churn_stage_duration_seconds", time.perf_counter() - start, stage=stage
+        )
+
+
+def timed(stage):
+    """Decorator recording every call of a function in the stage histogram."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup."""
+    METRICS.inc(
+        "churn_cache_requests_total", cache=cache, result="hit" if hit else "miss"
+    )
+
+
+def record_rows(stage, rows):
+    """Count rows processed by a stage."""
+    METRICS.inc("churn_rows_processed_total", rows, stage=stage)
+
+
+def record_bytes_read(file_format, n_bytes):
+    """Count bytes read from a data file of a format (csv, xlsx, parquet)."""
+    METRICS.inc("churn_bytes_read_total", n_bytes, format=file_format)
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host="0.0.0.0", metrics=None):
+    """
+    Serve ``/metrics`` of this process from a background thread.
+
+    For processes without the web app, e.g. the job worker command.
+
+    :param port: Port to listen on (0 picks a free one).
+    :return: The server; its ``server_port`` is the port it listens on and
+        ``shutdown()`` stops it.
+    """
+    metrics = metrics or METRICS
+
+    def app(environ, start_response):
+        if environ.get("PATH_INFO") != "/metrics":
+            start_response("404 Not Found", [("Content-Type", "text/plain")])
+            return [b"Not Found\n"]
+        body = metrics.render().encode("utf-8")
+        start_response(
+            "200 OK",
+            [
+                ("Content-Type", "text/plain; version=0.0.4"),
+                ("Content-Length", str(len(body))),
+            ],
+        )
+        return [body]
+
+    server = make_server(host, port, app, handler_class=_QuietHandler)
+    threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    ).start()
+    return server
@@ -0,0 +1,176 @@
+import numpy as np
+
+# scikit-learn is imported when an estimator is built, so importing the
+# backends (e.g. to validate a request) stays cheap
+
+
+class ModelBackend:
+    """
+    A classifier family ChurnModel can train.
+
+    Besides building the estimator, a backend declares which preprocessing
+    it needs, so ChurnModel skips the passes it does not:
+
+    - ``needs_scaling``: standardize the features.
+    - ``needs_one_hot``: sparse one-hot encode categoricals (otherwise they
+      are passed as columns of category codes, which tree splits handle).
+    - ``handles_missing``: missing values are left for the estimator instead
+      of being filled with the column mean/mode.
+
+    ``supports_update`` backends can also fold appended rows into a fitted
+    model (``update``) instead of retraining it on the whole history.
+    """
+
+    name = None
+    needs_scaling = True
+    needs_one_hot = True
+    handles_missing = False
+    supports_update = False
+    # Default hyperparameters; part of the model registry cache key
+    default_params = {}
+    # Overrides for quick (sampled preview) fits
+    quick_params = {}
+
+    def build(self, hyperparams, n_jobs, categorical_features=None):
+        """
+        Return an unfitted estimator.
+
+        :param categorical_features: Boolean mask of the feature columns that
+            hold category codes (used by backends that handle them natively).
+        """
+        raise NotImplementedError
+
+    def update(self, model, X, y, hyperparams, share):
+        """
+        Train a fitted model further on new rows only.
+
+        :param share: Size of the new rows relative to the rows the model
+            was trained on so far.
+        """
+        raise NotImplementedError
+
+    def feature_importances(self, model, X, y, n_jobs=1):
+        """Importance of every feature of X, in column order."""
+        return model.feature_importances_
+
+
+class RandomForestBackend(ModelBackend):
+    name = "random_forest"
+    # Tree splits do not depend on feature scale and handle ordinal codes
+    needs_scaling = False
+    needs_one_hot = False
+    default_params = {"n_estimators": 100}
+    quick_params = {"n_estimators": 20}
+    supports_update = True
+
+    def build(self, hyperparams, n_jobs, categorical_features=None):
+        from sklearn.ensemble import RandomForestClassifier
+
+        return RandomForestClassifier(
+            n_estimators=hyperparams["n_estimators"],
+            random_state=hyperparams["random_state"],
+            n_jobs=n_jobs,
+        )
+
+    def update(self, model, X, y, hyperparams, share):
+        # warm_start keeps the existing trees and fits only the added ones,
+        # in proportion to the new rows
+        if len(np.unique(y)) < len(model.classes_):
+            raise ValueError("The appended rows must contain every target class")
+        extra = max(1, round(hyperparams["n_estimators"] * share))
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + extra)
+        model.fit(X, y)
+        model.set_params(warm_start=False)
+        return model
+
+
+class HistGradientBoostingBackend(ModelBackend):
+    name = "hist_gradient_boosting"
+    needs_scaling = False
+    # Categoricals and missing values are handled natively
+    needs_one_hot = False
+    handles_missing = True
+    default_params = {"max_iter": 100, "learning_rate": 0.1}
+    quick_params = {"max_iter": 30, "learning_rate": 0.2}
+
+    # Rows used to estimate permutation importances
+    IMPORTANCE_SAMPLE_ROWS = 2000
+
+    def build(self, hyperparams, n_jobs, categorical_features=None):
+        from sklearn.ensemble import HistGradientBoostingClassifier
+
+        # Uses OpenMP threads, which CpuBudget caps to n_jobs
+        return HistGradientBoostingClassifier(
+            max_iter=hyperparams["max_iter"],
+            learning_rate=hyperparams["learning_rate"],
+            categorical_features=(
+                categorical_features if any(categorical_features or []) else None
+            ),
+            random_state=hyperparams["random_state"],
+        )
+
+    def feature_importances(self, model, X, y, n_jobs=1):
+        from sklearn.inspection import permutation_importance
+
+        # No impurity-based importances; permute a sample of the test split
+        rows = min(len(X), self.IMPORTANCE_SAMPLE_ROWS)
+        sample = np.random.RandomState(0).choice(len(X), rows, replace=False)
+        result = permutation_importance(
+            model,
+            X.iloc[sample],
+            np.asarray(y)[sample],
+            n_repeats=3,
+            random_state=0,
+            n_jobs=n_jobs,
+        )
+        return result.importances_mean
+
+
+class SGDLogisticBackend(ModelBackend):
+    name = "logistic_regression"
+    default_params = {"alpha": 0.0001, "max_iter": 1000}
+    quick_params = {"max_iter": 50}
+    supports_update = True
+
+    def build(self, hyperparams, n_jobs, categorical_features=None):
+        from sklearn.linear_model import SGDClassifier
+
+        # Logistic loss trained with SGD, which supports partial_fit for
+        # out-of-core training
+        return SGDClassifier(
+            loss="log_loss",
+            alpha=hyperparams["alpha"],
+            max_iter=hyperparams["max_iter"],
+            random_state=hyperparams["random_state"],
+        )
+
+    def update(self, model, X, y, hyperparams, share):
+        # One SGD pass over the new rows, starting from the current weights
+        model.partial_fit(X, y, classes=model.classes_)
+        return model
+
+    def feature_importances(self, model, X, y, n_jobs=1):
+        # Features are standardized, so coefficient magnitudes are comparable
+        return np.abs(model.coef_).mean(axis=0)
+
+
+# Available backends by name
+BACKENDS = {
+    backend.name: backend
+    for backend in (
+        RandomForestBackend(),
+        HistGradientBoostingBackend(),
+        SGDLogisticBackend(),
+    )
+}
+
+DEFAULT_BACKEND = RandomForestBackend.name
+
+
+def get_backend(name):
+    """Return the backend registered under a name."""
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown model backend '{name}'. Choose one of: {', '.join(BACKENDS)}"
+        )
+    return BACKENDS[name]
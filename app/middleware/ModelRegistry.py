@@ -0,0 +1,165 @@
+import os
+import json
+import uuid
+import shutil
+import hashlib
+from sqlalchemy.exc import IntegrityError
+
+
+# Size of the blocks read while hashing a file
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path):
+    """Return the SHA-256 hex digest of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def version_hash(content_hash, delta_hashes=()):
+    """
+    Content hash of a dataset version: the upload followed by its deltas.
+
+    The first version keeps the hash of the upload itself.
+    """
+    if not delta_hashes:
+        return content_hash
+    payload = ":".join([content_hash, *delta_hashes])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(content_hash, target_column, hyperparams, columns=None):
+    """
+    Key of a trained model: dataset content, target column and hyperparameters.
+
+    :param columns: Column projection the model was trained on (None for all).
+    """
+    payload = json.dumps(
+        {
+            "content_hash": content_hash,
+            "target_column": target_column,
+            "hyperparams": hyperparams,
+            "columns": sorted(columns) if columns else None,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def directory_size(path):
+    """Total size in bytes of the files in a directory."""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+class ModelRegistry:
+    """
+    Persistent store of fitted churn models.
+
+    Each entry is a ``model_registry`` row plus a directory of joblib
+    artifacts (model and fitted Preprocessor). Entries are keyed by the
+    dataset content hash, target column and hyperparameters, and the least
+    recently used ones are evicted once the registry exceeds its entry count
+    or total size limits. An entry lists the datasets it was trained for or
+    served to; their owners may use it.
+    """
+
+    def __init__(self, artifact_folder, max_entries=50, max_bytes=2 * 1024**3):
+        self.artifact_folder = artifact_folder
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config["MODEL_ARTIFACT_FOLDER"],
+            max_entries=config["MODEL_REGISTRY_MAX_ENTRIES"],
+            max_bytes=config["MODEL_REGISTRY_MAX_BYTES"],
+        )
+
+    def lookup(self, cache_key, data_id=None):
+        """
+        Return the entry for a key (recording the hit), or None on a miss.
+
+        :param data_id: Dataset the model is looked up for; its owner may
+            then use the model, even if it was trained for another dataset
+            with the same content.
+        """
+        from app.models.RegistryModel import RegistryModel
+
+        entry = RegistryModel.find_by_key(cache_key)
+        if entry is None:
+            return None
+
+        # The artifacts may have been removed by hand
+        if not os.path.isdir(entry.artifact_dir):
+            entry.delete()
+            return None
+
+        entry.touch()
+        entry.add_dataset(data_id)
+        return entry
+
+    def register(self, churn_model, data_id, content_hash, cache_key):
+        """Save the artifacts of a trained model and record them in the registry."""
+        from app import db
+        from app.models.RegistryModel import RegistryModel
+
+        os.makedirs(self.artifact_folder, exist_ok=True)
+        artifact_dir = os.path.join(self.artifact_folder, cache_key)
+
+        # Write to a private directory first, so concurrent trainings of the
+        # same key never see half-written artifacts
+        tmp_dir = f"{artifact_dir}.{uuid.uuid4().hex}.tmp"
+        churn_model.save_artifacts(tmp_dir)
+        try:
+            os.rename(tmp_dir, artifact_dir)
+        except OSError:
+            # Another worker registered the same model first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        hyperparams = dict(churn_model.hyperparams)
+        if churn_model.sample_rows is not None:
+            # Size of a quick fit's sample, so a hit redraws the same rows
+            hyperparams["sample_rows"] = churn_model.sample_rows
+
+        entry = RegistryModel(
+            data_id=data_id,
+            cache_key=cache_key,
+            content_hash=content_hash,
+            target_column=churn_model.target_column,
+            hyperparams=hyperparams,
+            artifact_dir=artifact_dir,
+            size_bytes=directory_size(artifact_dir),
+        )
+        try:
+            entry.save()
+        except IntegrityError:
+            db.session.rollback()
+            entry = RegistryModel.find_by_key(cache_key)
+        entry.add_dataset(data_id)
+
+        self.evict()
+        return entry
+
+    def evict(self):
+        """Delete least recently used entries until the registry fits its limits."""
+        from app.models.RegistryModel import RegistryModel
+
+        entries = RegistryModel.least_recently_used()
+        total_bytes = sum(entry.size_bytes for entry in entries)
+
+        # Always keep the most recently used entry
+        for entry in entries[:-1]:
+            if len(entries) <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(entry.artifact_dir, ignore_errors=True)
+            total_bytes -= entry.size_bytes
+            entries = entries[1:]
+            entry.delete()
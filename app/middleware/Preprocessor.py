@@ -0,0 +1,335 @@
+import re
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.preprocessing import StandardScaler
+
+
+# Column names that suggest an identifier (CustomerID, CustomerId, RowNumber...)
+ID_NAME_PATTERN = re.compile(r"(id|number|no)$", re.IGNORECASE)
+
+
+class Preprocessor:
+    """
+    Fitted, serializable preprocessing of churn data.
+
+    ``fit`` types every column from the data itself:
+
+    - ID-like columns (all values unique: strings, or integers that are
+      increasing or named like an identifier) are dropped.
+    - Numeric and boolean columns are features as-is.
+    - Other columns with at most ``max_categories`` distinct values are
+      categorical; columns with more (e.g. free text) are ignored.
+
+    It then learns everything needed to turn raw rows into the feature
+    matrix: imputation values, the vocabulary of every categorical column,
+    the encoded column layout and (optionally) a scaler for the numeric
+    columns. ``transform`` writes any batch of rows straight into the
+    matrix, one column at a time, without intermediate DataFrames; training,
+    the registry and batch scoring all share it, so every path yields the
+    same features. ``partial_fit`` folds appended rows into the fitted
+    statistics (streaming mean/count merges) without changing the layout.
+
+    Categoricals become one column of category codes (ordinal for tree
+    models, native categories for gradient boosting), or with ``one_hot``
+    sparse one-hot columns, so memory stays linear in the rows however many
+    categories a dataset has.
+
+    :param target_column: Column to predict; never a feature.
+    :param one_hot: Sparse one-hot encode categoricals (dropping the first
+        level); the result is then a CSR matrix.
+    :param scale: Standardize the numeric columns.
+    :param fill_missing: Fill missing values with the column mean (numeric)
+        or mode (categorical); otherwise they are left as NaN.
+    :param max_categories: Highest number of distinct values of a
+        categorical column.
+    """
+
+    # Bump when the encoding changes, so cached models are retrained
+    VERSION = 3
+
+    def __init__(
+        self,
+        target_column,
+        one_hot=True,
+        scale=True,
+        fill_missing=True,
+        max_categories=100,
+    ):
+        self.target_column = target_column
+        self.one_hot = one_hot
+        self.scale = scale
+        self.fill_missing = fill_missing
+        self.max_categories = max_categories
+
+        # Fitted state
+        self.id_columns = []  # Identifier columns, dropped from the features
+        self.ignored_columns = []  # High-cardinality columns, not features
+        self.numeric_columns = []
+        self.categorical_columns = []
+        self.fill_values = {}  # Imputation value per raw column
+        self.counts = {}  # Non-missing rows behind each numeric mean
+        self.category_counts = {}  # Rows per vocabulary value
+        self.target_classes = None  # Sorted classes of a non-numeric target
+        self.n_rows = 0  # Rows the statistics were fitted on
+        self.vocabularies = {}  # Sorted categories per categorical column
+        self.feature_names = []  # Encoded column layout
+        self.scaler = None
+        self.fitted = False
+
+    @staticmethod
+    def is_id_like(values: pd.Series, n_unique):
+        """Whether every value of a column is unique and it looks like an identifier."""
+        if n_unique < 2 or n_unique != values.count():
+            return False
+        if pd.api.types.is_float_dtype(values) or pd.api.types.is_bool_dtype(values):
+            return False
+        if pd.api.types.is_integer_dtype(values):
+            # Plain integers may be unique by chance (e.g. on small files)
+            return values.is_monotonic_increasing or bool(
+                ID_NAME_PATTERN.search(str(values.name))
+            )
+        return True
+
+    def fit(self, frame: pd.DataFrame):
+        """
+        Type the columns and learn the layout, imputation values and vocabularies.
+
+        The scaler is fitted separately (fit_scaler) on the training split.
+        """
+        self.id_columns = []
+        self.ignored_columns = []
+        self.numeric_columns = []
+        self.categorical_columns = []
+        for col in frame.columns:
+            if col == self.target_column:
+                continue
+            values = frame[col]
+            if pd.api.types.is_bool_dtype(values):
+                self.numeric_columns.append(col)
+                continue
+
+            n_unique = values.nunique()
+            if self.is_id_like(values, n_unique):
+                self.id_columns.append(col)
+            elif pd.api.types.is_numeric_dtype(values):
+                self.numeric_columns.append(col)
+            elif n_unique <= self.max_categories:
+                self.categorical_columns.append(col)
+            else:
+                self.ignored_columns.append(col)
+
+        self.n_rows = len(frame)
+        self.fill_values = {}
+        self.counts = {}
+        for col in self.numeric_columns:
+            self.counts[col] = int(frame[col].count())
+            if self.fill_missing:
+                self.fill_values[col] = float(frame[col].mean())
+
+        self.vocabularies = {}
+        self.category_counts = {}
+        for col in self.categorical_columns:
+            value_counts = frame[col].value_counts(sort=False)
+            value_counts = value_counts[value_counts > 0]
+            self.vocabularies[col] = list(pd.Index(list(value_counts.index)).sort_values())
+            self.category_counts[col] = {
+                value: int(count) for value, count in value_counts.items()
+            }
+        self.update_modes()
+
+        target = frame[self.target_column]
+        self.target_classes = None
+        if not pd.api.types.is_numeric_dtype(target):
+            # Same codes as a LabelEncoder: the index in the sorted classes
+            classes = pd.Index(list(target.dropna().unique()))
+            self.target_classes = list(classes.sort_values())
+
+        self.feature_names = list(self.numeric_columns)
+        for col in self.categorical_columns:
+            if self.one_hot:
+                # Same names and order as pd.get_dummies(drop_first=True)
+                self.feature_names += [
+                    f"{col}_{level}" for level in self.vocabularies[col][1:]
+                ]
+            else:
+                self.feature_names.append(col)
+
+        self.scaler = None
+        self.fitted = True
+        return self
+
+    def update_modes(self):
+        """Recompute the categorical fill values from the category counts."""
+        if not self.fill_missing:
+            return
+        for col, value_counts in self.category_counts.items():
+            if value_counts:
+                self.fill_values[col] = max(value_counts, key=value_counts.get)
+
+    def partial_fit(self, frame: pd.DataFrame):
+        """
+        Fold appended rows into the fitted statistics.
+
+        Means are merged weighted by their non-missing counts and the
+        category counts (hence modes) are summed. The column layout and
+        vocabularies stay fixed, so a model trained on the earlier rows keeps
+        its columns; values outside the vocabulary are encoded as unknown.
+        The scaler is left as fitted. Merged fill values still change the
+        features of rows with missing values, so the preprocessing of a
+        trained model is not refitted this way (see
+        ChurnModel.preprocess_update).
+        """
+        if not self.fitted:
+            return self.fit(frame)
+
+        self.n_rows += len(frame)
+        for col in self.numeric_columns:
+            if col not in frame:
+                continue
+            count = int(frame[col].count())
+            if count == 0:
+                continue
+            previous = self.counts.get(col, 0)
+            if col in self.fill_values:
+                mean = float(frame[col].mean())
+                self.fill_values[col] += (mean - self.fill_values[col]) * count / (
+                    previous + count
+                )
+            self.counts[col] = previous + count
+
+        for col in self.categorical_columns:
+            if col not in frame:
+                continue
+            value_counts = self.category_counts[col]
+            for value, count in frame[col].value_counts(sort=False).items():
+                if count and value in value_counts:
+                    value_counts[value] += int(count)
+        self.update_modes()
+        return self
+
+    def encode_target(self, y):
+        """Encode the target column (class index for non-numeric targets)."""
+        if self.target_classes is None:
+            return np.asarray(y)
+        codes = pd.Categorical(y, categories=self.target_classes).codes
+        if (codes < 0).any():
+            raise ValueError(
+                f"Target column '{self.target_column}' has values not seen in training"
+            )
+        return np.asarray(codes, dtype=np.intp)
+
+    @property
+    def input_columns(self):
+        """Raw columns transform() reads."""
+        return self.numeric_columns + self.categorical_columns
+
+    @property
+    def categorical_mask(self):
+        """Which encoded columns hold category codes (without one-hot encoding)."""
+        if self.one_hot:
+            return [False] * len(self.feature_names)
+        categorical = set(self.categorical_columns)
+        return [name in categorical for name in self.feature_names]
+
+    def category_codes(self, frame, col):
+        """Vocabulary index of every row (hash lookup); -1 when unknown or missing."""
+        vocabulary = self.vocabularies[col]
+        n_rows = len(frame)
+        if col in frame:
+            codes = pd.Categorical(frame[col], categories=vocabulary).codes
+            missing = frame[col].isna().to_numpy()
+        else:
+            codes = np.full(n_rows, -1, dtype=np.int8)
+            missing = np.ones(n_rows, dtype=bool)
+        if col in self.fill_values and missing.any():
+            codes = np.where(missing, vocabulary.index(self.fill_values[col]), codes)
+        return np.asarray(codes, dtype=np.intp)
+
+    def encode(self, frame: pd.DataFrame, scale=True):
+        """
+        Feature matrix of raw rows, in a single pass.
+
+        Absent columns are treated as entirely missing; categories not in
+        the vocabulary get all-zero dummies (or a missing code).
+
+        :param scale: Apply the fitted scaler (if any) to the numeric columns.
+        :return: float32 NumPy array, or a CSR matrix with ``one_hot``.
+        """
+        if not self.fitted:
+            raise ValueError("Preprocessing not fitted")
+
+        n_rows = len(frame)
+        n_numeric = len(self.numeric_columns)
+        width = n_numeric if self.one_hot else len(self.feature_names)
+        X = np.empty((n_rows, width), dtype=np.float32)
+
+        for j, col in enumerate(self.numeric_columns):
+            if col in frame:
+                X[:, j] = frame[col].to_numpy(dtype=np.float32, na_value=np.nan)
+            else:
+                X[:, j] = np.nan
+            if col in self.fill_values:
+                missing = np.isnan(X[:, j])
+                if missing.any():
+                    X[missing, j] = self.fill_values[col]
+
+        if scale:
+            self.scale_numeric(X[:, :n_numeric])
+
+        if not self.one_hot:
+            for j, col in enumerate(self.categorical_columns, start=n_numeric):
+                codes = self.category_codes(frame, col)
+                X[:, j] = codes
+                X[codes < 0, j] = np.nan
+            return X
+
+        # Sparse one-hot block: one nonzero per row and categorical column
+        rows, cols = [], []
+        offset = 0
+        for col in self.categorical_columns:
+            codes = self.category_codes(frame, col)
+            present = np.flatnonzero(codes >= 1)
+            rows.append(present)
+            cols.append(offset + codes[present] - 1)
+            offset += len(self.vocabularies[col]) - 1
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.intp)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.intp)
+        dummies = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(n_rows, offset),
+        )
+        return sp.hstack([sp.csr_matrix(X), dummies], format="csr")
+
+    def numeric_block(self, X):
+        """Numeric (leading) columns of an encoded matrix, as a dense array."""
+        block = X[:, : len(self.numeric_columns)]
+        return block.toarray() if sp.issparse(block) else block
+
+    def fit_scaler(self, X):
+        """Fit the scaler on an encoded (training) matrix, if scaling is enabled."""
+        if self.scale and self.numeric_columns:
+            self.scaler = StandardScaler().fit(self.numeric_block(X))
+        return self
+
+    def scale_numeric(self, numeric):
+        """Standardize a dense block of numeric columns in place."""
+        if self.scaler is not None:
+            numeric -= self.scaler.mean_.astype(numeric.dtype)
+            numeric /= self.scaler.scale_.astype(numeric.dtype)
+        return numeric
+
+    def apply_scaler(self, X):
+        """Scale the numeric columns of a matrix encoded with ``scale=False``."""
+        if self.scaler is None:
+            return X
+        n_numeric = len(self.numeric_columns)
+        if sp.issparse(X):
+            numeric = self.scale_numeric(self.numeric_block(X))
+            return sp.hstack([sp.csr_matrix(numeric), X[:, n_numeric:]], format="csr")
+        self.scale_numeric(X[:, :n_numeric])
+        return X
+
+    def transform(self, frame: pd.DataFrame):
+        """Encode and scale raw rows exactly like the training data."""
+        return self.encode(frame)
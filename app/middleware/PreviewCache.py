@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+from app.middleware.Metrics import record_cache
+
+
+class PreviewCache:
+    """
+    In-process LRU cache of rendered dataset previews.
+
+    Entries are keyed by ``DataModel.id`` plus the kind and size of the
+    preview, so opening the preview screen again never touches the file.
+    Uploaded files are immutable, so entries only leave the cache by eviction
+    or when their dataset is deleted.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_render(self, data_id, kind, rows, render):
+        """
+        Return the cached preview, rendering and caching it on a miss.
+
+        :param data_id: ID of the DataModel the preview belongs to.
+        :param kind: Preview format, e.g. "html" or "json".
+        :param rows: Number of rows in the preview.
+        :param render: Callable producing the preview on a miss.
+        """
+        key = (data_id, kind, rows)
+        with self.lock:
+            hit = key in self.entries
+            if hit:
+                self.entries.move_to_end(key)
+                preview = self.entries[key]
+        record_cache("preview", hit)
+        if hit:
+            return preview
+
+        # Render outside the lock so slow files do not block other previews
+        preview = render()
+
+        with self.lock:
+            self.entries[key] = preview
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return preview
+
+    def invalidate(self, data_id):
+        """Drop every cached preview of a dataset."""
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == data_id]:
+                del self.entries[key]
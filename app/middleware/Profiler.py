@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler of one thread (e.g. the thread serving a request).
+
+    A background thread samples the target thread's Python stack every
+    ``interval`` seconds; the overhead is that of the sampling thread alone,
+    so the profiled code runs at (nearly) full speed. Stacks are counted in
+    the collapsed "frame;frame;frame count" format that flame graph tools
+    (flamegraph.pl, speedscope) read.
+
+    :param thread_id: Thread to sample (default: the calling thread).
+    :param interval: Seconds between samples.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                file_name = os.path.basename(code.co_filename)
+                stack.append(f"{code.co_name} ({file_name}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Sampled stacks in the collapsed flame graph format, most frequent first."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+    def save(self, folder, name):
+        """
+        Write the collapsed stacks to ``<folder>/<name>.folded``.
+
+        :return: Path of the file.
+        """
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{name}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        return path
@@ -0,0 +1,64 @@
+import time
+from flask import current_app, g, request
+from app.middleware.Metrics import METRICS
+from app.middleware.Profiler import SamplingProfiler
+
+
+class RequestMetrics:
+    """
+    Request hooks of a blueprint: latency of every request, and opt-in profiling.
+
+    Latencies are recorded in ``churn_http_request_duration_seconds`` by
+    endpoint (not path, so IDs in URLs do not create new series), method and
+    status.
+
+    With ``PROFILING_ENABLED``, a request with ``?profile=1`` or an
+    ``X-Profile: 1`` header is run under a SamplingProfiler; the collapsed
+    stacks are written to ``PROFILE_FOLDER`` and the file name is returned
+    in the ``X-Profile-File`` response header.
+    """
+
+    def __init__(self, blueprint):
+        blueprint.before_request(self.before_request)
+        blueprint.after_request(self.after_request)
+        blueprint.teardown_request(self.teardown_request)
+
+    @staticmethod
+    def wants_profile():
+        if not current_app.config.get("PROFILING_ENABLED"):
+            return False
+        return (
+            request.args.get("profile") == "1" or request.headers.get("X-Profile") == "1"
+        )
+
+    def before_request(self):
+        g.request_start = time.perf_counter()
+        if self.wants_profile():
+            g.profiler = SamplingProfiler(
+                interval=current_app.config["PROFILE_INTERVAL"]
+            ).start()
+
+    def after_request(self, response):
+        start = g.pop("request_start", None)
+        if start is not None:
+            METRICS.observe(
+                "churn_http_request_duration_seconds",
+                time.perf_counter() - start,
+                endpoint=request.endpoint or "unknown",
+                method=request.method,
+                status=response.status_code,
+            )
+
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.stop()
+            name = f"{int(time.time() * 1000)}_{request.endpoint}"
+            profiler.save(current_app.config["PROFILE_FOLDER"], name)
+            response.headers["X-Profile-File"] = f"{name}.folded"
+        return response
+
+    def teardown_request(self, error=None):
+        # A request that raised never reached after_request
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.stop()
@@ -0,0 +1,197 @@
+import os
+import json
+import uuid
+import threading
+from collections import OrderedDict
+import numpy as np
+from flask import current_app
+from app.middleware.Metrics import record_cache
+
+
+# Parts of a stored result a client can fetch
+PARTS = ("metrics", "charts", "predictions")
+
+# Guards the lazy creation of the per-app result store
+_store_lock = threading.Lock()
+
+
+def _json_value(value):
+    """A class label as a JSON-serializable value."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class ResultStore:
+    """
+    Results of churn runs, keyed by run (churn job) id.
+
+    Each run has a directory holding ``result.json`` (its metrics, the kinds
+    of its charts, whose PNGs ChartCache serves, and the layout of its
+    predictions) and the test-set predictions as two ``.npy`` arrays of
+    class codes, one byte per row for up to 256 classes. Results are read
+    in parts: the summary comes from an in-process LRU of ``result.json``
+    files, and predictions are sliced from the memory-mapped arrays, so
+    showing a run's metrics never reads its predictions. Results never
+    change once written.
+
+    :param folder: Directory of the run directories.
+    :param max_entries: Runs whose summary is kept in memory.
+    """
+
+    SUMMARY_FILE = "result.json"
+
+    def __init__(self, folder, max_entries=256):
+        self.folder = folder
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config["RESULT_STORE_FOLDER"],
+            max_entries=config["RESULT_CACHE_MAX_ENTRIES"],
+        )
+
+    def run_dir(self, run_id):
+        return os.path.join(self.folder, str(run_id))
+
+    def save(self, run_id, metrics, charts, actual, predicted, classes=None):
+        """
+        Store the result of a run.
+
+        :param metrics: JSON-serializable metrics and settings of the run.
+        :param charts: Kinds of the charts stored for the run.
+        :param actual: Target of the test rows (encoded as by the Preprocessor).
+        :param predicted: Predictions of the test rows, same encoding.
+        :param classes: Labels of the encoded target values, if it was
+            encoded (None for a numeric target).
+        """
+        run_dir = self.run_dir(run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        actual, predicted = np.asarray(actual), np.asarray(predicted)
+
+        # Both arrays as codes into the classes that occur in either
+        values, codes = np.unique(
+            np.concatenate([actual, predicted]), return_inverse=True
+        )
+        codes = codes.astype(np.min_scalar_type(max(len(values) - 1, 0)))
+        labels = [classes[int(v)] for v in values] if classes is not None else values
+        self._write_array(os.path.join(run_dir, "actual.npy"), codes[: len(actual)])
+        self._write_array(os.path.join(run_dir, "predicted.npy"), codes[len(actual) :])
+
+        # Written last: a result exists once its summary does
+        summary = {
+            "metrics": metrics,
+            "charts": list(charts),
+            "predictions": {
+                "rows": len(actual),
+                "classes": [_json_value(label) for label in labels],
+            },
+        }
+        self._write(
+            os.path.join(run_dir, self.SUMMARY_FILE),
+            json.dumps(summary).encode("utf-8"),
+        )
+        with self.lock:
+            self.entries.pop(run_id, None)
+
+    def summary(self, run_id):
+        """Return the parsed ``result.json`` of a run (cached), or None."""
+        with self.lock:
+            hit = run_id in self.entries
+            if hit:
+                self.entries.move_to_end(run_id)
+                summary = self.entries[run_id]
+        record_cache("result", hit)
+        if hit:
+            return summary
+
+        path = os.path.join(self.run_dir(run_id), self.SUMMARY_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            summary = json.load(f)
+
+        with self.lock:
+            self.entries[run_id] = summary
+            self.entries.move_to_end(run_id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return summary
+
+    def predictions(self, run_id, offset=0, limit=None):
+        """
+        Predictions of the test rows ``offset:offset + limit``.
+
+        Only those rows of the memory-mapped arrays are read.
+
+        :return: ``{"rows", "offset", "classes", "actual", "predicted"}``
+            with class codes into ``classes``, or None if the run has no result.
+        """
+        summary = self.summary(run_id)
+        if summary is None:
+            return None
+        rows = summary["predictions"]["rows"]
+        stop = rows if limit is None else min(rows, offset + limit)
+        start = min(offset, stop)
+        run_dir = self.run_dir(run_id)
+        actual = np.load(os.path.join(run_dir, "actual.npy"), mmap_mode="r")
+        predicted = np.load(os.path.join(run_dir, "predicted.npy"), mmap_mode="r")
+        return {
+            "rows": rows,
+            "offset": start,
+            "classes": summary["predictions"]["classes"],
+            "actual": actual[start:stop].tolist(),
+            "predicted": predicted[start:stop].tolist(),
+        }
+
+    def load(self, run_id, parts=PARTS, offset=0, limit=None):
+        """
+        Return the requested parts of a run's result.
+
+        :param parts: Names from PARTS.
+        :param offset: First prediction returned (with "predictions").
+        :param limit: Most predictions returned (None for all).
+        :return: ``{part: value}``, or None if the run has no result.
+        :raises ValueError: If a part is unknown.
+        """
+        unknown = [part for part in parts if part not in PARTS]
+        if unknown:
+            raise ValueError(
+                f"Unknown part '{unknown[0]}'. Choose from: {', '.join(PARTS)}"
+            )
+        summary = self.summary(run_id)
+        if summary is None:
+            return None
+
+        result = {}
+        for part in parts:
+            if part == "predictions":
+                result[part] = self.predictions(run_id, offset=offset, limit=limit)
+            else:
+                result[part] = summary[part]
+        return result
+
+    @staticmethod
+    def _write(path, content):
+        # Write to a private file first, so readers never see a half-written one
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _write_array(path, array):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(tmp_path, path)
+
+
+def get_result_store():
+    """Return the result store of the current app, creating it on first use."""
+    app = current_app._get_current_object()
+    with _store_lock:
+        if "result_store" not in app.extensions:
+            app.extensions["result_store"] = ResultStore.from_config(app.config)
+    return app.extensions["result_store"]
@@ -1,75 +1,216 @@
+import os
+import time
 import joblib
 import base64
+import numpy as np
 import pandas as pd
-import seaborn as sns
-from io import BytesIO
-import matplotlib
-
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+import scipy.sparse as sp
 from sklearn.metrics import accuracy_score
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
+from app.middleware import ChartCache, Evaluation
+from app.middleware.CpuBudget import CpuBudget
+from app.middleware.Metrics import record_rows, timed
+from app.middleware.ModelBackends import DEFAULT_BACKEND, get_backend
+from app.middleware.Preprocessor import Preprocessor
 
 
 class ChurnModel:
-    def __init__(self, data: pd.DataFrame, target_column: str):
+    # Train/test split configuration, shared by every backend
+    SPLIT_PARAMS = {"random_state": 42, "test_size": 0.2}
+
+    # Artifact file names inside a model's artifact directory
+    MODEL_FILE = "churn_model.pkl"
+    PREPROCESSOR_FILE = "preprocessor.pkl"
+
+    # Training modes: "full" fits on every row, "quick" on a stratified
+    # sample sized to a time budget, with the backend's lighter settings
+    MODES = ("full", "quick")
+    # Rows of the pilot fit that measures how fast a quick fit trains
+    PILOT_ROWS = 2000
+
+    # Evaluations: "holdout" scores the test split, "cross_validation" also
+    # runs stratified k-fold cross-validation on every row
+    EVALUATIONS = ("holdout", "cross_validation")
+    CV_FOLDS = 5
+
+    def __init__(
+        self,
+        data: pd.DataFrame = None,
+        target_column: str = None,
+        n_jobs=1,
+        backend=DEFAULT_BACKEND,
+        mode="full",
+        time_budget=5.0,
+    ):
         """
         Initialize the ChurnModel with data and the target column name.
 
-        :param data: Pandas DataFrame containing the dataset.
+        :param data: Pandas DataFrame containing the dataset. May be omitted
+            when the model is only loaded from artifacts to score new data.
         :param target_column: Name of the target column for churn prediction.
+        :param n_jobs: CPUs used to train and predict. Native thread pools
+            are capped to the same number, see CpuBudget.
+        :param backend: Name of the model backend, see ModelBackends.BACKENDS.
+        :param mode: "full" or "quick" (see MODES).
+        :param time_budget: Seconds a quick fit should take, roughly.
         """
         # print(
         # f"Initializing ChurnModel with data shape: {str(data.shape)} and target_column: {target_column}"
         # )
         self.data = data
         self.target_column = target_column
+        if mode not in self.MODES:
+            raise ValueError(
+                f"Unknown mode '{mode}'. Choose one of: {', '.join(self.MODES)}"
+            )
+        self.backend = get_backend(backend)
+        self.mode = mode
+        self.time_budget = time_budget
+        self.hyperparams = self.hyperparams_for(backend, mode)
+        self.n_jobs = n_jobs  # Not a hyperparameter: results do not depend on it
         self.model = None
-        self.scaler = None
+        self.preprocessor = None  # Fitted Preprocessor, shared with inference
+        self.feature_columns = None  # Encoded column layout of the features
+        self.training_rows = None  # Rows used for training (and testing)
+        # Rows of a quick fit's sample; set before preprocessing to redraw
+        # the sample of a registered model instead of timing a new one
+        self.sample_rows = None
+        self.features = None  # StoredFeatures the splits are mapped from
+        self.rows_before_update = None  # Rows behind a model being updated
+        self.y_pred = None
         self.X_train, self.X_test, self.y_train, self.y_test = (None, None, None, None)
 
         # Validate target column
-        if self.target_column not in self.data.columns:
+        if self.data is not None and self.target_column not in self.data.columns:
             # print(f"Target column '{self.target_column}' not found in the dataset.")
             raise ValueError(
                 f"Target column '{self.target_column}' not found in the dataset"
             )
 
-    def preprocess_data(self):
-        """Preprocess the dataset: encode, scale, and split."""
-        # Drop unnecessary columns
-        self.data = self.data.drop(
-            columns=[
-                col
-                for col in ["RowNumber", "CustomerId", "Surname"]
-                if col in self.data
-            ],
-            errors="ignore",
+    @classmethod
+    def hyperparams_for(cls, backend=DEFAULT_BACKEND, mode="full"):
+        """Training configuration of a backend; part of the model registry cache key."""
+        model_backend = get_backend(backend)
+        params = {"backend": backend, "mode": mode, **model_backend.default_params}
+        if mode == "quick":
+            params.update(model_backend.quick_params)
+        return {
+            **params,
+            **cls.SPLIT_PARAMS,
+            "preprocessing": Preprocessor.VERSION,
+        }
+
+    @classmethod
+    def preprocessing_for(cls, backend=DEFAULT_BACKEND):
+        """
+        Preprocessing configuration of a backend, split included.
+
+        Backends with the same configuration produce identical features;
+        it keys the FeatureStore.
+        """
+        model_backend = get_backend(backend)
+        return {
+            "version": Preprocessor.VERSION,
+            "one_hot": model_backend.needs_one_hot,
+            "scale": model_backend.needs_scaling,
+            "fill_missing": not model_backend.handles_missing,
+            **cls.SPLIT_PARAMS,
+        }
+
+    def make_preprocessor(self):
+        """Unfitted Preprocessor configured for the backend."""
+        return Preprocessor(
+            self.target_column,
+            one_hot=self.backend.needs_one_hot,
+            scale=self.backend.needs_scaling,
+            fill_missing=not self.backend.handles_missing,
         )
 
-        # Fill missing values for numerical columns
-        self.data = self.data.fillna(self.data.select_dtypes(include="number").mean())
+    def stratified_sample(self, frame, rows):
+        """
+        A sample of ``rows`` rows with the class balance of the target.
 
-        # Fill missing values for categorical columns with the mode
-        if "Region" in self.data.columns:
-            self.data["Region"] = self.data["Region"].fillna(
-                self.data["Region"].mode()[0]
-            )
-        if "Gender" in self.data.columns:
-            self.data["Gender"] = self.data["Gender"].fillna(
-                self.data["Gender"].mode()[0]
-            )
+        Every class contributes its share of the rows (at least one), drawn
+        without replacement; only the class codes and the chosen row
+        positions are materialized.
+        """
+        codes, _ = pd.factorize(frame[self.target_column])
+        counts = np.bincount(codes[codes >= 0])
+        shares = np.maximum(1, np.round(counts * rows / len(frame)).astype(int))
+
+        rng = np.random.default_rng(self.hyperparams["random_state"])
+        index = np.concatenate(
+            [
+                rng.choice(np.flatnonzero(codes == code), share, replace=False)
+                for code, share in enumerate(np.minimum(shares, counts))
+            ]
+        )
+        # Keep the file order, so the sample reads like the original
+        return frame.iloc[np.sort(index)].reset_index(drop=True)
 
-        # One-hot encode categorical columns
-        self.data = pd.get_dummies(
-            self.data, columns=["Region", "Gender"], drop_first=True
+    def quick_sample_rows(self):
+        """
+        Rows a quick fit can train on within the time budget.
+
+        Times encoding and fitting a pilot sample and assumes both grow
+        linearly with the rows; half the budget is left for the rest of the
+        pipeline (loading, scoring, charts).
+        """
+        n_rows = len(self.data)
+        if n_rows <= self.PILOT_ROWS:
+            return n_rows
+
+        pilot = self.stratified_sample(self.data, self.PILOT_ROWS)
+        preprocessor = self.make_preprocessor().fit(pilot)
+        y = preprocessor.encode_target(pilot[self.target_column])
+        model = self.backend.build(
+            self.hyperparams,
+            self.n_jobs,
+            categorical_features=preprocessor.categorical_mask,
         )
+        start = time.perf_counter()
+        X = preprocessor.encode(pilot)
+        with CpuBudget(self.n_jobs):
+            model.fit(X, y)
+        seconds_per_row = (time.perf_counter() - start) / len(pilot)
+
+        rows = int(self.time_budget * 0.5 / seconds_per_row)
+        return min(n_rows, max(self.PILOT_ROWS, rows))
+
+    def sample_data(self):
+        """
+        Replace the data by a stratified sample that trains within the time budget.
+
+        The sample is seeded, so a known ``sample_rows`` draws the same rows
+        (and the same train/test split) again.
+        """
+        if self.sample_rows is None:
+            self.sample_rows = self.quick_sample_rows()
+        if self.sample_rows < len(self.data):
+            self.data = self.stratified_sample(self.data, self.sample_rows)
+
+    @timed("model.preprocess")
+    def preprocess_data(self):
+        """
+        Preprocess the dataset: encode, scale, and split.
+
+        Fits the Preprocessor (unless one was loaded with the model), which
+        types the columns from the data, encodes the whole frame into one
+        float32 matrix (sparse for one-hot encoded backends) and splits its
+        rows; the scaler is fitted on the training rows only. Filling,
+        one-hot encoding and scaling are skipped when the backend does not
+        need them. A quick fit first replaces the data by a stratified sample.
+        """
+        if self.mode == "quick":
+            self.sample_data()
+        self.training_rows = len(self.data)
+        self.features = None
+
+        if self.preprocessor is None:
+            self.preprocessor = self.make_preprocessor().fit(self.data)
+        self.feature_columns = self.preprocessor.feature_names
 
         # Split into features (X) and target (y)
-        X = self.data.drop(self.target_column, axis=1)
         y = self.data[self.target_column]
 
         # Check for nulls in the target column
@@ -78,122 +219,318 @@ class ChurnModel:
                 f"Target column '{self.target_column}' contains null values"
             )
 
-        # Encode target column if necessary
-        if y.dtype == "object":
-            le = LabelEncoder()
-            y = le.fit_transform(y)
+        y = self.preprocessor.encode_target(y)
 
-        # Ensure only numerical columns are passed to the scaler
-        numeric_features = X.select_dtypes(include=["float64", "int64"]).columns
-        X = X[numeric_features]
+        X = self.preprocessor.encode(self.data, scale=False)
 
         # Split into training and test sets
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
+        X_train, X_test, self.y_train, self.y_test = train_test_split(
+            X,
+            y,
+            test_size=self.hyperparams["test_size"],
+            random_state=self.hyperparams["random_state"],
         )
+        del X
+
+        # Standardize features in place; a loaded scaler is reused as-is
+        if self.preprocessor.scale and self.preprocessor.scaler is None:
+            self.preprocessor.fit_scaler(X_train)
+        X_train = self.preprocessor.apply_scaler(X_train)
+        X_test = self.preprocessor.apply_scaler(X_test)
+
+        self.set_features(X_train, X_test)
+
+    def set_features(self, X_train, X_test):
+        """Use encoded training and test matrices as the model's features."""
+        # Keep the feature names (wrapping the arrays does not copy them);
+        # sparse matrices are used as they are
+        if sp.issparse(X_train):
+            self.X_train, self.X_test = X_train, X_test
+        else:
+            self.X_train = pd.DataFrame(X_train, columns=self.feature_columns)
+            self.X_test = pd.DataFrame(X_test, columns=self.feature_columns)
+
+    def load_features(self, features):
+        """
+        Use features preprocessed earlier instead of running preprocess_data().
 
-        # Standardize features (keep them as DataFrames)
-        self.scaler = StandardScaler()
-        self.X_train = pd.DataFrame(
-            self.scaler.fit_transform(self.X_train), columns=X.columns
-        )
-        self.X_test = pd.DataFrame(
-            self.scaler.transform(self.X_test), columns=X.columns
+        :param features: StoredFeatures of this dataset (see FeatureStore);
+            its memory-mapped splits are used without copying them. A
+            preprocessor loaded with the model is kept, otherwise the one
+            the features were encoded with is used.
+        """
+        if self.preprocessor is None:
+            self.preprocessor = features.preprocessor
+        self.features = features
+        self.feature_columns = self.preprocessor.feature_names
+        self.training_rows = features.n_rows
+        X_train, X_test, self.y_train, self.y_test = features.split()
+        self.set_features(X_train, X_test)
+        self.y_pred = None
+
+    @timed("model.preprocess_update")
+    def preprocess_update(self):
+        """
+        Preprocess appended rows for an incremental update of a loaded model.
+
+        ``data`` holds only the new rows. They are encoded with the model's
+        fitted preprocessing, unchanged, and split like in preprocess_data(),
+        so the update and its evaluation only ever touch the new rows. The
+        imputation values and scaler stay frozen: refitting them would move
+        the features of the rows the model already learned from, under
+        weights that do not follow.
+        """
+        if self.model is None or self.preprocessor is None:
+            raise ValueError("Load a trained model before updating it")
+
+        self.training_rows = len(self.data)
+        self.features = None
+        self.rows_before_update = self.preprocessor.n_rows
+        self.preprocessor.n_rows += self.training_rows
+        self.feature_columns = self.preprocessor.feature_names
+
+        y = self.data[self.target_column]
+        if y.isnull().any():
+            raise ValueError(
+                f"Target column '{self.target_column}' contains null values"
+            )
+        y = self.preprocessor.encode_target(y)
+        X = self.preprocessor.encode(self.data, scale=False)
+
+        X_train, X_test, self.y_train, self.y_test = train_test_split(
+            X,
+            y,
+            test_size=self.hyperparams["test_size"],
+            random_state=self.hyperparams["random_state"],
         )
+        del X
+
+        X_train = self.preprocessor.apply_scaler(X_train)
+        X_test = self.preprocessor.apply_scaler(X_test)
+        self.set_features(X_train, X_test)
 
+    @timed("model.update")
+    def update_model(self):
+        """Update the loaded model with the appended rows (see preprocess_update)."""
+        if self.X_train is None or self.y_train is None:
+            raise ValueError("Data not preprocessed")
+        if not self.backend.supports_update:
+            raise ValueError(
+                f"The {self.backend.name} backend cannot be updated incrementally"
+            )
+
+        # Share of the new rows in the data the model has seen
+        share = self.training_rows / max(1, self.rows_before_update)
+        with CpuBudget(self.n_jobs):
+            self.model = self.backend.update(
+                self.model, self.X_train, self.y_train, self.hyperparams, share
+            )
+        self.y_pred = None  # Predictions of the previous model are stale
+        record_rows("update", self.X_train.shape[0])
+
+    @timed("model.train")
     def train_model(self):
-        """Train a Random Forest classifier on the preprocessed data."""
+        """Train the backend's classifier on the preprocessed data."""
         if self.X_train is None or self.y_train is None:
             # print("Data not preprocessed. Please run preprocess_data() first.")
             raise ValueError("Data not preprocessed")
 
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.model.fit(self.X_train, self.y_train)
+        self.model = self.backend.build(
+            self.hyperparams,
+            self.n_jobs,
+            categorical_features=self.preprocessor.categorical_mask,
+        )
+        with CpuBudget(self.n_jobs):
+            self.model.fit(self.X_train, self.y_train)
+        self.y_pred = None  # Predictions of a previous model are stale
+        record_rows("train", self.X_train.shape[0])
         # print("Model training completed.")
 
+    @timed("model.predict")
     def predict(self):
-        """Make predictions on the test set."""
+        """Make predictions on the test set (computed once and cached)."""
         if self.model is None:
             # print("Model not trained. Please run train_model() first.")
             raise ValueError("Model not trained")
-        return self.model.predict(self.X_test)
+        if self.y_pred is None:
+            with CpuBudget(self.n_jobs):
+                self.y_pred = self.model.predict(self.X_test)
+        return self.y_pred
 
+    @timed("model.evaluate")
     def evaluate_model(self):
         """Evaluate the model's performance on the test set."""
         if self.model is None:
             # print("Model not trained. Please run train_model() first.")
             raise ValueError("Model not trained")
 
-        y_pred = self.model.predict(self.X_test)
-        accuracy = accuracy_score(self.y_test, y_pred)
+        # Reuse the cached test-set predictions instead of predicting again
+        accuracy = accuracy_score(self.y_test, self.predict())
         # print(f"Model Accuracy: {accuracy * 100:.2f}%")
         return accuracy
 
-    def save_artifacts(self, model_path="churn_model.pkl", scaler_path="scaler.pkl"):
+    def cross_validate(self, folds=CV_FOLDS):
         """
-        Save the trained model and scaler to disk.
+        Stratified k-fold cross-validation of the backend on the loaded rows.
+
+        Every fold preprocesses its rows afresh, fitted on its training rows
+        only, and folds run in parallel processes within ``n_jobs``, see
+        Evaluation.cross_validate.
 
-        :param model_path: File path to save the model.
-        :param scaler_path: File path to save the scaler.
+        :return: ROC-AUC, PR-AUC, precision/recall at thresholds and the
+            confusion matrix of the out-of-fold predictions.
+        """
+        if self.preprocessor is None:
+            raise ValueError("Data not preprocessed")
+        y = self.preprocessor.encode_target(self.data[self.target_column])
+        # Every fold must hold every class
+        smallest_class = np.bincount(np.unique(y, return_inverse=True)[1]).min()
+        if smallest_class < folds:
+            raise ValueError(
+                f"Cross-validation needs at least {folds} rows of every target class"
+            )
+        return Evaluation.cross_validate(
+            self.backend,
+            self.hyperparams,
+            self.data,
+            y,
+            self.make_preprocessor(),
+            folds=folds,
+            n_jobs=self.n_jobs,
+        )
+
+    def save_artifacts(self, artifact_dir):
+        """
+        Save the trained model and its fitted preprocessing to disk.
+
+        :param artifact_dir: Directory to write the artifacts to.
         """
         if self.model is None:
             # print("Model not trained. Please run train_model() first.")
             raise ValueError("Model not trained")
 
-        joblib.dump(self.model, model_path)
-        joblib.dump(self.scaler, scaler_path)
-        # print(f"Model saved to {model_path}")
-        # print(f"Scaler saved to {scaler_path}")
-
-    def generate_pie_chart(self):
-        """Generate a pie chart for the target column."""
-        churn_counts = self.data[self.target_column].value_counts()
-        plt.figure(figsize=(6, 6))
-        churn_counts.plot.pie(
-            autopct="%1.1f%%", startangle=90, colors=["#ff9999", "#66b3ff"]
+        os.makedirs(artifact_dir, exist_ok=True)
+        joblib.dump(self.model, os.path.join(artifact_dir, self.MODEL_FILE))
+        joblib.dump(
+            self.preprocessor, os.path.join(artifact_dir, self.PREPROCESSOR_FILE)
         )
-        plt.title("Churn Distribution")
-        plt.ylabel("")  # Hide the y-label
 
-        # Convert plot to PNG image
-        img = BytesIO()
-        plt.savefig(img, format="png")
-        img.seek(0)
-        return base64.b64encode(img.getvalue()).decode("utf-8")
+    def load_artifacts(self, artifact_dir):
+        """
+        Load a trained model and its fitted preprocessing from disk.
+
+        Call before preprocess_data() so the data is encoded and scaled exactly
+        as it was for training; train_model() is then unnecessary. The
+        ChurnModel must use the backend the model was trained with.
 
-    def generate_histogram(self):
-        """Generate a histogram for feature distribution."""
-        plt.figure(figsize=(8, 6))
-        self.data[self.target_column].hist(bins=30, color="#66b3ff", edgecolor="black")
-        plt.title(f"Distribution of {self.target_column}")
-        plt.xlabel(self.target_column)
-        plt.ylabel("Frequency")
-
-        # Convert plot to PNG image
-        img = BytesIO()
-        plt.savefig(img, format="png")
-        img.seek(0)
-        return base64.b64encode(img.getvalue()).decode("utf-8")
+        :param artifact_dir: Directory written by save_artifacts().
+        """
+        preprocessor_path = os.path.join(artifact_dir, self.PREPROCESSOR_FILE)
+        if not os.path.exists(preprocessor_path):
+            raise ValueError(
+                "Model artifacts predate the preprocessing pipeline; retrain the model"
+            )
+        self.model = joblib.load(os.path.join(artifact_dir, self.MODEL_FILE))
+        # The stored model keeps the n_jobs it was trained with
+        if "n_jobs" in self.model.get_params():
+            self.model.set_params(n_jobs=self.n_jobs)
+        self.preprocessor = joblib.load(preprocessor_path)
+        self.feature_columns = self.preprocessor.feature_names
+        self.y_pred = None
+
+    def transform(self, frame: pd.DataFrame):
+        """
+        Encode and scale new rows exactly like the training data.
 
-    def generate_feature_importance_chart(self):
-        """Generate a feature importance chart from the trained model."""
+        :param frame: DataFrame with the raw columns of the training file;
+            any slice of a file (e.g. a chunk) yields the same features.
+        :return: float32 feature matrix (NumPy array, or CSR matrix for
+            one-hot encoded backends).
+        """
+        if self.preprocessor is None:
+            raise ValueError("Preprocessing not fitted")
+        return self.preprocessor.transform(frame)
+
+    @timed("model.predict_proba")
+    def predict_proba(self, frame: pd.DataFrame):
+        """
+        Churn probability (probability of the positive class) of new rows.
+
+        :param frame: DataFrame with the raw columns of the training file.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained")
+        # Keep the feature names the model was fitted with
+        X = self.transform(frame)
+        if not sp.issparse(X):
+            X = pd.DataFrame(X, columns=self.feature_columns)
+        with CpuBudget(self.n_jobs):
+            probabilities = self.model.predict_proba(X)[:, -1]
+        record_rows("score", X.shape[0])
+        return probabilities
+
+    def pie_chart_data(self):
+        """Class counts of the target column."""
+        churn_counts = self.data[self.target_column].value_counts()
+        return {
+            "labels": [str(label) for label in churn_counts.index],
+            "counts": churn_counts.tolist(),
+        }
+
+    def histogram_data(self, bins=30):
+        """Binned distribution of the target column."""
+        values = self.data[self.target_column]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.astype("category").cat.codes
+        counts, edges = np.histogram(values, bins=bins)
+        return {
+            "column": self.target_column,
+            "counts": counts.tolist(),
+            "edges": edges.tolist(),
+        }
+
+    def feature_importance_data(self):
+        """Importance of every feature of the trained model."""
         if self.model is None:
             raise ValueError("Model not trained. Please run train_model() first.")
 
-        importances = self.model.feature_importances_
-        feature_names = self.X_train.columns
+        with CpuBudget(self.n_jobs):
+            importances = self.backend.feature_importances(
+                self.model, self.X_test, self.y_test, n_jobs=self.n_jobs
+            )
+        return {
+            "features": list(self.feature_columns),
+            "importances": [float(value) for value in importances],
+        }
+
+    @timed("model.chart_data")
+    def chart_data(self):
+        """
+        JSON-serializable inputs of every chart.
 
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x=importances, y=feature_names, palette="viridis")
-        plt.title("Feature Importance")
-        plt.xlabel("Importance")
-        plt.ylabel("Features")
+        They are a few kilobytes at most, so they can be stored with a run and
+        the charts rendered later, only when someone opens them (see ChartCache).
+        """
+        return {
+            "pie_chart": self.pie_chart_data(),
+            "histogram": self.histogram_data(),
+            "feature_importance": self.feature_importance_data(),
+        }
 
-        # Convert plot to PNG image
-        img = BytesIO()
-        plt.savefig(img, format="png")
-        img.seek(0)
-        return base64.b64encode(img.getvalue()).decode("utf-8")
+    def generate_pie_chart(self):
+        """Generate a pie chart for the target column."""
+        png = ChartCache.render_pie_chart(self.pie_chart_data())
+        return base64.b64encode(png).decode("utf-8")
+
+    def generate_histogram(self):
+        """Generate a histogram for feature distribution."""
+        png = ChartCache.render_histogram(self.histogram_data())
+        return base64.b64encode(png).decode("utf-8")
+
+    def generate_feature_importance_chart(self):
+        """Generate a feature importance chart from the trained model."""
+        png = ChartCache.render_feature_importance(self.feature_importance_data())
+        return base64.b64encode(png).decode("utf-8")
 
     def generate_prediction_table(self):
         """Generate a table of predictions alongside actual values."""
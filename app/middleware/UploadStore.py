@@ -0,0 +1,279 @@
+import os
+import uuid
+import shutil
+import hashlib
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+
+
+# Size of the blocks copied from streams that were not written by HashingFile
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# File types the churn pipeline reads
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx")
+
+
+def is_supported(file_path):
+    """Whether the churn pipeline can read the given file type."""
+    return file_path.endswith(SUPPORTED_EXTENSIONS)
+
+
+class HashingFile:
+    """
+    Temporary upload file that hashes and measures the bytes written to it.
+
+    The multipart parser writes each uploaded file straight into one of these
+    (see UploadRequest), so a file is written to disk once and its SHA-256 is
+    known when the upload ends, without reading it back. Writing more than
+    ``max_bytes`` aborts the upload. The file is removed on close unless
+    UploadStore took it over.
+    """
+
+    def __init__(self, folder, max_bytes=None):
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f".upload-{uuid.uuid4().hex}.tmp")
+        self.file = open(self.path, "w+b")
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.max_bytes = max_bytes
+        self.kept = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise RequestEntityTooLarge()
+        self.digest.update(data)
+        return self.file.write(data)
+
+    def keep(self):
+        """Close the file and hand it over; the caller now owns ``path``."""
+        self.file.close()
+        self.kept = True
+        return self.path, self.digest.hexdigest(), self.size
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+        if not self.kept and os.path.exists(self.path):
+            os.remove(self.path)
+
+    # The parser and FileStorage also read, seek and flush the stream
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+class UploadRequest(Request):
+    """Request whose uploaded files are streamed into HashingFiles in the upload folder."""
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        return HashingFile(
+            current_app.config["UPLOAD_FOLDER"],
+            max_bytes=current_app.config.get("MAX_CONTENT_LENGTH"),
+        )
+
+
+class UploadStore:
+    """
+    Content-addressed store of uploaded files.
+
+    Files are named after the SHA-256 of their content (plus the original
+    extension, which tells the readers the format), so byte-identical uploads
+    share one file on disk and any name clash between different uploads is
+    impossible. Files are never overwritten: the first copy stays and later
+    identical ones are discarded.
+
+    :param folder: Directory of the stored files.
+    :param max_bytes: Largest accepted file (None for no limit).
+    """
+
+    def __init__(self, folder, max_bytes=None):
+        self.folder = folder
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["UPLOAD_FOLDER"], max_bytes=config.get("MAX_CONTENT_LENGTH"))
+
+    def store(self, file_storage, filename):
+        """
+        Move an uploaded file to its content-addressed path.
+
+        :param file_storage: The werkzeug FileStorage of the upload.
+        :param filename: Secured original file name (for the extension).
+        :return: ``{"file_path", "content_hash", "size", "deduplicated"}``;
+            ``deduplicated`` is True when an identical file was stored already.
+        """
+        stream = file_storage.stream
+        if isinstance(stream, HashingFile):
+            tmp_path, content_hash, size = stream.keep()
+        else:
+            tmp_path, content_hash, size = self._copy(stream)
+        return self.place(tmp_path, content_hash, size, filename)
+
+    def place(self, tmp_path, content_hash, size, filename):
+        """
+        Move a complete file (on the same filesystem) to its content-addressed path.
+
+        :return: See store().
+        """
+        extension = os.path.splitext(filename)[1].lower()
+        file_path = os.path.join(self.folder, f"{content_hash}{extension}")
+        deduplicated = os.path.exists(file_path)
+        if deduplicated:
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, file_path)
+        return {
+            "file_path": file_path,
+            "content_hash": content_hash,
+            "size": size,
+            "deduplicated": deduplicated,
+        }
+
+    def _copy(self, stream):
+        # Streams from another source are copied in fixed-size chunks, hashed
+        # on the way
+        target = HashingFile(self.folder, max_bytes=self.max_bytes)
+        try:
+            for chunk in iter(lambda: stream.read(COPY_CHUNK_SIZE), b""):
+                target.write(chunk)
+            return target.keep()
+        finally:
+            target.close()
+
+
+class ChunkedUploadStore:
+    """
+    Disk side of resumable uploads (see UploadSessionModel).
+
+    Each session has a directory under ``<upload folder>/.sessions`` with a
+    ``data`` file of the final size, which every chunk is written into at its
+    own offset, so chunks may arrive in any order, in parallel and more than
+    once. A chunk is streamed to a private spool file and verified against
+    its SHA-256 before it is copied to its offset (so it is never held in
+    memory, and a corrupt retry never overwrites good bytes), and recorded
+    by a marker file (holding that checksum) only once its bytes are on
+    disk: after an interruption the markers tell exactly which chunks are
+    still missing. Assembling is then a single hashing pass and a rename.
+    """
+
+    SESSIONS_DIR = ".sessions"
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["UPLOAD_FOLDER"])
+
+    def session_dir(self, session):
+        return os.path.join(self.folder, self.SESSIONS_DIR, session.id)
+
+    def data_path(self, session):
+        return os.path.join(self.session_dir(session), "data")
+
+    def chunks_dir(self, session):
+        return os.path.join(self.session_dir(session), "chunks")
+
+    def create(self, session):
+        """Create the session's directory and its (sparse) data file."""
+        os.makedirs(self.chunks_dir(session), exist_ok=True)
+        with open(self.data_path(session), "wb") as f:
+            f.truncate(session.size)
+
+    def check_chunk(self, session, index, length):
+        """
+        Validate the index and declared length of a chunk, before reading it.
+
+        :raises ValueError: If the index or length is wrong.
+        """
+        if not 0 <= index < session.total_chunks:
+            raise ValueError(
+                f"Chunk index must be between 0 and {session.total_chunks - 1}"
+            )
+        expected = session.chunk_length(index)
+        if length != expected:
+            raise ValueError(f"Chunk {index} must be {expected} bytes, got {length}")
+
+    def write_chunk(self, session, index, stream, checksum, length):
+        """
+        Stream a chunk to disk, verify it and write it at its offset.
+
+        :param stream: Binary stream of the chunk, e.g. ``request.stream``.
+        :param checksum: Hex SHA-256 of the chunk, as sent by the client.
+        :param length: Length of the chunk declared by the client
+            (Content-Length); at most this many bytes are read.
+        :raises ValueError: If the index, length or checksum is wrong.
+        """
+        self.check_chunk(session, index, length)
+
+        spool_path = os.path.join(
+            self.chunks_dir(session), f"{index}.{uuid.uuid4().hex}.part"
+        )
+        try:
+            digest = hashlib.sha256()
+            received = 0
+            with open(spool_path, "wb") as f:
+                while received < length:
+                    block = stream.read(min(COPY_CHUNK_SIZE, length - received))
+                    if not block:
+                        break
+                    digest.update(block)
+                    f.write(block)
+                    received += len(block)
+            if received != length:
+                raise ValueError(f"Chunk {index} must be {length} bytes, got {received}")
+            if digest.hexdigest() != (checksum or "").lower():
+                raise ValueError(f"Checksum mismatch for chunk {index}")
+
+            with open(spool_path, "rb") as source, open(
+                self.data_path(session), "r+b"
+            ) as f:
+                f.seek(index * session.chunk_size)
+                shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+
+        # The marker appears atomically, after the data is durable
+        marker = os.path.join(self.chunks_dir(session), str(index))
+        tmp_path = f"{marker}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(checksum.lower())
+        os.replace(tmp_path, marker)
+
+    def received(self, session):
+        """Sorted indices of the chunks written so far."""
+        if not os.path.isdir(self.chunks_dir(session)):
+            return []
+        return sorted(
+            int(name) for name in os.listdir(self.chunks_dir(session)) if name.isdigit()
+        )
+
+    def missing(self, session):
+        received = set(self.received(session))
+        return [index for index in range(session.total_chunks) if index not in received]
+
+    def assemble(self, session):
+        """
+        Hash the complete data file and take it out of the session.
+
+        :return: ``(tmp_path, content_hash, size)`` for UploadStore.place().
+        """
+        digest = hashlib.sha256()
+        data_path = self.data_path(session)
+        with open(data_path, "rb") as f:
+            for block in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+                digest.update(block)
+        # Renamed out of the session directory, which discard() removes
+        tmp_path = os.path.join(self.folder, f".upload-{session.id}.tmp")
+        os.replace(data_path, tmp_path)
+        return tmp_path, digest.hexdigest(), session.size
+
+    def discard(self, session):
+        """Remove the session's directory and everything in it."""
+        shutil.rmtree(self.session_dir(session), ignore_errors=True)
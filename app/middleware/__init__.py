@@ -1,2 +1,11 @@
 # This file allows the directory to be treated as a Python package.
-from .TrainModel import ChurnModel
+
+
+# ChurnModel is imported on first access: TrainModel loads the ML and plotting
+# stacks, which most modules of the package (and the web process) never need
+def __getattr__(name):
+    if name == "ChurnModel":
+        from .TrainModel import ChurnModel
+
+        return ChurnModel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
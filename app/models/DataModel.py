@@ -1,5 +1,21 @@
+import json
+import base64
 from app import db
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.dialects import sqlite
+from app.models.UserModel import UserModel
+
+# SQLite stores CURRENT_TIMESTAMP as 'YYYY-MM-DD HH:MM:SS' text; bound
+# datetimes are written the same way, so comparisons with stored values
+# (keyset pagination on created_at) hold
+TIMESTAMP = db.DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d "
+        "%(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
 
 class DataModel(db.Model):
     __tablename__ = 'data'
@@ -7,35 +23,196 @@ class DataModel(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     file_name = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    # SHA-256 of the uploaded file; byte-identical uploads share one stored
+    # file (and its columnar copy), see UploadStore
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    size = db.Column(db.BigInteger, nullable=True)  # Bytes
+    # Columnar (Parquet) copy of the file and its inferred schema (JSON)
+    columnar_path = db.Column(db.String(255), nullable=True)
+    schema = db.Column(db.Text, nullable=True)
+    # Row count, dtypes and null counts of the file (JSON)
+    stats = db.Column(db.Text, nullable=True)
+    # Current version: 1 for the upload, +1 for every appended delta file
+    version = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(TIMESTAMP, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
 
-    def __init__(self, user_id, file_name, file_path):
+    # A user's datasets are listed newest first, served from this index
+    __table_args__ = (
+        db.Index('ix_data_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+    # Columns of a dataset listing, read without loading full rows
+    LISTING_COLUMNS = (
+        'id', 'file_name', 'file_path', 'user_id', 'size', 'version', 'created_at'
+    )
+
+    def __init__(self, user_id, file_name, file_path, content_hash=None, size=None):
         self.user_id = user_id
         self.file_name = file_name
         self.file_path = file_path
+        self.content_hash = content_hash
+        self.size = size
+        self.version = 1
 
     # Save data to the database
     def save(self):
         db.session.add(self)
         db.session.commit()
 
+    # Record the columnar copy of the file
+    def set_columnar(self, columnar_path, schema):
+        self.columnar_path = columnar_path
+        self.schema = json.dumps(schema)
+        self.save()
+
+    # Decoded schema of the file (None until the columnar copy exists)
+    def get_schema(self):
+        return json.loads(self.schema) if self.schema else None
+
+    # Record the dataset statistics
+    def set_stats(self, stats):
+        self.stats = json.dumps(stats)
+        self.save()
+
+    # Decoded dataset statistics (None until computed)
+    def get_stats(self):
+        return json.loads(self.stats) if self.stats else None
+
+    # Reader for the file, preferring its columnar copy; with appended delta
+    # files it reads the upload and every delta in order
+    def loader(self, **kwargs):
+        from app.middleware.DataLoader import DataLoader, MultiPartLoader
+
+        loader = DataLoader(
+            self.file_path,
+            columnar_path=self.columnar_path,
+            schema=self.get_schema(),
+            **kwargs,
+        )
+        if not self.versions:
+            return loader
+        deltas = [delta.loader(schema=loader.schema, **kwargs) for delta in self.versions]
+        return MultiPartLoader([loader] + deltas)
+
+    # Append a delta file as the next version of the dataset
+    def append_version(self, file_name, file_path, content_hash):
+        from app.models.DataVersionModel import DataVersionModel
+
+        delta = DataVersionModel(
+            data_id=self.id,
+            version=self.version + 1,
+            file_name=file_name,
+            file_path=file_path,
+            content_hash=content_hash,
+        )
+        self.version = delta.version
+        db.session.add(delta)
+        self.save()
+        return delta
+
     # Find all data for a user by user_id
     @classmethod
     def find_by_user_id(cls, user_id):
         return cls.query.filter_by(user_id=user_id).all()
 
+    # One page of a user's datasets, newest first, as plain rows of the
+    # LISTING_COLUMNS. Keyset pagination: the cursor is the (created_at, id)
+    # of the last row of the previous page, so every page is an index range
+    # scan however deep it is. Returns the rows and the next page's cursor
+    # (None on the last page)
+    @classmethod
+    def list_page(cls, user_id, limit, cursor=None):
+        columns = [getattr(cls, name) for name in cls.LISTING_COLUMNS]
+        query = db.session.query(*columns).filter(cls.user_id == user_id)
+        if cursor is not None:
+            created_at, data_id = cls.decode_cursor(cursor)
+            query = query.filter(
+                db.or_(
+                    cls.created_at < created_at,
+                    db.and_(cls.created_at == created_at, cls.id < data_id),
+                )
+            )
+        # One extra row tells whether there is a next page
+        rows = (
+            query.order_by(cls.created_at.desc(), cls.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = cls.encode_cursor(rows[-1].created_at, rows[-1].id)
+        return rows, next_cursor
+
+    # Opaque page cursor of a row
+    @staticmethod
+    def encode_cursor(created_at, data_id):
+        payload = json.dumps([created_at.isoformat(), data_id])
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    # (created_at, id) of a page cursor; raises ValueError if malformed
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            created_at, data_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return datetime.fromisoformat(created_at), int(data_id)
+        except (TypeError, ValueError, UnicodeError) as e:
+            raise ValueError('Invalid cursor') from e
+
+    # Data version and number of a user's datasets; the version changes
+    # whenever the listing does (see bump_data_version)
+    @classmethod
+    def listing_version(cls, user_id):
+        count = (
+            db.select(db.func.count(cls.id))
+            .where(cls.user_id == user_id)
+            .scalar_subquery()
+        )
+        row = (
+            db.session.query(UserModel.data_version, count)
+            .filter(UserModel.id == user_id)
+            .one_or_none()
+        )
+        return tuple(row) if row is not None else (None, 0)
+
     # find data by name
     @classmethod
     def find_by_name(cls, file_name):
         return cls.query.filter_by(file_name=file_name).all()
     
+    # Find an earlier upload of the same content, preferring one already
+    # converted to its columnar copy
+    @classmethod
+    def find_by_content_hash(cls, content_hash):
+        return (
+            cls.query.filter_by(content_hash=content_hash)
+            .order_by(cls.columnar_path.is_(None), cls.id)
+            .first()
+        )
+
     # Find data by ID
     @classmethod
     def find_by_id(cls, data_id):
-        return cls.query.get(data_id)
+        return db.session.get(cls, data_id)
 
     # Delete specific data
     def delete(self):
         db.session.delete(self)
         db.session.commit()
+
+
+# Every insert, update and delete of a dataset bumps its owner's data
+# version in the same flush, so changes within one second (the resolution
+# of updated_at) are told apart too
+@event.listens_for(DataModel, 'after_insert')
+@event.listens_for(DataModel, 'after_update')
+@event.listens_for(DataModel, 'after_delete')
+def bump_data_version(mapper, connection, target):
+    users = UserModel.__table__
+    connection.execute(
+        users.update()
+        .where(users.c.id == target.user_id)
+        # Not a change of the user itself
+        .values(data_version=users.c.data_version + 1, updated_at=users.c.updated_at)
+    )
@@ -0,0 +1,53 @@
+from app import db
+
+
+class DataVersionModel(db.Model):
+    __tablename__ = 'data_versions'
+    id = db.Column(db.Integer, primary_key=True)
+    data_id = db.Column(db.Integer, db.ForeignKey('data.id'), nullable=False, index=True)
+    # Version this delta file brings the dataset to (the original upload is 1)
+    version = db.Column(db.Integer, nullable=False)
+    file_name = db.Column(db.String(255), nullable=False)
+    file_path = db.Column(db.String(255), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    # Columnar (Parquet) copy of the delta file
+    columnar_path = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    # Relationship: A dataset has its appended delta files, oldest first
+    data = db.relationship(
+        'DataModel',
+        backref=db.backref('versions', lazy=True, order_by='DataVersionModel.version'),
+    )
+
+    __table_args__ = (db.UniqueConstraint('data_id', 'version'),)
+
+    def __init__(self, data_id, version, file_name, file_path, content_hash):
+        self.data_id = data_id
+        self.version = version
+        self.file_name = file_name
+        self.file_path = file_path
+        self.content_hash = content_hash
+
+    # Save delta to the database
+    def save(self):
+        db.session.add(self)
+        db.session.commit()
+
+    # Record the columnar copy of the delta file
+    def set_columnar(self, columnar_path):
+        self.columnar_path = columnar_path
+        self.save()
+
+    # Reader for the delta file, preferring its columnar copy
+    def loader(self, schema=None, **kwargs):
+        from app.middleware.DataLoader import DataLoader
+
+        return DataLoader(
+            self.file_path, columnar_path=self.columnar_path, schema=schema, **kwargs
+        )
+
+    # Find delta by dataset and version
+    @classmethod
+    def find_by_version(cls, data_id, version):
+        return cls.query.filter_by(data_id=data_id, version=version).first()
@@ -0,0 +1,112 @@
+import json
+from app import db
+
+
+class JobModel(db.Model):
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    data_id = db.Column(db.Integer, db.ForeignKey('data.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    kind = db.Column(db.String(50), nullable=False, default='churn')
+    # queued -> running -> completed | failed
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    stage = db.Column(db.String(50), nullable=True)
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    params = db.Column(db.Text, nullable=True)  # JSON encoded
+    result = db.Column(db.Text, nullable=True)  # JSON encoded
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    # Relationship: A dataset can have many jobs
+    data = db.relationship('DataModel', backref=db.backref('jobs', lazy=True))
+
+    def __init__(self, data_id, user_id=None, kind='churn', params=None):
+        self.data_id = data_id
+        self.user_id = user_id
+        self.kind = kind
+        self.status = 'queued'
+        self.progress = 0.0
+        self.params = json.dumps(params or {})
+
+    # Save job to the database
+    def save(self):
+        db.session.add(self)
+        db.session.commit()
+
+    # Decoded job parameters
+    def get_params(self):
+        return json.loads(self.params) if self.params else {}
+
+    # Decoded job result
+    def get_result(self):
+        return json.loads(self.result) if self.result else None
+
+    # Update the stage and progress of a running job
+    def set_stage(self, stage, progress):
+        self.status = 'running'
+        self.stage = stage
+        self.progress = progress
+        self.save()
+
+    # Mark the job as finished and store its result
+    def complete(self, result):
+        self.status = 'completed'
+        self.stage = None
+        self.progress = 1.0
+        self.result = json.dumps(result)
+        self.save()
+
+    # Mark the job as failed and store the error message
+    def fail(self, error):
+        self.status = 'failed'
+        self.error = str(error)
+        self.save()
+
+    # Convert the job to a JSON-friendly format
+    def to_dict(self, include_result=True):
+        job = {
+            "id": self.id,
+            "fileId": self.data_id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "error": self.error,
+            "createdAt": self.created_at.isoformat() if self.created_at else None,
+            "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
+        }
+        if include_result:
+            job["result"] = self.get_result()
+        return job
+
+    # Find job by ID
+    @classmethod
+    def find_by_id(cls, job_id):
+        return db.session.get(cls, job_id)
+
+    # Take a queued job for running. The conditional update is atomic, so of
+    # several processes claiming the same job exactly one gets True
+    @classmethod
+    def claim(cls, job_id):
+        claimed = cls.query.filter_by(id=job_id, status='queued').update(
+            {'status': 'running'}, synchronize_session=False
+        )
+        db.session.commit()
+        return claimed == 1
+
+    # Oldest queued jobs first
+    @classmethod
+    def find_queued(cls, limit=None):
+        return cls.query.filter_by(status='queued').order_by(cls.id).limit(limit).all()
+
+    # Queue jobs left running by a runner that stopped (e.g. a restart) again;
+    # only the process that runs the jobs calls this, before it starts them
+    @classmethod
+    def requeue_interrupted(cls):
+        requeued = cls.query.filter_by(status='running').update(
+            {'status': 'queued', 'stage': None, 'progress': 0.0},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        return requeued
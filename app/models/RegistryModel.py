@@ -0,0 +1,124 @@
+import json
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+
+# Datasets a model was trained for or served to from the registry. The cache
+# key holds no owner, so one entry serves every dataset with the same
+# content; the owners of all of them may use the model
+model_datasets = db.Table(
+    'model_datasets',
+    db.Column(
+        'model_id',
+        db.Integer,
+        db.ForeignKey('model_registry.id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    db.Column(
+        'data_id',
+        db.Integer,
+        db.ForeignKey('data.id', ondelete='CASCADE'),
+        primary_key=True,
+        index=True,
+    ),
+)
+
+
+class RegistryModel(db.Model):
+    __tablename__ = 'model_registry'
+    id = db.Column(db.Integer, primary_key=True)
+    data_id = db.Column(db.Integer, db.ForeignKey('data.id'), nullable=True)
+    # Hash of the file content, target column and hyperparameters
+    cache_key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    target_column = db.Column(db.String(255), nullable=False)
+    hyperparams = db.Column(db.Text, nullable=False)  # JSON encoded
+    artifact_dir = db.Column(db.String(255), nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False, default=0)
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    last_used_at = db.Column(db.DateTime, default=db.func.current_timestamp(), index=True)
+
+    # Relationship: A dataset can have many registered models
+    data = db.relationship('DataModel', backref=db.backref('models', lazy=True))
+
+    def __init__(self, data_id, cache_key, content_hash, target_column, hyperparams, artifact_dir, size_bytes):
+        self.data_id = data_id
+        self.cache_key = cache_key
+        self.content_hash = content_hash
+        self.target_column = target_column
+        self.hyperparams = json.dumps(hyperparams, sort_keys=True)
+        self.artifact_dir = artifact_dir
+        self.size_bytes = size_bytes
+        self.hit_count = 0
+
+    # Save entry to the database
+    def save(self):
+        db.session.add(self)
+        db.session.commit()
+
+    # Record a cache hit, keeping the entry at the front of the LRU order
+    def touch(self):
+        self.hit_count += 1
+        self.last_used_at = db.func.current_timestamp()
+        self.save()
+
+    # Record that a dataset uses this model (no-op if it already does)
+    def add_dataset(self, data_id):
+        if data_id is None or self.has_dataset(data_id):
+            return
+        try:
+            db.session.execute(
+                model_datasets.insert().values(model_id=self.id, data_id=data_id)
+            )
+            db.session.commit()
+        except IntegrityError:
+            # Recorded by a concurrent run
+            db.session.rollback()
+
+    def has_dataset(self, data_id):
+        return (
+            db.session.query(model_datasets)
+            .filter_by(model_id=self.id, data_id=data_id)
+            .first()
+            is not None
+        )
+
+    # Whether a user owns a dataset the model was trained for or served to
+    def is_usable_by(self, user_id):
+        from app.models.DataModel import DataModel
+
+        if self.data is not None and self.data.user_id == user_id:
+            return True
+        return (
+            db.session.query(model_datasets)
+            .join(DataModel, DataModel.id == model_datasets.c.data_id)
+            .filter(model_datasets.c.model_id == self.id, DataModel.user_id == user_id)
+            .first()
+            is not None
+        )
+
+    # Decoded hyperparameters
+    def get_hyperparams(self):
+        return json.loads(self.hyperparams)
+
+    # Find entry by cache key
+    @classmethod
+    def find_by_key(cls, cache_key):
+        return cls.query.filter_by(cache_key=cache_key).first()
+
+    # Find entry by ID
+    @classmethod
+    def find_by_id(cls, model_id):
+        return db.session.get(cls, model_id)
+
+    # All entries, least recently used first
+    @classmethod
+    def least_recently_used(cls):
+        return cls.query.order_by(cls.last_used_at.asc(), cls.id.asc()).all()
+
+    # Delete specific entry
+    def delete(self):
+        db.session.execute(model_datasets.delete().where(model_datasets.c.model_id == self.id))
+        db.session.delete(self)
+        db.session.commit()
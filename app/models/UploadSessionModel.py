@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime, timedelta
+from app import db
+
+
+class UploadSessionModel(db.Model):
+    __tablename__ = 'upload_sessions'
+    # Random ID, also the name of the session's directory
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    file_name = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)  # Bytes of the whole file
+    chunk_size = db.Column(db.Integer, nullable=False)
+    # open -> finalized
+    status = db.Column(db.String(20), nullable=False, default='open')
+    # Dataset created on finalize
+    data_id = db.Column(db.Integer, db.ForeignKey('data.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def __init__(self, user_id, file_name, size, chunk_size):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.file_name = file_name
+        self.size = size
+        self.chunk_size = chunk_size
+        self.status = 'open'
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    # Expected size of a chunk (the last one may be shorter)
+    def chunk_length(self, index):
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    # Save session to the database
+    def save(self):
+        db.session.add(self)
+        db.session.commit()
+
+    # Record activity, so resumed sessions do not expire
+    def touch(self):
+        self.updated_at = datetime.utcnow()
+        self.save()
+
+    # Record the dataset created from the assembled file
+    def finalize(self, data_id):
+        self.status = 'finalized'
+        self.data_id = data_id
+        self.save()
+
+    # Delete session from the database
+    def delete(self):
+        db.session.delete(self)
+        db.session.commit()
+
+    # Find session by ID
+    @classmethod
+    def find_by_id(cls, upload_id):
+        return db.session.get(cls, upload_id)
+
+    # Open sessions of a user not touched for max_age seconds
+    @classmethod
+    def find_expired(cls, user_id, max_age):
+        cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+        return cls.query.filter(
+            cls.user_id == user_id, cls.status == 'open', cls.updated_at < cutoff
+        ).all()
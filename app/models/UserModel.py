@@ -10,9 +10,14 @@ class UserModel(db.Model):
     password = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    # Bumped by every change to the user's datasets, in the same transaction;
+    # keys the listing's ETag (see DataModel.listing_version)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
-    # Relationship: A user can have many data files
-    data_files = db.relationship('DataModel', backref='user', lazy=True)  
+    # Relationship: A user can have many data files. Dynamic, so it is a
+    # query to filter, order and paginate instead of a list loaded in full
+    # (one extra query per user) whenever it is touched
+    data_files = db.relationship('DataModel', backref='user', lazy='dynamic')
 
     def __init__(self, email, password):
         self.email = email
@@ -35,7 +40,7 @@ class UserModel(db.Model):
     # Find user by ID
     @classmethod
     def find_by_id(cls, user_id):
-        return cls.query.get(user_id)
+        return db.session.get(cls, user_id)
 
     # Delete user
     def delete(self):
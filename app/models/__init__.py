@@ -1,3 +1,7 @@
 # This file allows the directory to be treated as a Python package.
 from .DataModel import DataModel
 from .UserModel import UserModel
+from .JobModel import JobModel
+from .RegistryModel import RegistryModel
+from .DataVersionModel import DataVersionModel
+from .UploadSessionModel import UploadSessionModel
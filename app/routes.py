@@ -1,10 +1,9 @@
-import io
 import os
-import uuid
-import base64
+import hashlib
 from flask import (
     request,
     jsonify,
+    Response,
     send_file,
     session,
     url_for,
@@ -13,20 +12,28 @@ from flask import (
     current_app,
     render_template,
 )
-import traceback
-import pandas as pd
-from .controllers.UploadController import (
-    FileProcessor,
-)
 from werkzeug.utils import (
     secure_filename,
 )
+from werkzeug.exceptions import RequestEntityTooLarge
 from .controllers.UserController import (
     UserController,
 )
 
 from app.models.UserModel import UserModel
 from app.models.DataModel import DataModel
+from app.models.JobModel import JobModel
+from app.models.RegistryModel import RegistryModel
+from app.models.UploadSessionModel import UploadSessionModel
+
+from .middleware.JobQueue import get_job_queue
+from .middleware.PreviewCache import PreviewCache
+from .middleware.ModelBackends import BACKENDS, DEFAULT_BACKEND
+from .middleware.ChartCache import ChartCache
+from .middleware.UploadStore import ChunkedUploadStore, UploadStore, is_supported
+from .middleware.Metrics import METRICS
+from .middleware.ResultStore import PARTS as RESULT_PARTS, get_result_store
+from .middleware.RequestMetrics import RequestMetrics
 
 from .middleware.CaptchaMiddleware import CaptchaMiddleware
 
@@ -34,56 +41,44 @@ from .middleware.CaptchaMiddleware import CaptchaMiddleware
 # Define a Blueprint for modular application structure and routing
 main = Blueprint("main", __name__)
 
+# Request latency metrics and opt-in profiling (registered first, so the
+# latency includes the other hooks)
+request_metrics = RequestMetrics(main)
+
 # Initialize CaptchaMiddleware
 captcha_middleware = CaptchaMiddleware(main)
 
+# Rendered dataset previews, per DataModel.id
+preview_cache = PreviewCache()
 
-# Route to serve CAPTCHA image
+
+# Route to serve CAPTCHA image: the next pre-rendered image of the pool,
+# straight from memory
 @main.route("/captcha")
 def serve_captcha_image():
     try:
-        BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-        UPLOAD_FOLDER = os.path.join(BASE_DIR, "upload_folder")  # Absolute path
-        current_app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-
-        captcha_id = str(uuid.uuid4())  # Generate a unique ID for CAPTCHA
-        session["captcha_id"] = captcha_id  # Store the ID for validation
-
-        # Create CAPTCHA folder inside UPLOAD_FOLDER
-        captcha_folder = os.path.join(current_app.config["UPLOAD_FOLDER"], "captcha")
-        os.makedirs(captcha_folder, exist_ok=True)
-
-        # Generate CAPTCHA image using middleware
-        captcha_text = session.get("captcha")
-        captcha_base64 = captcha_middleware.generate_captcha_image(captcha_text)
-        if not captcha_base64:
-            raise ValueError("CAPTCHA generation failed: No data returned")
-
-        # Save the CAPTCHA image
-        captcha_image_path = os.path.join(captcha_folder, f"{captcha_id}.png")
-        with open(captcha_image_path, "wb") as img_file:
-            img_file.write(base64.b64decode(captcha_base64))
-
-        if os.path.exists(captcha_image_path):
-            return send_file(captcha_image_path, mimetype="image/png")
-        else:
-            raise FileNotFoundError("CAPTCHA image file not found")
-
+        png = captcha_middleware.issue()
     except Exception as e:
         current_app.logger.error(f"Error serving CAPTCHA image: {e}")
         return "Error generating CAPTCHA image", 500
+    response = Response(png, mimetype="image/png")
+    # Every request gets a new CAPTCHA
+    response.headers["Cache-Control"] = "no-store"
+    return response
 
 
-# Delete CAPTCHA image after use
-def delete_captcha_image(captcha_id):
-    try:
-        captcha_folder = os.path.join(current_app.config["UPLOAD_FOLDER"], "captcha")
-        captcha_image_path = os.path.join(captcha_folder, f"{captcha_id}.png")
+# Uploads larger than MAX_CONTENT_LENGTH are rejected while they stream in
+@main.errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    limit_mb = round(current_app.config["MAX_CONTENT_LENGTH"] / 1024**2, 1)
+    return jsonify({"error": f"File too large (limit: {limit_mb} MB)"}), 413
+
+
+# Metrics route: Counters and latency histograms in the Prometheus text format
+@main.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
 
-        if os.path.exists(captcha_image_path):
-            os.remove(captcha_image_path)
-    except Exception as e:
-        current_app.logger.error(f"Error deleting CAPTCHA image: {e}")
 
 # Route for the home page
 @main.route("/")
@@ -102,19 +97,10 @@ def login():
         password = request.form.get("password")
         user_captcha = request.form.get("captcha")  # Get CAPTCHA entered by the user
 
-        # Validate CAPTCHA
-        stored_captcha_id = session.get("captcha")
-
-        if not stored_captcha_id:
-            return render_template(
-                "login.html", error="CAPTCHA expired. Please refresh."
-            )
-
-        # Compare user input with stored CAPTCHA
-        if user_captcha != stored_captcha_id:
-            # Delete CAPTCHA image and generate a new one
-            delete_captcha_image(stored_captcha_id)
-            return render_template("login.html", error="Incorrect CAPTCHA. Try again.")
+        # Validate CAPTCHA (the page shows a new one after any attempt)
+        captcha_error = captcha_middleware.check(user_captcha)
+        if captcha_error:
+            return render_template("login.html", error=captcha_error)
 
         # Validate credentials (using the UserModel)
         user = UserModel.find_by_email(email)
@@ -124,9 +110,6 @@ def login():
             session["user"] = user.email
             session["user_id"] = user.id
 
-            # Delete CAPTCHA image after successful login
-            delete_captcha_image(stored_captcha_id)
-
             return redirect(url_for("main.dashboard"))
         else:
             return render_template("login.html", error="Invalid email or password")
@@ -145,34 +128,18 @@ def register():
         user_captcha = request.form.get("captcha")
 
         # Validate CAPTCHA
-        stored_captcha_id = session.get("captcha_id")
-        if not stored_captcha_id:
-            # Delete CAPTCHA image and generate a new one
-            delete_captcha_image(stored_captcha_id)
-            return render_template(
-                "register.html", error="CAPTCHA expired. Please refresh."
-            )
-
-        if user_captcha != stored_captcha_id:
-            # Delete CAPTCHA image and generate a new one
-            delete_captcha_image(stored_captcha_id)
-            return render_template(
-                "register.html", error="Incorrect CAPTCHA. Try again."
-            )
+        captcha_error = captcha_middleware.check(user_captcha)
+        if captcha_error:
+            return render_template("register.html", error=captcha_error)
 
         # Check if user already exists
         if UserModel.find_by_email(email):
-            # Delete CAPTCHA image and generate a new one
-            delete_captcha_image(stored_captcha_id)
             return render_template("register.html", error="Email already exists")
 
         # Create and save new user
         new_user = UserModel(email=email, password=password)
         new_user.save()
 
-        # Delete CAPTCHA image after successful registration
-        delete_captcha_image(stored_captcha_id)
-
         return redirect(url_for("main.login"))
 
     return render_template("register.html")
@@ -207,26 +174,99 @@ def get_data():
         # Redirect to login if the user session is not available
         return redirect(url_for("main.login"))
 
-    # Query the database for data associated with the user
-    data = DataModel.query.filter_by(user_id=user_id).all()
-
-    # If no data is found, inform the user
-    if not data:
-        return jsonify({"message": "No data found. Please upload a file."}), 200
-
-    # Convert the data to a JSON-friendly format
-    data_list = [
-        {
-            "id": d.id,
-            "fileName": d.file_name,
-            "filePath": d.file_path,
-            "user": d.user_id,
-        }
-        for d in data
-    ]
-
-    # Return the data as JSON
-    return jsonify(data_list)
+    try:
+        limit = int(request.args.get("limit", current_app.config["DATA_PAGE_SIZE"]))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, current_app.config["DATA_PAGE_MAX_SIZE"]))
+    cursor = request.args.get("cursor")
+
+    # The listing only changes with the user's datasets: a client holding
+    # the current page gets a 304 without any listing query
+    version, count = DataModel.listing_version(user_id)
+    etag = hashlib.sha256(
+        f"{user_id}:{version}:{limit}:{cursor}".encode("utf-8")
+    ).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        # If no data is found, inform the user
+        if not count:
+            response = jsonify({"message": "No data found. Please upload a file."})
+        else:
+            # One page, newest first, read as plain rows
+            try:
+                rows, next_cursor = DataModel.list_page(user_id, limit, cursor)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            # Convert the data to a JSON-friendly format
+            response = jsonify(
+                [
+                    {
+                        "id": row.id,
+                        "fileName": row.file_name,
+                        "filePath": row.file_path,
+                        "user": row.user_id,
+                        "size": row.size,
+                        "version": row.version,
+                        "createdAt": (
+                            row.created_at.isoformat() if row.created_at else None
+                        ),
+                    }
+                    for row in rows
+                ]
+            )
+            # The body stays a list; the next page is linked from the headers
+            if next_cursor is not None:
+                response.headers["X-Next-Cursor"] = next_cursor
+                next_url = url_for("main.get_data", limit=limit, cursor=next_cursor)
+                response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+    response.set_etag(etag)
+    # Per-user data: browsers revalidate, shared caches keep out
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def register_upload(user_id, filename, stored):
+    """
+    Create the DataModel of a stored upload and queue its columnar conversion.
+
+    :param stored: Result of UploadStore.store() or place().
+    :return: ``(data, convert_job)``; no job is queued when a byte-identical
+        upload was converted already.
+    """
+    # Save file details to the database
+    data = DataModel(
+        user_id=user_id,
+        file_name=filename,
+        file_path=stored["file_path"],
+        content_hash=stored["content_hash"],
+        size=stored["size"],
+    )
+
+    # A byte-identical upload brings its columnar copy and statistics
+    original = None
+    if stored["deduplicated"]:
+        original = DataModel.find_by_content_hash(stored["content_hash"])
+    if original is not None and original.columnar_path:
+        data.columnar_path = original.columnar_path
+        data.schema = original.schema
+        data.stats = original.stats
+    # Save data to the database
+    data.save()
+
+    if data.columnar_path is not None:
+        return data, None
+
+    # Convert the file to its columnar copy in the background
+    job_queue = get_job_queue()
+    convert_job = JobModel(data_id=data.id, user_id=user_id, kind="convert")
+    convert_job.save()
+    job_queue.submit(convert_job)
+    return data, convert_job
 
 
 # File upload route: Handles file uploads via GET and POST
@@ -244,14 +284,6 @@ def upload():
 
         if file:
             filename = secure_filename(file.filename)  # Secure the filename
-            upload_folder = current_app.config["UPLOAD_FOLDER"]
-
-            # Create upload folder if it doesn't exist
-            if not os.path.exists(upload_folder):
-                os.makedirs(upload_folder)
-
-            file_path = os.path.join(upload_folder, filename)
-            file.save(file_path)  # Save the file to the server
 
             # Retrieve the user ID from the session
             user_id = session.get("user_id")  # Ensure that the session key is 'user_id'
@@ -260,24 +292,198 @@ def upload():
                 # User should be logged in
                 return jsonify({"error": "User not logged in"}), 401
 
-            # Save file details to the database
-            file_name = filename
-            data = DataModel(user_id=user_id, file_name=file_name, file_path=file_path)
-            # Save data to the database
-            data.save()
+            # The file was streamed to disk and hashed while it was received;
+            # move it to its content-addressed name (identical files share one)
+            stored = UploadStore.from_config(current_app.config).store(file, filename)
+            data, convert_job = register_upload(user_id, filename, stored)
+
+            response = {
+                "message": "File uploaded successfully!",
+                "fileName": filename,
+                "deduplicated": stored["deduplicated"],
+            }
+            if convert_job is not None:
+                response["job_id"] = convert_job.id
 
             # Return JSON response with file name and message
-            return (
-                jsonify(
-                    {"message": "File uploaded successfully!", "fileName": filename}
-                ),
-                200,
-            )
+            return jsonify(response), 200
 
     elif request.method == "GET":
         return render_template("upload.html")
 
 
+def upload_session_status(upload):
+    """JSON-friendly state of a resumable upload."""
+    chunked_store = ChunkedUploadStore.from_config(current_app.config)
+    missing = [] if upload.status == "finalized" else chunked_store.missing(upload)
+    return {
+        "upload_id": upload.id,
+        "fileName": upload.file_name,
+        "size": upload.size,
+        "chunk_size": upload.chunk_size,
+        "total_chunks": upload.total_chunks,
+        "received_chunks": upload.total_chunks - len(missing),
+        "missing_chunks": missing,
+        "status": upload.status,
+        "fileId": upload.data_id,
+        "status_url": url_for("main.upload_session", upload_id=upload.id),
+    }
+
+
+def find_upload_session(upload_id):
+    """Return the caller's upload session, or an error response."""
+    upload = UploadSessionModel.find_by_id(upload_id)
+    if not upload:
+        return None, (jsonify({"error": "Upload not found"}), 404)
+    if upload.user_id != session.get("user_id"):
+        return None, (jsonify({"error": "You are not the owner of this upload."}), 403)
+    return upload, None
+
+
+# Resumable upload routes: init, PUT chunks (any order, retried freely),
+# status, finalize. For multi-gigabyte files on unreliable connections
+@main.route("/api/uploads", methods=["POST"])
+def create_upload_session():
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"error": "User not logged in"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    filename = secure_filename(payload.get("fileName") or "")
+    size = payload.get("size")
+    if not filename:
+        return jsonify({"error": "fileName is required"}), 400
+    if not is_supported(filename):
+        return jsonify({"error": "File type not supported"}), 400
+    if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+        return jsonify({"error": "size must be the file size in bytes"}), 400
+    max_bytes = current_app.config["MAX_CONTENT_LENGTH"]
+    if max_bytes is not None and size > max_bytes:
+        return upload_too_large(None)
+
+    chunked_store = ChunkedUploadStore.from_config(current_app.config)
+    # Abandoned uploads of this user hold disk space; drop them
+    for expired in UploadSessionModel.find_expired(
+        user_id, current_app.config["UPLOAD_SESSION_MAX_AGE"]
+    ):
+        chunked_store.discard(expired)
+        expired.delete()
+
+    upload = UploadSessionModel(
+        user_id=user_id,
+        file_name=filename,
+        size=size,
+        chunk_size=current_app.config["UPLOAD_CHUNK_SIZE"],
+    )
+    chunked_store.create(upload)
+    upload.save()
+    return jsonify(upload_session_status(upload)), 201
+
+
+@main.route("/api/uploads/<upload_id>", methods=["GET"])
+def upload_session(upload_id):
+    upload, error = find_upload_session(upload_id)
+    if error:
+        return error
+    return jsonify(upload_session_status(upload))
+
+
+@main.route("/api/uploads/<upload_id>/chunks/<int:index>", methods=["PUT"])
+def upload_chunk(upload_id, index):
+    upload, error = find_upload_session(upload_id)
+    if error:
+        return error
+    if upload.status != "open":
+        return jsonify({"error": "Upload already finalized"}), 409
+
+    checksum = request.headers.get("X-Chunk-Checksum")
+    if not checksum:
+        return (
+            jsonify({"error": "X-Chunk-Checksum (SHA-256 of the chunk) is required"}),
+            400,
+        )
+
+    # The declared length is checked before any of the body is read; the
+    # body is then streamed to disk, never held in memory
+    length = request.content_length
+    if length is None:
+        return jsonify({"error": "Content-Length is required"}), 411
+
+    chunked_store = ChunkedUploadStore.from_config(current_app.config)
+    try:
+        chunked_store.check_chunk(upload, index, length)
+    except ValueError as e:
+        # Larger than any chunk of the upload may be
+        status = 413 if length > upload.chunk_size else 400
+        return jsonify({"error": str(e)}), status
+
+    try:
+        chunked_store.write_chunk(upload, index, request.stream, checksum, length)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError:
+        # Finalized by a concurrent request
+        return jsonify({"error": "Upload already finalized"}), 409
+    upload.touch()
+
+    return jsonify(
+        {
+            "upload_id": upload.id,
+            "index": index,
+            "received_chunks": len(chunked_store.received(upload)),
+            "total_chunks": upload.total_chunks,
+        }
+    )
+
+
+@main.route("/api/uploads/<upload_id>/finalize", methods=["POST"])
+def finalize_upload(upload_id):
+    upload, error = find_upload_session(upload_id)
+    if error:
+        return error
+    if upload.status == "finalized":
+        # Finalizing twice (e.g. a retried request) is harmless
+        return jsonify(upload_session_status(upload)), 200
+
+    chunked_store = ChunkedUploadStore.from_config(current_app.config)
+    missing = chunked_store.missing(upload)
+    if missing:
+        return (
+            jsonify(
+                {
+                    "error": f"{len(missing)} chunk(s) missing",
+                    "missing_chunks": missing,
+                }
+            ),
+            409,
+        )
+
+    try:
+        tmp_path, content_hash, size = chunked_store.assemble(upload)
+    except FileNotFoundError:
+        return jsonify({"error": "Upload is being finalized"}), 409
+
+    # Optional end-to-end check of the whole file
+    checksum = (request.get_json(silent=True) or {}).get("checksum")
+    if checksum and checksum.lower() != content_hash:
+        # Keep the session: the client can re-send chunks and finalize again
+        os.replace(tmp_path, chunked_store.data_path(upload))
+        return jsonify({"error": "Checksum mismatch for the assembled file"}), 400
+
+    stored = UploadStore.from_config(current_app.config).place(
+        tmp_path, content_hash, size, upload.file_name
+    )
+    data, convert_job = register_upload(upload.user_id, upload.file_name, stored)
+    upload.finalize(data.id)
+    chunked_store.discard(upload)
+
+    response = upload_session_status(upload)
+    response["deduplicated"] = stored["deduplicated"]
+    if convert_job is not None:
+        response["job_id"] = convert_job.id
+    return jsonify(response), 201
+
+
 # Read file route: Handles file reading
 @main.route("/api/read-file/<int:num>", methods=["POST"])
 def read_file(num=10):
@@ -306,12 +512,8 @@ def read_file(num=10):
         # Determine the file extension
         _, file_extension = os.path.splitext(file_path)
 
-        # Read the file using pandas based on its extension
-        if file_extension.lower() == ".csv":
-            df = pd.read_csv(file_path)
-        elif file_extension.lower() in [".xls", ".xlsx"]:
-            df = pd.read_excel(file_path)
-        else:
+        # Only CSV and Excel files can be previewed
+        if file_extension.lower() not in [".csv", ".xls", ".xlsx"]:
             return (
                 jsonify(
                     {
@@ -321,9 +523,12 @@ def read_file(num=10):
                 400,
             )
 
-        # Convert the dataframe to a dictionary format for easy display in the frontend
-        df_count = df.head(num * 2)  # Fetch twice the number of rows as specified
-        html_table = df_count.to_html(index=False)  # Convert to HTML table
+        # Read only the rows shown (twice the number specified) and cache the
+        # rendered HTML table per file
+        rows = num * 2
+        html_table = preview_cache.get_or_render(
+            file.id, "html", rows, lambda: file.loader().head(rows).to_html(index=False)
+        )
 
         return html_table
 
@@ -331,17 +536,187 @@ def read_file(num=10):
         return jsonify({"error": f"Error reading file: {str(e)}"}), 500
 
 
+# Dataset stats route: Row count, column dtypes and null counts of a file
+@main.route("/api/stats/<int:file_id>", methods=["GET"])
+def file_stats(file_id):
+    file = DataModel.find_by_id(file_id)
+
+    if not file:
+        return jsonify({"error": "File not found."}), 404
+
+    if file.user_id != session.get("user_id"):
+        return jsonify({"error": "You are not the owner of this file."}), 403
+
+    # Stats are computed once after upload; compute them now if that has not
+    # happened yet (e.g. files uploaded before stats existed)
+    stats = file.get_stats()
+    if stats is None:
+        try:
+            stats = file.loader().stats()
+        except Exception as e:
+            return jsonify({"error": f"Error reading file: {str(e)}"}), 500
+        file.set_stats(stats)
+
+    return jsonify(stats), 200
+
+
+# Append route: Adds a delta file (new rows) to a dataset as its next version
+@main.route("/api/data/<int:file_id>/append", methods=["POST"])
+def append_data(file_id):
+    file_record = DataModel.find_by_id(file_id)
+
+    if not file_record:
+        return jsonify({"error": "File not found."}), 404
+
+    user_id = session.get("user_id")
+    if file_record.user_id != user_id:
+        return jsonify({"error": "You are not the owner of this file."}), 403
+
+    file = request.files.get("file")
+    if not file or file.filename == "":
+        return jsonify({"error": "No selected file"}), 400
+
+    filename = secure_filename(file.filename)
+    if not is_supported(filename):
+        return jsonify({"error": "File type not supported"}), 400
+
+    # Deltas are stored like uploads, under their content hash
+    stored = UploadStore.from_config(current_app.config).store(file, filename)
+    file_path = stored["file_path"]
+
+    # The delta must have the columns of the dataset
+    from .middleware.DataLoader import DataLoader
+
+    error = None
+    try:
+        columns = DataLoader(file_path).columns()
+        expected = file_record.loader().columns()
+        if set(columns) != set(expected):
+            error = "The file must have the same columns as the dataset"
+    except Exception as e:
+        error = f"Error reading file: {str(e)}"
+    if error is not None:
+        # An identical file stored earlier may be in use
+        if not stored["deduplicated"]:
+            os.remove(file_path)
+        return jsonify({"error": error}), 400
+
+    delta = file_record.append_version(filename, file_path, stored["content_hash"])
+    preview_cache.invalidate(file_record.id)
+
+    # Convert the delta to its columnar copy and merge its statistics
+    job_queue = get_job_queue()
+    convert_job = JobModel(
+        data_id=file_record.id,
+        user_id=user_id,
+        kind="convert",
+        params={"version": delta.version},
+    )
+    convert_job.save()
+    job_queue.submit(convert_job)
+
+    return (
+        jsonify(
+            {
+                "message": "File appended successfully!",
+                "fileName": filename,
+                "version": delta.version,
+                "job_id": convert_job.id,
+            }
+        ),
+        200,
+    )
+
+
+def queue_churn_job(data_id, user_id, params):
+    """Queue the churn pipeline and return the 202 response pointing at the job."""
+    # Training runs in a background worker
+    job_queue = get_job_queue()
+    job = JobModel(data_id=data_id, user_id=user_id, kind="churn", params=params)
+    job.save()
+    job_queue.submit(job)
+
+    # Return the job id at once, the client polls the status URL
+    return (
+        jsonify(
+            {
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": url_for("main.job_status", job_id=job.id),
+            }
+        ),
+        202,
+    )
+
+
 # Process churn route: Handles churn processing
 @main.route("/churn", methods=["POST"])
 def process_churn():
+    # Imported on first use: TrainModel loads the ML stack
+    from .middleware.TrainModel import ChurnModel
+
     try:
         file_id = request.json.get("file_id")
         target_column = request.json.get("target_column")
-        print(f"Received file_id: {file_id}, target_column: {target_column}")
+        # Optional column projection: train on these features only
+        feature_columns = request.json.get("feature_columns")
+        # Optional training parallelism, clipped to the job's CPU budget
+        n_jobs = request.json.get("n_jobs")
+        # Optional classifier family, see ModelBackends.BACKENDS
+        backend = request.json.get("backend", DEFAULT_BACKEND)
+        # "quick" trains on a sample for a fast preview, see ChurnModel.MODES
+        mode = request.json.get("mode", "full")
+        # Update the model of an earlier version with the appended rows only
+        incremental = request.json.get("incremental", False)
+        # "cross_validation" adds k-fold cross-validation, see ChurnModel.EVALUATIONS
+        evaluation = request.json.get("evaluation", "holdout")
+        cv_folds = request.json.get("cv_folds", ChurnModel.CV_FOLDS)
 
         if not file_id or not target_column:
             return jsonify({"error": "File ID and target column are required"}), 400
 
+        if feature_columns is not None and not (
+            isinstance(feature_columns, list)
+            and all(isinstance(col, str) for col in feature_columns)
+        ):
+            return jsonify({"error": "feature_columns must be a list of column names"}), 400
+
+        if n_jobs is not None and not isinstance(n_jobs, int):
+            return jsonify({"error": "n_jobs must be an integer"}), 400
+
+        if backend not in BACKENDS:
+            return (
+                jsonify(
+                    {"error": f"Unknown backend. Choose one of: {', '.join(BACKENDS)}"}
+                ),
+                400,
+            )
+
+        if mode not in ChurnModel.MODES:
+            modes = ", ".join(ChurnModel.MODES)
+            return jsonify({"error": f"Unknown mode. Choose one of: {modes}"}), 400
+
+        if not isinstance(incremental, bool):
+            return jsonify({"error": "incremental must be a boolean"}), 400
+
+        if evaluation not in ChurnModel.EVALUATIONS:
+            evaluations = ", ".join(ChurnModel.EVALUATIONS)
+            return (
+                jsonify({"error": f"Unknown evaluation. Choose one of: {evaluations}"}),
+                400,
+            )
+
+        if not isinstance(cv_folds, int) or isinstance(cv_folds, bool) or not (
+            2 <= cv_folds <= 20
+        ):
+            return jsonify({"error": "cv_folds must be an integer from 2 to 20"}), 400
+
+        if incremental and evaluation == "cross_validation":
+            return (
+                jsonify({"error": "Cross-validation cannot be combined with incremental"}),
+                400,
+            )
+
         # Fetch file details from the database
         file_record = DataModel.query.filter_by(id=file_id).first()
         # print(f"file_record: {file_record}")
@@ -352,55 +727,258 @@ def process_churn():
         file_path = (
             file_record.file_path
         )  # Assuming the file path is stored in the database
-        print(f"file_path: {file_path}")
 
         if not os.path.exists(file_path):
-            print(f"File does not exist: {file_path}")
+            current_app.logger.warning(f"File of data {file_id} is missing: {file_path}")
             return jsonify({"error": "File path does not exist on the server"}), 404
 
-        # Process the file
-        try:
-            file_processor = FileProcessor(file_path, target_column)
-            churn_result = file_processor.UploadFile(file_path, target_column)
-            # print(f"Churn result: {churn_result}")
-
-            # Store churn_result temporarily in the session
-            # session["churn_result"] = churn_result
-
-        except Exception as e:
-            print(f"Error in FileProcessor.UploadFile: {e}")
-            return jsonify({"error": "Failed to process file"}), 500
+        if not is_supported(file_path):
+            return jsonify({"error": "File type not supported"}), 400
 
         # Get user info from session
         session_user_id = session.get("user_id")
 
-        # Redirect to the chart page with the user id
-        print(churn_result)
-        return jsonify(churn_result), 200
+        # Queue the churn pipeline
+        return queue_churn_job(
+            file_record.id,
+            session_user_id,
+            {
+                "target_column": target_column,
+                "feature_columns": feature_columns,
+                "n_jobs": n_jobs,
+                "backend": backend,
+                "mode": mode,
+                "incremental": incremental,
+                "evaluation": evaluation,
+                "cv_folds": cv_folds,
+            },
+        )
 
     except Exception as e:
-        print(f"Unhandled Exception: {e}")
-        print(traceback.format_exc())  # type: ignore
+        current_app.logger.exception("Queueing a churn job failed")
         return jsonify({"error": str(e)}), 500
 
 
-# Chart route: Handles chart rendering
-@main.route("/chart/<int:user_id>", methods=["GET"])
-def chart(user_id):
-    # Retrieve churn_result from the session
-    # churn_result = session.get("churn_result")
+# Job status route: Reports status, progress stage and result of a job
+@main.route("/api/jobs/<int:job_id>", methods=["GET"])
+def job_status(job_id):
+    job = JobModel.find_by_id(job_id)
 
-    # if not churn_result:
-    #     return jsonify({"error": "Churn result not found in session"}), 404
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
 
-    # Fetch file details from the database
-    # file_record = UserModel.query.filter_by(id=user_id).first()
+    # Only the user who started the job may see it
+    if job.user_id is not None and job.user_id != session.get("user_id"):
+        return jsonify({"error": "You are not the owner of this job."}), 403
 
-    # if not file_record:
-    #     return jsonify({"error": "File not found"}), 404
+    job_dict = job.to_dict()
+    # Charts are served separately, point the client at their endpoints
+    result = job_dict.get("result") or {}
+    if job.kind == "churn" and result.get("charts"):
+        result["charts"] = {
+            kind: url_for("main.chart_image", run_id=job.id, kind=kind)
+            for kind in result["charts"]
+        }
+    # The stored result can be viewed again later
+    if job.kind == "churn" and job.status == "completed":
+        result["result_url"] = url_for("main.chart", run_id=job.id)
+    # A quick preview can be followed by a full fit of the same run
+    if job.kind == "churn" and result.get("mode") == "quick":
+        result["full_fit_url"] = url_for("main.full_fit", run_id=job.id)
+    return jsonify(job_dict), 200
+
+
+# Full fit route: Trains a quick churn run again on every row of its dataset
+@main.route("/api/runs/<int:run_id>/full", methods=["POST"])
+def full_fit(run_id):
+    job = JobModel.find_by_id(run_id)
+
+    if not job or job.kind != "churn":
+        return jsonify({"error": "Run not found"}), 404
+
+    if job.user_id is not None and job.user_id != session.get("user_id"):
+        return jsonify({"error": "You are not the owner of this run."}), 403
+
+    if not job.data or not os.path.exists(job.data.file_path):
+        return jsonify({"error": "File path does not exist on the server"}), 404
+
+    # Same file, target, features and backend; only the mode changes
+    params = {**job.get_params(), "mode": "full"}
+    return queue_churn_job(job.data_id, session.get("user_id"), params)
+
+
+# Chart route: Renders a chart of a churn run on first request, then serves it from disk
+@main.route("/api/charts/<int:run_id>/<kind>.png", methods=["GET"])
+def chart_image(run_id, kind):
+    job = JobModel.find_by_id(run_id)
+
+    if not job or job.kind != "churn":
+        return jsonify({"error": "Run not found"}), 404
+
+    if job.user_id is not None and job.user_id != session.get("user_id"):
+        return jsonify({"error": "You are not the owner of this run."}), 403
+
+    if job.status != "completed":
+        return jsonify({"error": "Run has not completed"}), 409
+
+    chart_cache = ChartCache.from_config(current_app.config)
+    chart_path = chart_cache.get_or_render(run_id, kind)
+    if chart_path is None:
+        return jsonify({"error": "Chart not found"}), 404
+
+    # ETag from the file's mtime and size; If-None-Match gets a 304
+    response = send_file(
+        os.path.abspath(chart_path),
+        mimetype="image/png",
+        etag=True,
+        conditional=True,
+        max_age=current_app.config["CHART_CACHE_MAX_AGE"],
+    )
+    # Charts belong to one user, keep them out of shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+
+# Batch scoring route: Applies a stored model to an uploaded customer file
+@main.route("/api/score", methods=["POST"])
+def score_file():
+    model_id = request.json.get("model_id")
+    file_id = request.json.get("file_id")
+
+    if not model_id or not file_id:
+        return jsonify({"error": "Model ID and file ID are required"}), 400
+
+    # Optional rows scored per chunk (SCORE_CHUNK_SIZE by default)
+    chunk_size = request.json.get("chunk_size")
+    if chunk_size is not None and (
+        not isinstance(chunk_size, int) or isinstance(chunk_size, bool) or chunk_size < 1
+    ):
+        return jsonify({"error": "chunk_size must be a positive integer"}), 400
+
+    session_user_id = session.get("user_id")
+
+    # Models can only be used by the owners of datasets they were trained
+    # for or served to from the registry; others' are reported as missing
+    model = RegistryModel.find_by_id(model_id)
+    if not model or not model.is_usable_by(session_user_id):
+        return jsonify({"error": "Model not found"}), 404
+
+    file_record = DataModel.query.filter_by(id=file_id).first()
+    if not file_record:
+        return jsonify({"error": "File not found"}), 404
+
+    if file_record.user_id != session_user_id:
+        return jsonify({"error": "You are not the owner of this file."}), 403
 
-    # Render the chart page with the user_id and churn_result
-    return render_template("chart.html", user_id=user_id, churn_result=user_id)
+    if not (file_record.file_path.endswith(".csv") or file_record.columnar_path):
+        return (
+            jsonify({"error": "Batch scoring needs a CSV file or its columnar copy"}),
+            400,
+        )
+
+    params = {"model_id": model_id}
+    if chunk_size is not None:
+        params["chunk_size"] = chunk_size
+
+    # Scoring streams the file in a background worker
+    job_queue = get_job_queue()
+    job = JobModel(
+        data_id=file_record.id, user_id=session_user_id, kind="score", params=params
+    )
+    job.save()
+    job_queue.submit(job)
+
+    return (
+        jsonify(
+            {
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": url_for("main.job_status", job_id=job.id),
+                "download_url": url_for("main.download_scores", job_id=job.id),
+            }
+        ),
+        202,
+    )
+
+
+# Download the result file of a finished scoring job
+@main.route("/api/score/<int:job_id>/download", methods=["GET"])
+def download_scores(job_id):
+    job = JobModel.find_by_id(job_id)
+
+    if not job or job.kind != "score":
+        return jsonify({"error": "Scoring job not found"}), 404
+
+    if job.user_id is not None and job.user_id != session.get("user_id"):
+        return jsonify({"error": "You are not the owner of this job."}), 403
+
+    if job.status != "completed":
+        return jsonify({"error": f"Scoring job is {job.status}"}), 409
+
+    return send_file(
+        job.get_result()["output_path"],
+        mimetype="text/csv",
+        as_attachment=True,
+        download_name=f"scores_{job.id}.csv",
+    )
+
+
+# Result route: Shows the stored result of a churn run, without training again.
+# ?parts=metrics,charts,predictions (or an Accept: application/json request)
+# returns only those parts as JSON; predictions are paged with offset/limit
+@main.route("/chart/<int:run_id>", methods=["GET"])
+def chart(run_id):
+    job = JobModel.find_by_id(run_id)
+
+    if not job or job.kind != "churn":
+        return jsonify({"error": "Run not found"}), 404
+
+    if job.user_id is not None and job.user_id != session.get("user_id"):
+        return jsonify({"error": "You are not the owner of this run."}), 403
+
+    if job.status != "completed":
+        return jsonify({"error": "Run has not completed"}), 409
+
+    wants_json = "parts" in request.args or (
+        request.accept_mimetypes.best_match(["text/html", "application/json"])
+        == "application/json"
+    )
+    if wants_json:
+        parts = [part for part in request.args.get("parts", "").split(",") if part]
+    else:
+        # The page shows metrics and charts; predictions are never read for it
+        parts = ["metrics", "charts"]
+
+    try:
+        offset = int(request.args.get("offset", 0))
+        limit = int(request.args.get("limit", current_app.config["RESULT_PAGE_SIZE"]))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+    offset = max(0, offset)
+    limit = max(1, min(limit, current_app.config["RESULT_PAGE_MAX_SIZE"]))
+
+    try:
+        result = get_result_store().load(
+            run_id, parts or RESULT_PARTS, offset=offset, limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if result is None:
+        return jsonify({"error": "Result not found"}), 404
+
+    # Charts are served separately, point the client at their endpoints
+    if "charts" in result:
+        result["charts"] = {
+            kind: url_for("main.chart_image", run_id=run_id, kind=kind)
+            for kind in result["charts"]
+        }
+
+    if wants_json:
+        return jsonify({"run_id": run_id, **result}), 200
+    return render_template(
+        "chart.html", run_id=run_id, metrics=result["metrics"], charts=result["charts"]
+    )
 
 
 @main.route("/preview-data", methods=["POST"])
@@ -409,18 +987,20 @@ def preview_data():
     if not file:
         return jsonify({"error": "No file uploaded"}), 400
 
+    import pandas as pd
+
     try:
-        # Read file into a pandas DataFrame
+        # Read only the first few rows of the file into a pandas DataFrame
         if file.filename.endswith(".csv"):
-            data = pd.read_csv(file)
+            data = pd.read_csv(file, nrows=10)
         elif file.filename.endswith(".xlsx"):
-            data = pd.read_excel(file)
+            data = pd.read_excel(file, nrows=10)
         else:
             return jsonify({"error": "Unsupported file type"}), 400
 
-        # Get headers and first few rows
+        # Get headers and rows
         headers = list(data.columns)
-        rows = data.head(10).to_dict(orient="records")
+        rows = data.to_dict(orient="records")
 
         return jsonify({"headers": headers, "rows": rows}), 200
     except Exception as e:
@@ -0,0 +1,110 @@
+from benchmarks.Runner import REPORT_VERSION
+
+
+def compare(
+    baseline,
+    current,
+    time_tolerance=0.10,
+    memory_tolerance=0.10,
+    min_seconds=0.05,
+):
+    """
+    Compare two benchmark reports case by case and stage by stage.
+
+    A stage regresses when it is more than ``time_tolerance`` (a fraction)
+    slower than in the baseline; a case regresses when its peak RSS grew by
+    more than ``memory_tolerance``. Stages faster than ``min_seconds`` in
+    both runs are too noisy to judge and never regress. Cases or stages
+    present in only one report are listed but not judged.
+
+    :return: List of ``{"case", "metric", "baseline", "current", "change",
+        "status"}`` rows; status is "regression", "improvement", "ok" or
+        "missing".
+    """
+    for report in (baseline, current):
+        if report.get("version") != REPORT_VERSION:
+            raise ValueError(
+                f"Unsupported benchmark report version {report.get('version')!r}"
+            )
+
+    rows = []
+    for case, base in baseline["cases"].items():
+        other = current["cases"].get(case)
+        if other is None:
+            rows.append(_row(case, "case", None, None, "missing"))
+            continue
+
+        for stage, base_seconds in base["stages"].items():
+            seconds = other["stages"].get(stage)
+            if seconds is None:
+                rows.append(_row(case, stage, base_seconds, None, "missing"))
+            elif max(base_seconds, seconds) < min_seconds:
+                rows.append(_row(case, stage, base_seconds, seconds, "ok"))
+            else:
+                rows.append(
+                    _judge(case, stage, base_seconds, seconds, time_tolerance)
+                )
+
+        rows.append(
+            _judge(
+                case,
+                "peak_rss_mb",
+                base["peak_rss_mb"],
+                other["peak_rss_mb"],
+                memory_tolerance,
+            )
+        )
+
+    for case in current["cases"]:
+        if case not in baseline["cases"]:
+            rows.append(_row(case, "case", None, None, "missing"))
+    return rows
+
+
+def regressions(rows):
+    """Rows of a comparison that regressed."""
+    return [row for row in rows if row["status"] == "regression"]
+
+
+def _judge(case, metric, base_value, value, tolerance):
+    if not base_value:
+        return _row(case, metric, base_value, value, "ok")
+    change = (value - base_value) / base_value
+    if change > tolerance:
+        status = "regression"
+    elif change < -tolerance:
+        status = "improvement"
+    else:
+        status = "ok"
+    return _row(case, metric, base_value, value, status, change)
+
+
+def _row(case, metric, base_value, value, status, change=None):
+    return {
+        "case": case,
+        "metric": metric,
+        "baseline": base_value,
+        "current": value,
+        "change": round(change, 4) if change is not None else None,
+        "status": status,
+    }
+
+
+def format_rows(rows):
+    """Plain-text table of a comparison."""
+    lines = [
+        f"{'case':<32} {'metric':<26} {'baseline':>10} {'current':>10} "
+        f"{'change':>8}  status"
+    ]
+    for row in rows:
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+        lines.append(
+            f"{row['case']:<32} {row['metric']:<26} "
+            f"{_format_value(row['baseline']):>10} {_format_value(row['current']):>10} "
+            f"{change:>8}  {row['status']}"
+        )
+    return "\n".join(lines)
+
+
+def _format_value(value):
+    return "-" if value is None else f"{value:.4g}"
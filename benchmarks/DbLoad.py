@@ -0,0 +1,152 @@
+import os
+import time
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def _configure(database_uri, profile):
+    # Config reads the environment when it is imported, i.e. in the fresh
+    # (spawned) process, before create_app()
+    os.environ["DATABASE_URI"] = database_uri
+    os.environ["DB_ENGINE_PROFILE"] = profile
+
+
+def _setup(database_uri, profile):
+    """Migrate the database and create the user every worker writes datasets for."""
+    _configure(database_uri, profile)
+    from flask_migrate import upgrade
+    from app import create_app
+    from app.models.UserModel import UserModel
+
+    app = create_app()
+    with app.app_context():
+        upgrade()
+        user = UserModel.find_by_email("load@example.com")
+        if user is None:
+            user = UserModel("load@example.com", "load-test")
+            user.save()
+        return user.id
+
+
+def write_worker(
+    database_uri, profile, user_id, writes, reads_per_write, worker, barrier
+):
+    """
+    Save ``writes`` datasets one request at a time, like concurrent uploads.
+
+    After every save the worker reads the row back ``reads_per_write`` times,
+    like the status polls that follow an upload. Workers start writing
+    together (``barrier``), once every one has set up its app. Failed
+    writes (e.g. "database is locked") are rolled back and counted, not
+    retried.
+    """
+    _configure(database_uri, profile)
+    from sqlalchemy.exc import OperationalError
+    from app import create_app, db
+    from app.models.DataModel import DataModel
+
+    app = create_app()
+    latencies = []
+    errors = 0
+    with app.app_context():
+        barrier.wait()
+        started = time.time()
+        for index in range(writes):
+            start = time.perf_counter()
+            try:
+                data = DataModel(
+                    user_id, f"load_{worker}_{index}.csv", f"/load/{worker}/{index}.csv"
+                )
+                data.save()
+                for _ in range(reads_per_write):
+                    db.session.expire_all()
+                    DataModel.find_by_id(data.id)
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+                continue
+            finally:
+                db.session.remove()
+            latencies.append(time.perf_counter() - start)
+        finished = time.time()
+    return {
+        "started": started,
+        "finished": finished,
+        "latencies": latencies,
+        "errors": errors,
+    }
+
+
+def run_load(database_uri, profile, workers=8, writes=200, reads_per_write=1):
+    """
+    Measure ``DataModel.save`` throughput with concurrent writer processes.
+
+    Every worker is its own process with its own engine, like the web and
+    job workers of a deployment, so they contend for the database exactly
+    as those do.
+
+    :return: Writes per second, latency percentiles and failed writes.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        user_id = executor.submit(_setup, database_uri, profile).result()
+
+    with context.Manager() as manager, ProcessPoolExecutor(
+        max_workers=workers, mp_context=context
+    ) as executor:
+        barrier = manager.Barrier(workers)
+        futures = [
+            executor.submit(
+                write_worker,
+                database_uri,
+                profile,
+                user_id,
+                writes,
+                reads_per_write,
+                worker,
+                barrier,
+            )
+            for worker in range(workers)
+        ]
+        results = [future.result() for future in futures]
+
+    latencies = np.concatenate([result["latencies"] for result in results])
+    elapsed = max(r["finished"] for r in results) - min(r["started"] for r in results)
+    saved = len(latencies)
+    percentiles = (
+        np.percentile(latencies, [50, 95, 99]) * 1000 if saved else [None] * 3
+    )
+    return {
+        "profile": profile,
+        "workers": workers,
+        "writes": workers * writes,
+        "saved": saved,
+        "errors": sum(result["errors"] for result in results),
+        "seconds": round(elapsed, 3),
+        "writes_per_second": round(saved / elapsed, 1) if elapsed > 0 else None,
+        "latency_ms": {
+            name: round(float(value), 2) if value is not None else None
+            for name, value in zip(("p50", "p95", "p99"), percentiles)
+        },
+    }
+
+
+def run_profiles(profiles, database_uri=None, **kwargs):
+    """
+    Run the load test once per engine profile.
+
+    Without ``database_uri`` every profile writes to a fresh SQLite file in
+    a temporary directory.
+    """
+    results = []
+    for profile in profiles:
+        if database_uri is not None:
+            results.append(run_load(database_uri, profile, **kwargs))
+            continue
+        with tempfile.TemporaryDirectory() as folder:
+            uri = f"sqlite:///{os.path.join(folder, 'load.db')}"
+            results.append(run_load(uri, profile, **kwargs))
+    return results
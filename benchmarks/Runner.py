@@ -0,0 +1,180 @@
+import os
+import sys
+import time
+import platform
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from benchmarks import SyntheticData
+
+
+# Version of the report layout; compare() refuses reports of another version
+REPORT_VERSION = 1
+
+
+class StageTimer:
+    """
+    Times the stages of one benchmark case.
+
+    For every stage it records the wall time and the peak resident memory
+    of the process once the stage has finished (a high-water mark, so the
+    stage that raised it is the first one whose value jumps).
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.peak_rss_mb = {}
+
+    def run(self, stage, func, *args, **kwargs):
+        from app.middleware.DataLoader import DataLoader
+
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.stages[stage] = round(time.perf_counter() - start, 4)
+        self.peak_rss_mb[stage] = DataLoader.peak_rss_mb()
+        return result
+
+
+def run_case(file_path, backend, n_jobs, columnar_path=None):
+    """
+    Run the churn pipeline on a file once, timing every stage.
+
+    The stages of FileProcessor are split further so each step is timed on
+    its own: load, preprocess, fit, predict, evaluate, the chart inputs and
+    the rendering of every chart.
+
+    Meant to run in a fresh process, so its peak RSS is this case's alone.
+    """
+    from app.controllers.UploadController import FileProcessor
+    from app.middleware.ChartCache import RENDERERS
+    from app.middleware.DataLoader import DataLoader
+
+    timer = StageTimer()
+    # Memory of the interpreter and imported libraries, before any data
+    startup_rss_mb = DataLoader.peak_rss_mb()
+    processor = FileProcessor(
+        file_path,
+        "Churn",
+        data_loader=DataLoader(file_path, columnar_path=columnar_path),
+        n_jobs=n_jobs,
+        backend=backend,
+    )
+    timer.run("load", processor.load)
+    timer.run("preprocess", processor.preprocess)
+    timer.run("fit", processor.fit)
+
+    churn_model = processor.churn_model
+    timer.run("predict", churn_model.predict)
+    accuracy = timer.run("evaluate", churn_model.evaluate_model)
+    chart_data = timer.run("chart_data", churn_model.chart_data)
+    for kind, render in RENDERERS.items():
+        timer.run(f"chart:{kind}", render, chart_data[kind])
+
+    return {
+        "rows": len(processor.data),
+        "accuracy": accuracy,
+        "source": processor.load_report.get("source"),
+        "frame_mb": processor.load_report.get("frame_mb"),
+        "stages": timer.stages,
+        "stage_peak_rss_mb": timer.peak_rss_mb,
+        "startup_rss_mb": startup_rss_mb,
+        "peak_rss_mb": DataLoader.peak_rss_mb(),
+    }
+
+
+def _run_isolated(*args):
+    # A single-use worker process: memory of one case never leaks into the
+    # next one's peak RSS (spawn, like the job queue, so nothing is inherited)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_case, *args).result()
+
+
+def best_of(runs):
+    """Fastest time per stage and highest peak RSS over repeated runs of a case."""
+    best = dict(runs[0])
+    best["stages"] = {
+        stage: min(run["stages"][stage] for run in runs) for stage in runs[0]["stages"]
+    }
+    best["stage_peak_rss_mb"] = {
+        stage: max(run["stage_peak_rss_mb"][stage] or 0 for run in runs)
+        for stage in runs[0]["stage_peak_rss_mb"]
+    }
+    best["peak_rss_mb"] = max(run["peak_rss_mb"] or 0 for run in runs)
+    best["total_seconds"] = round(sum(best["stages"].values()), 4)
+    best["repeat"] = len(runs)
+    return best
+
+
+def git_commit():
+    """Commit of the working tree being benchmarked (None outside a git checkout)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(
+    sizes,
+    backends,
+    data_folder,
+    repeat=1,
+    n_jobs=None,
+    columnar=False,
+    seed=0,
+    on_case=None,
+):
+    """
+    Benchmark every (size, backend) pair and return the report.
+
+    :param sizes: Dataset sizes, keys of SyntheticData.SIZES.
+    :param backends: Model backend names.
+    :param data_folder: Where the synthetic datasets are generated and kept.
+    :param repeat: Runs per case; the report keeps the best of them.
+    :param n_jobs: CPUs used for training (default: all).
+    :param columnar: Read from a Parquet copy instead of the CSV.
+    :param on_case: Optional ``on_case(name, result)`` progress callback.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    cases = {}
+    for size in sizes:
+        file_path = SyntheticData.ensure_dataset(data_folder, size, seed=seed)
+        columnar_path = None
+        if columnar:
+            from app.middleware.DataLoader import DataLoader
+
+            # Converted once, like an upload; not part of any timing
+            columnar_path = f"{file_path}.parquet"
+            if not os.path.exists(columnar_path):
+                DataLoader(file_path).to_columnar(columnar_path)
+        for backend in backends:
+            name = f"{size}/{backend}"
+            runs = [
+                _run_isolated(file_path, backend, n_jobs, columnar_path)
+                for _ in range(repeat)
+            ]
+            cases[name] = dict(best_of(runs), size=size, backend=backend)
+            if on_case is not None:
+                on_case(name, cases[name])
+
+    return {
+        "version": REPORT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "n_jobs": n_jobs,
+            "executable": sys.executable,
+        },
+        "settings": {"repeat": repeat, "columnar": columnar, "seed": seed},
+        "cases": cases,
+    }
@@ -0,0 +1,98 @@
+import sys
+import json
+import subprocess
+
+
+# Modules app start-up must not import: the ML, data frame and plotting
+# stacks are loaded by the first request or job that needs them
+HEAVY_MODULES = (
+    "pandas",
+    "sklearn",
+    "scipy",
+    "joblib",
+    "matplotlib",
+    "seaborn",
+    "pyarrow",
+    "xgboost",
+    "lightgbm",
+)
+
+# Runs in a fresh interpreter, so nothing is imported yet
+_PROBE = """
+import sys, json, time
+start = time.perf_counter()
+from app import create_app
+app = create_app()
+seconds = time.perf_counter() - start
+heavy = sorted(
+    name for name in json.loads(sys.argv[1]) if name in sys.modules
+)
+print(json.dumps({"seconds": seconds, "modules": len(sys.modules), "heavy": heavy}))
+"""
+
+
+# Imports only the frameworks the app is built on: the floor of its
+# start-up on this machine, which the app's time is judged against
+_BASELINE_PROBE = """
+import json, time
+start = time.perf_counter()
+import flask, flask_migrate, flask_sqlalchemy
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+
+def _run_probe(probe, args=(), env=None):
+    completed = subprocess.run(
+        [sys.executable, "-c", probe, *args],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    # The last line: the app may log while it starts
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure_once(env=None):
+    """
+    Import the app and call create_app() in a new interpreter.
+
+    :return: ``{"seconds", "modules", "heavy"}``: time of the import and
+        create_app(), number of loaded modules and the heavy ones among them.
+    """
+    return _run_probe(_PROBE, [json.dumps(HEAVY_MODULES)], env)
+
+
+def measure_baseline_once(env=None):
+    """
+    Import Flask and its extensions, and nothing else, in a new interpreter.
+
+    :return: ``{"seconds"}``.
+    """
+    return _run_probe(_BASELINE_PROBE, env=env)
+
+
+def measure_startup(repeat=5, env=None):
+    """
+    Time app start-up ``repeat`` times, each in a fresh process.
+
+    Every run is paired with a run of the framework imports alone, so both
+    see the same load of the machine; ``ratio`` is the app's time over
+    theirs, and it varies far less between machines than either time. The
+    best runs are reported (the others are mostly slowed down by a cold
+    page cache); heavy modules are those imported by any run.
+    """
+    runs, baseline_runs = [], []
+    for _ in range(repeat):
+        baseline_runs.append(measure_baseline_once(env))
+        runs.append(measure_once(env))
+    seconds = min(run["seconds"] for run in runs)
+    baseline = min(run["seconds"] for run in baseline_runs)
+    return {
+        "seconds": round(seconds, 4),
+        "runs": [round(run["seconds"], 4) for run in runs],
+        "baseline_seconds": round(baseline, 4),
+        "ratio": round(seconds / baseline, 3),
+        "modules": min(run["modules"] for run in runs),
+        "heavy": sorted({name for run in runs for name in run["heavy"]}),
+    }
@@ -0,0 +1,129 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+# Dataset sizes of the benchmark suite, by name
+SIZES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+# Categorical columns of upload_folder/telecom_churn_dataset.csv and their
+# values (None is a missing value)
+CATEGORIES = {
+    "Gender": ["Male", "Female"],
+    "ContractType": ["Month-to-Month", "Annual", "Bi-Annual"],
+    "PaymentMethod": ["Bank Transfer", "Credit Card", "PayPal"],
+    "InternetService": ["DSL", "Fiber Optic", "No Internet"],
+    "StreamingServices": ["Yes", "No"],
+    "TechSupport": ["Yes", "No"],
+    "Region": ["North", "South", "East", "West"],
+    "AddOns": ["Additional Phone Line", "Security Features", None],
+    "DeviceProtection": ["Yes", "No"],
+    "OnlineBackup": ["Yes", "No"],
+    "OnlineSecurity": ["Yes", "No"],
+    "PaperlessBilling": ["Yes", "No"],
+}
+
+# Column order of the sample dataset
+COLUMNS = [
+    "CustomerID",
+    "Gender",
+    "Age",
+    "Tenure",
+    "ContractType",
+    "MonthlyCharges",
+    "TotalCharges",
+    "PaymentMethod",
+    "InternetService",
+    "StreamingServices",
+    "TechSupport",
+    "ComplaintsLogged",
+    "ServiceIssuesReported",
+    "CustomerSupportCalls",
+    "Churn",
+    "Region",
+    "DataUsage",
+    "AddOns",
+    "DeviceProtection",
+    "OnlineBackup",
+    "OnlineSecurity",
+    "PaperlessBilling",
+]
+
+
+def generate_frame(rows, rng, start=0):
+    """
+    Synthetic telecom customers with the schema of the sample dataset.
+
+    Churn is drawn from a logistic model of tenure, contract, complaints and
+    support calls, so the classifiers have a real signal to learn.
+
+    :param rows: Number of customers.
+    :param rng: numpy Generator.
+    :param start: Number of the first customer (CustomerIDs stay unique
+        across chunks).
+    """
+    numbers = pd.Series(np.arange(start + 1, start + rows + 1))
+    frame = {
+        "CustomerID": "CUST" + numbers.astype(str).str.zfill(8),
+        "Age": rng.integers(18, 81, rows),
+        "Tenure": rng.integers(1, 73, rows),
+        "MonthlyCharges": np.round(rng.uniform(20, 150, rows), 2),
+        "TotalCharges": np.round(rng.uniform(100, 10_000, rows), 2),
+        "ComplaintsLogged": rng.integers(0, 11, rows),
+        "ServiceIssuesReported": rng.integers(0, 16, rows),
+        "CustomerSupportCalls": rng.integers(0, 21, rows),
+        "DataUsage": np.round(rng.uniform(0, 100, rows), 2),
+    }
+    for col, values in CATEGORIES.items():
+        categories = [value for value in values if value is not None]
+        codes = rng.integers(0, len(values), rows)
+        codes[codes >= len(categories)] = -1  # Missing
+        frame[col] = pd.Categorical.from_codes(codes, categories=categories)
+
+    logit = (
+        1.0
+        - 0.04 * frame["Tenure"]
+        + 0.25 * frame["ComplaintsLogged"]
+        + 0.08 * frame["CustomerSupportCalls"]
+        - 1.0 * (frame["ContractType"] != "Month-to-Month")
+    )
+    churn = rng.random(rows) < 1 / (1 + np.exp(-logit))
+    frame["Churn"] = np.where(churn, "Yes", "No")
+    return pd.DataFrame(frame, columns=COLUMNS)
+
+
+def write_csv(path, rows, seed=0, chunk_size=500_000):
+    """
+    Write a synthetic dataset to a CSV file, a chunk at a time.
+
+    The same ``rows`` and ``seed`` always yield the same file.
+
+    :return: Path of the file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rng = np.random.default_rng(seed)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, rows, chunk_size):
+            chunk = generate_frame(min(chunk_size, rows - start), rng, start=start)
+            chunk.to_csv(f, header=start == 0, index=False)
+    # Only complete files ever appear under the final name
+    os.replace(tmp_path, path)
+    return path
+
+
+def dataset_path(folder, size, seed=0):
+    """Path of the cached synthetic dataset of a size."""
+    return os.path.join(folder, f"telecom_{size}_seed{seed}.csv")
+
+
+def ensure_dataset(folder, size, seed=0):
+    """Return the path of a synthetic dataset, generating it if missing."""
+    path = dataset_path(folder, size, seed)
+    if not os.path.exists(path):
+        write_csv(path, SIZES[size], seed=seed)
+    return path
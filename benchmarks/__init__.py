@@ -0,0 +1,19 @@
+"""
+Benchmarks of the churn pipeline on synthetic telecom datasets.
+
+Run from the repository root::
+
+    python -m benchmarks generate --size 1m
+    python -m benchmarks run --size 10k --size 1m --output report.json
+    python -m benchmarks compare baseline.json report.json
+
+``run`` times every stage of the pipeline (load, preprocess, fit, predict,
+evaluate, each chart) and records peak RSS, one fresh process per case.
+``compare`` exits with status 1 when a stage got slower or a case used
+more memory than the tolerance allows. ``db-load`` measures database write
+throughput under concurrent writer processes, per engine profile.
+``startup`` exits with status 1 when importing the app and create_app()
+take more than ``--max-ratio`` times as long as importing Flask and its
+extensions alone (timed alongside, so a slow or busy machine does not
+fail it), or import the ML or plotting stacks.
+"""
@@ -0,0 +1,235 @@
+import os
+import json
+import click
+
+from benchmarks import SyntheticData
+
+# Default locations, relative to the repository root
+DATA_FOLDER = os.path.join("benchmarks", "data")
+REPORT_FOLDER = os.path.join("benchmarks", "reports")
+
+size_option = click.option(
+    "--size",
+    "sizes",
+    multiple=True,
+    type=click.Choice(list(SyntheticData.SIZES)),
+    help="Dataset size (repeatable).",
+)
+
+
+@click.group()
+def cli():
+    """Benchmark the churn pipeline."""
+
+
+@cli.command()
+@size_option
+@click.option("--data-folder", default=DATA_FOLDER, show_default=True)
+@click.option("--seed", type=int, default=0, show_default=True)
+def generate(sizes, data_folder, seed):
+    """Generate synthetic telecom datasets (all sizes by default)."""
+    for size in sizes or SyntheticData.SIZES:
+        path = SyntheticData.ensure_dataset(data_folder, size, seed=seed)
+        click.echo(f"{size}: {path}")
+
+
+@cli.command()
+@size_option
+@click.option(
+    "--backend",
+    "backends",
+    multiple=True,
+    help="Model backend (repeatable). Default: random_forest.",
+)
+@click.option(
+    "--repeat", type=int, default=1, show_default=True, help="Runs per case; the best is kept."
+)
+@click.option("--n-jobs", type=int, default=None, help="CPUs used for training (default: all).")
+@click.option("--columnar", is_flag=True, help="Read a Parquet copy of the dataset.")
+@click.option("--data-folder", default=DATA_FOLDER, show_default=True)
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Report path.")
+def run(sizes, backends, repeat, n_jobs, columnar, data_folder, seed, output):
+    """Time every pipeline stage and write a JSON report (10k rows by default)."""
+    from app.middleware.ModelBackends import DEFAULT_BACKEND, get_backend
+    from benchmarks.Runner import run_suite
+
+    backends = backends or (DEFAULT_BACKEND,)
+    for backend in backends:
+        try:
+            get_backend(backend)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--backend")
+
+    def on_case(name, result):
+        click.echo(
+            f"{name}: {result['total_seconds']:.2f}s, "
+            f"peak RSS {result['peak_rss_mb']} MB, accuracy {result['accuracy']:.4f}",
+            err=True,
+        )
+
+    report = run_suite(
+        sizes or ("10k",),
+        backends,
+        data_folder,
+        repeat=repeat,
+        n_jobs=n_jobs,
+        columnar=columnar,
+        seed=seed,
+        on_case=on_case,
+    )
+
+    if output is None:
+        stamp = report["created_at"].replace(":", "").replace("-", "")[:15]
+        name = f"{stamp}_{report['commit'] or 'local'}.json"
+        output = os.path.join(REPORT_FOLDER, name)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    click.echo(f"Wrote {output}")
+
+
+@cli.command()
+@click.argument("baseline", type=click.Path(exists=True, dir_okay=False))
+@click.argument("current", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--time-tolerance",
+    type=float,
+    default=0.10,
+    show_default=True,
+    help="Allowed slowdown per stage (fraction).",
+)
+@click.option(
+    "--memory-tolerance",
+    type=float,
+    default=0.10,
+    show_default=True,
+    help="Allowed peak RSS growth (fraction).",
+)
+@click.option(
+    "--min-seconds",
+    type=float,
+    default=0.05,
+    show_default=True,
+    help="Stages faster than this are not judged.",
+)
+def compare(baseline, current, time_tolerance, memory_tolerance, min_seconds):
+    """Compare two reports; exit with status 1 on regressions."""
+    from benchmarks.Compare import compare as compare_reports, format_rows, regressions
+
+    with open(baseline, "r", encoding="utf-8") as f:
+        baseline_report = json.load(f)
+    with open(current, "r", encoding="utf-8") as f:
+        current_report = json.load(f)
+
+    try:
+        rows = compare_reports(
+            baseline_report,
+            current_report,
+            time_tolerance=time_tolerance,
+            memory_tolerance=memory_tolerance,
+            min_seconds=min_seconds,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(format_rows(rows))
+    failed = regressions(rows)
+    if failed:
+        click.echo(f"{len(failed)} regression(s)", err=True)
+        raise SystemExit(1)
+    click.echo("No regressions", err=True)
+
+
+@cli.command("db-load")
+@click.option(
+    "--profile",
+    "profiles",
+    multiple=True,
+    type=click.Choice(["tuned", "plain"]),
+    help="Engine profile (repeatable). Default: plain and tuned.",
+)
+@click.option("--workers", type=int, default=8, show_default=True, help="Writer processes.")
+@click.option("--writes", type=int, default=200, show_default=True, help="Saves per worker.")
+@click.option(
+    "--reads-per-write",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Status reads after every save.",
+)
+@click.option(
+    "--database-uri",
+    default=None,
+    help="Database to load (default: a temporary SQLite file per profile).",
+)
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Report path.")
+def db_load(profiles, workers, writes, reads_per_write, database_uri, output):
+    """Measure DataModel.save throughput under concurrent writer processes."""
+    from benchmarks.DbLoad import run_profiles
+
+    results = run_profiles(
+        profiles or ("plain", "tuned"),
+        database_uri=database_uri,
+        workers=workers,
+        writes=writes,
+        reads_per_write=reads_per_write,
+    )
+    for result in results:
+        latency = result["latency_ms"]
+        click.echo(
+            f"{result['profile']}: {result['writes_per_second']} writes/s, "
+            f"{result['saved']}/{result['writes']} saved, {result['errors']} failed, "
+            f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms"
+        )
+
+    if output is not None:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        click.echo(f"Wrote {output}")
+
+
+@cli.command()
+@click.option(
+    "--max-ratio",
+    type=float,
+    default=2.0,
+    show_default=True,
+    help="Largest allowed start-up time, relative to importing Flask and its "
+    "extensions alone on the same machine.",
+)
+@click.option(
+    "--budget",
+    type=float,
+    default=None,
+    help="Largest allowed start-up time (seconds); not checked by default, "
+    "as it depends on the machine.",
+)
+@click.option("--repeat", type=int, default=5, show_default=True, help="Fresh processes to time.")
+def startup(max_ratio, budget, repeat):
+    """Time importing the app and create_app(); exit with status 1 over budget."""
+    from benchmarks.Startup import measure_startup
+
+    result = measure_startup(repeat=repeat)
+    click.echo(
+        f"start-up {result['seconds']:.3f}s, {result['ratio']:.2f}x the framework "
+        f"imports ({result['baseline_seconds']:.3f}s, max {max_ratio:.2f}x), "
+        f"{result['modules']} modules loaded"
+    )
+    failed = False
+    if result["ratio"] > max_ratio:
+        click.echo("Start-up exceeds the budget relative to the framework imports", err=True)
+        failed = True
+    if budget is not None and result["seconds"] > budget:
+        click.echo(f"Start-up exceeds the budget of {budget:.3f}s", err=True)
+        failed = True
+    if result["heavy"]:
+        click.echo(f"Heavy modules imported at start-up: {', '.join(result['heavy'])}", err=True)
+        failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    cli()
@@ -11,8 +11,96 @@ class Config:
         'DATABASE_URI', 'sqlite:///ChurnPrediction.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # Debugging output
-    print(f"SQLALCHEMY_DATABASE_URI: {SQLALCHEMY_DATABASE_URI}")
+    # Database engine profile, see app/middleware/DatabaseEngine.py: "tuned"
+    # (SQLite in WAL mode with a busy timeout, a bounded and recycled pool
+    # with pre-ping elsewhere) or "plain" (SQLAlchemy defaults)
+    DB_ENGINE_PROFILE = os.getenv('DB_ENGINE_PROFILE', 'tuned')
+    # Milliseconds a SQLite connection waits for a lock before failing
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 15000))
+    # Connections per process: pool size, extra connections under bursts,
+    # seconds to wait for one and seconds after which one is replaced
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+
+    # Number of worker processes that run background jobs (e.g. churn training)
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+
+    # Where background jobs run: "local" gives each web process its own pool
+    # of JOB_WORKERS processes (for a single-process server, e.g. `python
+    # run.py`); "worker" leaves them to one `flask --app run jobs worker`
+    # process, which every web process hands them to through the jobs table
+    JOB_RUNNER = os.getenv('JOB_RUNNER', 'local')
+    # Web processes of the deployment (e.g. gunicorn workers); with the
+    # "local" runner each has a job pool, and they share the CPU cap below
+    WEB_PROCESSES = int(os.getenv('WEB_PROCESSES', 1))
+    # Seconds the job worker waits between looks for queued jobs
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1.0))
+    # Port of the job worker's own /metrics (the metrics of the jobs it
+    # runs); 0 disables it
+    JOB_WORKER_METRICS_PORT = int(os.getenv('JOB_WORKER_METRICS_PORT', 9101))
+
+    # CPUs all training/scoring jobs may use together; each job gets an even
+    # share (TRAINING_MAX_CPUS // JOB_WORKERS, further divided by
+    # WEB_PROCESSES with the "local" runner). 0 means all CPUs
+    TRAINING_MAX_CPUS = int(os.getenv('TRAINING_MAX_CPUS', 0))
+
+    # Largest accepted request (uploads are streamed to disk, never held in
+    # memory); larger ones get a 413
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_UPLOAD_BYTES', 10 * 1024**3))
+
+    # Resumable uploads: chunk size, and idle time after which an unfinished
+    # upload is discarded
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 8 * 1024**2))
+    UPLOAD_SESSION_MAX_AGE = int(os.getenv('UPLOAD_SESSION_MAX_AGE', 7 * 24 * 3600))
+
+    # Login CAPTCHAs: pre-rendered images kept per process, seconds one stays
+    # in the pool unserved, and seconds a served one can be answered
+    CAPTCHA_POOL_SIZE = int(os.getenv('CAPTCHA_POOL_SIZE', 64))
+    CAPTCHA_POOL_TTL = int(os.getenv('CAPTCHA_POOL_TTL', 600))
+    CAPTCHA_MAX_AGE = int(os.getenv('CAPTCHA_MAX_AGE', 300))
+
+    # Datasets listed per page by /api/data (and the most a client may ask for)
+    DATA_PAGE_SIZE = int(os.getenv('DATA_PAGE_SIZE', 100))
+    DATA_PAGE_MAX_SIZE = int(os.getenv('DATA_PAGE_MAX_SIZE', 500))
+
+    # Model registry: fitted model artifacts and their LRU eviction limits
+    MODEL_ARTIFACT_FOLDER = os.getenv('MODEL_ARTIFACT_FOLDER', 'model_artifacts')
+    MODEL_REGISTRY_MAX_ENTRIES = int(os.getenv('MODEL_REGISTRY_MAX_ENTRIES', 50))
+    MODEL_REGISTRY_MAX_BYTES = int(os.getenv('MODEL_REGISTRY_MAX_BYTES', 2 * 1024**3))
+
+    # Preprocessed feature matrices, memory-mapped by every worker that
+    # trains on the same data; least recently used ones are evicted past
+    # FEATURE_STORE_MAX_BYTES
+    FEATURE_STORE_FOLDER = os.getenv('FEATURE_STORE_FOLDER', 'feature_store')
+    FEATURE_STORE_MAX_BYTES = int(os.getenv('FEATURE_STORE_MAX_BYTES', 10 * 1024**3))
+
+    # Batch scoring: rows scored per chunk and where result files are written
+    SCORE_CHUNK_SIZE = int(os.getenv('SCORE_CHUNK_SIZE', 100_000))
+    SCORE_OUTPUT_FOLDER = os.getenv('SCORE_OUTPUT_FOLDER', 'score_results')
+
+    # Seconds a quick (sampled preview) churn fit should take, roughly
+    QUICK_TIME_BUDGET = float(os.getenv('QUICK_TIME_BUDGET', 5))
+
+    # Charts of churn runs, rendered on first request and cached on disk;
+    # browsers may cache them for CHART_CACHE_MAX_AGE seconds
+    CHART_CACHE_FOLDER = os.getenv('CHART_CACHE_FOLDER', 'chart_cache')
+    CHART_CACHE_MAX_AGE = int(os.getenv('CHART_CACHE_MAX_AGE', 7 * 24 * 3600))
+
+    # Results of churn runs (metrics, chart kinds, test-set predictions) by
+    # run id; the summaries of RESULT_CACHE_MAX_ENTRIES runs stay in memory
+    RESULT_STORE_FOLDER = os.getenv('RESULT_STORE_FOLDER', 'result_store')
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 256))
+    # Predictions returned per request by default (and the most a client may ask for)
+    RESULT_PAGE_SIZE = int(os.getenv('RESULT_PAGE_SIZE', 1000))
+    RESULT_PAGE_MAX_SIZE = int(os.getenv('RESULT_PAGE_MAX_SIZE', 100_000))
+
+    # Sampling profiler, run for requests with ?profile=1 (or an X-Profile: 1
+    # header) when enabled; collapsed stacks are written to PROFILE_FOLDER
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+    PROFILE_FOLDER = os.getenv('PROFILE_FOLDER', 'profiles')
+    PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
 
 
 Config = Config
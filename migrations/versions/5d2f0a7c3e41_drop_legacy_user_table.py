@@ -0,0 +1,30 @@
+"""Drop the legacy user table
+
+Databases created before migrations may hold an unused `user` table (name
+and email) from an earlier user model; the app only uses `users`. It is
+dropped where it exists.
+
+Revision ID: 5d2f0a7c3e41
+Revises: 8b8871af5f8e
+Create Date: 2026-10-18 22:20:41.518312
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2f0a7c3e41'
+down_revision = '8b8871af5f8e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'user' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table('user')
+
+
+def downgrade():
+    # No model uses the table, so it is not created again
+    pass
@@ -0,0 +1,87 @@
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+# config.Config reads the environment when it is first imported, so the
+# test locations are set before the app is
+_ROOT = tempfile.mkdtemp(prefix="churn-tests-")
+os.environ.update(
+    {
+        "DATABASE_URI": f"sqlite:///{os.path.join(_ROOT, 'test.db')}",
+        "MODEL_ARTIFACT_FOLDER": os.path.join(_ROOT, "model_artifacts"),
+        "FEATURE_STORE_FOLDER": os.path.join(_ROOT, "feature_store"),
+        "SCORE_OUTPUT_FOLDER": os.path.join(_ROOT, "score_results"),
+        "CHART_CACHE_FOLDER": os.path.join(_ROOT, "chart_cache"),
+        "RESULT_STORE_FOLDER": os.path.join(_ROOT, "result_store"),
+        "JOB_WORKERS": "1",
+    }
+)
+
+from app import create_app, db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app()
+    app.config.update(TESTING=True, UPLOAD_FOLDER=str(tmp_path / "uploads"))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    """A saved user; ``user.id`` is the one logged in by ``login``."""
+    from app.models.UserModel import UserModel
+
+    with app.app_context():
+        user = UserModel("owner@example.com", "password")
+        user.save()
+        return SimpleNamespace(id=user.id, email=user.email)
+
+
+@pytest.fixture
+def auth_client(client, user):
+    """Test client logged in as ``user``."""
+    with client.session_transaction() as session:
+        session["user_id"] = user.id
+    return client
+
+
+@pytest.fixture
+def dataset(app, user, tmp_path):
+    """A small churn CSV saved as a DataModel of ``user``."""
+    from app.models.DataModel import DataModel
+
+    path = tmp_path / "customers.csv"
+    lines = ["CustomerID,Tenure,MonthlyCharges,Contract,Churn"]
+    for i in range(200):
+        contract = ("Monthly", "Yearly")[i % 2]
+        churn = ("Yes", "No")[(i // 3) % 2]
+        lines.append(f"{i},{i % 48},{20 + i % 70}.5,{contract},{churn}")
+    path.write_text("\n".join(lines) + "\n")
+
+    with app.app_context():
+        data = DataModel(user.id, "customers.csv", str(path))
+        data.save()
+        return SimpleNamespace(id=data.id, user_id=user.id, file_path=str(path))
+
+
+@pytest.fixture
+def no_jobs(monkeypatch):
+    """Leave the jobs routes queue in the jobs table, without running them."""
+    from app import routes
+    from app.middleware.JobQueue import WorkerQueue
+
+    monkeypatch.setattr(routes, "get_job_queue", lambda: WorkerQueue())
@@ -0,0 +1,118 @@
+import io
+import hashlib
+
+import pytest
+
+CHUNK_SIZE = 1024
+CONTENT = b"".join(f"{i},{i % 7},row\n".encode() for i in range(600))
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def upload(app, auth_client):
+    app.config["UPLOAD_CHUNK_SIZE"] = CHUNK_SIZE
+    response = auth_client.post(
+        "/api/uploads", json={"fileName": "customers.csv", "size": len(CONTENT)}
+    )
+    assert response.status_code == 201
+    return response.json
+
+
+def chunk(index):
+    return CONTENT[index * CHUNK_SIZE : (index + 1) * CHUNK_SIZE]
+
+
+def put_chunk(client, upload, index, data, checksum=None):
+    return client.put(
+        f"/api/uploads/{upload['upload_id']}/chunks/{index}",
+        data=data,
+        headers={"X-Chunk-Checksum": checksum or sha256(data)},
+    )
+
+
+class UnreadableStream(io.BytesIO):
+    """Request body of ``size`` bytes that fails the test if anything reads it."""
+
+    def __init__(self, size):
+        super().__init__(bytes(size))
+
+    def read(self, *args):
+        raise AssertionError("The body of a rejected chunk was read")
+
+    readinto = readline = read1 = read
+
+
+def test_oversized_chunk_is_rejected_before_reading(auth_client, upload):
+    response = auth_client.put(
+        f"/api/uploads/{upload['upload_id']}/chunks/0",
+        input_stream=UnreadableStream(1024**2),
+        headers={"X-Chunk-Checksum": "0" * 64},
+    )
+    assert response.status_code == 413
+
+
+def test_short_chunk_is_rejected_before_reading(auth_client, upload):
+    response = auth_client.put(
+        f"/api/uploads/{upload['upload_id']}/chunks/0",
+        input_stream=UnreadableStream(10),
+        headers={"X-Chunk-Checksum": "0" * 64},
+    )
+    assert response.status_code == 400
+
+
+def test_corrupt_retry_keeps_the_verified_chunk(auth_client, upload):
+    assert put_chunk(auth_client, upload, 0, chunk(0)).status_code == 200
+
+    corrupt = b"x" * len(chunk(0))
+    response = put_chunk(auth_client, upload, 0, corrupt, checksum=sha256(chunk(0)))
+    assert response.status_code == 400
+    assert response.json == {"error": "Checksum mismatch for chunk 0"}
+
+    status = auth_client.get(f"/api/uploads/{upload['upload_id']}").json
+    assert 0 not in status["missing_chunks"]
+
+
+def test_chunks_in_any_order_assemble_the_file(app, auth_client, upload, no_jobs):
+    for index in reversed(range(upload["total_chunks"])):
+        assert put_chunk(auth_client, upload, index, chunk(index)).status_code == 200
+
+    response = auth_client.post(
+        f"/api/uploads/{upload['upload_id']}/finalize",
+        json={"checksum": sha256(CONTENT)},
+    )
+    assert response.status_code == 201
+    assert response.json["status"] == "finalized"
+
+    from app.models.DataModel import DataModel
+
+    with app.app_context():
+        data = DataModel.find_by_id(response.json["fileId"])
+    with open(data.file_path, "rb") as f:
+        assert f.read() == CONTENT
+
+
+def test_finalize_reports_missing_chunks(auth_client, upload):
+    put_chunk(auth_client, upload, 0, chunk(0))
+    response = auth_client.post(f"/api/uploads/{upload['upload_id']}/finalize")
+    assert response.status_code == 409
+    assert response.json["missing_chunks"] == list(range(1, upload["total_chunks"]))
+
+
+def test_finalize_checks_the_whole_file(auth_client, upload, no_jobs):
+    for index in range(upload["total_chunks"]):
+        put_chunk(auth_client, upload, index, chunk(index))
+    finalize_url = f"/api/uploads/{upload['upload_id']}/finalize"
+
+    response = auth_client.post(finalize_url, json={"checksum": sha256(b"other")})
+    assert response.status_code == 400
+    # The session stays open with every chunk, so finalizing can be retried
+    status = auth_client.get(f"/api/uploads/{upload['upload_id']}").json
+    assert status["status"] == "open" and status["missing_chunks"] == []
+
+    response = auth_client.post(finalize_url, json={"checksum": sha256(CONTENT)})
+    assert response.status_code == 201
+    # A retried finalize is harmless
+    assert auth_client.post(finalize_url).status_code == 200
@@ -0,0 +1,21 @@
+from app.middleware.CpuBudget import job_cpu_budget, resolve_n_jobs
+
+
+def test_worker_runner_splits_the_cap_between_its_jobs():
+    config = {"TRAINING_MAX_CPUS": 16, "JOB_WORKERS": 4, "JOB_RUNNER": "worker"}
+    assert job_cpu_budget({**config, "WEB_PROCESSES": 8}) == 4
+
+
+def test_local_runner_splits_the_cap_between_every_web_process():
+    config = {"TRAINING_MAX_CPUS": 16, "JOB_WORKERS": 2, "JOB_RUNNER": "local"}
+    assert job_cpu_budget({**config, "WEB_PROCESSES": 1}) == 8
+    assert job_cpu_budget({**config, "WEB_PROCESSES": 4}) == 2
+    # Never less than one CPU
+    assert job_cpu_budget({**config, "WEB_PROCESSES": 32}) == 1
+
+
+def test_resolve_n_jobs_clips_to_the_budget():
+    assert resolve_n_jobs(None, 4) == 4
+    assert resolve_n_jobs(-1, 4) == 4
+    assert resolve_n_jobs(2, 4) == 2
+    assert resolve_n_jobs(8, 4) == 4
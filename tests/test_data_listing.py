@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.DataModel import DataModel
+
+
+@pytest.fixture
+def add_data(app, user):
+    def add_data(name, user_id=user.id):
+        with app.app_context():
+            data = DataModel(user_id, name, f"/uploads/{name}")
+            data.save()
+            return data.id
+
+    return add_data
+
+
+@pytest.fixture
+def other_user(app):
+    from app.models.UserModel import UserModel
+
+    with app.app_context():
+        user = UserModel("other@example.com", "password")
+        user.save()
+        return user.id
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 1, 2, 3, 4, 5, 678000)
+    cursor = DataModel.encode_cursor(created_at, 42)
+    assert DataModel.decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "WzFd", "WyJ4IiwgMV0="])
+def test_malformed_cursor(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        DataModel.decode_cursor(cursor)
+
+
+def test_pages_cover_every_dataset_once(auth_client, add_data, other_user):
+    # Saved within the same second, so the pages are ordered by id on ties
+    ids = [add_data(f"data{i}.csv") for i in range(7)]
+    add_data("foreign.csv", user_id=other_user)
+
+    listed, pages, url = [], 0, "/api/data?limit=3"
+    while url:
+        response = auth_client.get(url)
+        assert response.status_code == 200
+        listed += [item["id"] for item in response.json]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/api/data?limit=3&cursor={cursor}" if cursor else None
+
+    assert pages == 3
+    assert listed == sorted(ids, reverse=True)
+
+
+def test_invalid_cursor_is_a_bad_request(auth_client, add_data):
+    add_data("data.csv")
+    response = auth_client.get("/api/data?cursor=garbage")
+    assert response.status_code == 400
+    assert response.json == {"error": "Invalid cursor"}
+
+
+def test_unchanged_listing_is_not_modified(auth_client, add_data):
+    add_data("data.csv")
+    first = auth_client.get("/api/data")
+    etag = first.headers["ETag"]
+
+    cached = auth_client.get("/api/data", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    add_data("more.csv")
+    changed = auth_client.get("/api/data", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json) == 2
+
+
+def test_change_within_the_same_second_is_modified(app, auth_client, add_data):
+    data_id = add_data("data.csv")
+    first = auth_client.get("/api/data")
+    etag = first.headers["ETag"]
+
+    # Renamed right away: updated_at, stored to the second, may not move
+    with app.app_context():
+        data = DataModel.find_by_id(data_id)
+        updated_at = data.updated_at
+        data.file_name = "renamed.csv"
+        data.updated_at = updated_at
+        data.save()
+
+    changed = auth_client.get("/api/data", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json[0]["fileName"] == "renamed.csv"
+
+
+def test_deleted_dataset_changes_the_listing(app, auth_client, add_data):
+    add_data("data.csv")
+    data_id = add_data("more.csv")
+    etag = auth_client.get("/api/data").headers["ETag"]
+
+    with app.app_context():
+        DataModel.find_by_id(data_id).delete()
+
+    changed = auth_client.get("/api/data", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert [row["fileName"] for row in changed.json] == ["data.csv"]
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.middleware.DataLoader import DataLoader, MultiPartLoader
+
+
+def write_csv(path, rows, missing_calls=()):
+    lines = ["CustomerID,Tenure,Calls,Charges,Contract,Note"]
+    for i in range(rows):
+        calls = "" if i in missing_calls else str(i % 9)
+        contract = ("Monthly", "Yearly", "TwoYear")[i % 3]
+        lines.append(f"{i},{i % 48},{calls},{20 + i % 70}.25,{contract},note {i}")
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    # Calls is missing in the third chunk only
+    return write_csv(tmp_path / "customers.csv", 1000, missing_calls={700})
+
+
+def test_load_gives_every_column_one_dtype(csv_path):
+    frame = DataLoader(csv_path, chunk_size=250, sample_rows=100).load()
+
+    assert frame["Tenure"].dtype == np.int32
+    assert frame["Calls"].dtype == "Int32"
+    assert frame["Charges"].dtype == np.float32
+    assert isinstance(frame["Contract"].dtype, pd.CategoricalDtype)
+
+    expected = pd.read_csv(csv_path)
+    assert len(frame) == len(expected)
+    assert frame["Calls"].isna().sum() == 1 and pd.isna(frame["Calls"][700])
+    np.testing.assert_array_equal(frame["Tenure"], expected["Tenure"])
+    np.testing.assert_allclose(frame["Charges"], expected["Charges"], rtol=1e-6)
+    assert list(frame["Contract"].astype(str)) == list(expected["Contract"])
+    assert list(frame["Note"]) == list(expected["Note"])
+
+
+def test_load_of_one_chunk_matches_a_chunked_load(csv_path):
+    whole = DataLoader(csv_path, sample_rows=100).load(columns=["Tenure", "Calls"])
+    chunked = DataLoader(csv_path, chunk_size=250, sample_rows=100).load(
+        columns=["Tenure", "Calls"]
+    )
+    assert dict(whole.dtypes) == dict(chunked.dtypes)
+    pd.testing.assert_frame_equal(whole, chunked)
+
+
+def test_load_keeps_text_in_a_column_the_sample_typed_numeric(tmp_path):
+    path = tmp_path / "messy.csv"
+    write_csv(path, 600)
+    # Tenure is numeric in the sample but not in the second chunk
+    lines = path.read_text().splitlines()
+    lines[500] = "499,unknown,1,20.25,Monthly,note 499"
+    path.write_text("\n".join(lines) + "\n")
+
+    frame = DataLoader(str(path), chunk_size=250, sample_rows=100).load()
+    assert len(frame) == 600
+    assert "unknown" in set(frame["Tenure"].astype(str))
+
+
+def write_accounts(path, accounts):
+    lines = ["AccountNo,Churn"] + [
+        f"{'' if account is None else account},{('Yes', 'No')[i % 2]}"
+        for i, account in enumerate(accounts)
+    ]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+# Above 2**24, where float32 rounds 100000001 to 100000000
+ACCOUNTS = [100000000, 100000001, None, 100000003]
+# Above 2**31, so the column needs 64 bits
+WIDE_ACCOUNTS = [2**40 + 1, None, 2**40 + 3]
+
+
+@pytest.mark.parametrize(
+    "accounts, dtype", [(ACCOUNTS, "Int32"), (WIDE_ACCOUNTS, "Int64")]
+)
+def test_integers_next_to_missing_values_load_exactly(tmp_path, accounts, dtype):
+    path = write_accounts(tmp_path / "accounts.csv", accounts)
+    loader = DataLoader(path, chunk_size=2, sample_rows=100)
+
+    frame = loader.load()
+    assert frame["AccountNo"].dtype == dtype
+    assert frame["AccountNo"].tolist() == [a if a else pd.NA for a in accounts]
+
+    # The columnar copy reads back the same
+    columnar_path = str(tmp_path / "accounts.parquet")
+    loader.to_columnar(columnar_path)
+    columnar = DataLoader(path, columnar_path=columnar_path).load()
+    pd.testing.assert_frame_equal(columnar, frame)
+
+
+def test_multi_part_load_keeps_large_integers_exact(tmp_path):
+    upload = DataLoader(
+        write_accounts(tmp_path / "upload.csv", [100000001, 100000002]), sample_rows=100
+    )
+    delta = DataLoader(write_accounts(tmp_path / "delta.csv", [None, 100000003]))
+    frame = MultiPartLoader([upload, delta]).load()
+
+    assert frame["AccountNo"].dtype == "Int32"
+    assert frame["AccountNo"].tolist() == [100000001, 100000002, pd.NA, 100000003]
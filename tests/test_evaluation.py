@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import average_precision_score, confusion_matrix, roc_auc_score
+
+from app.middleware.Evaluation import classification_report
+from app.middleware.TrainModel import ChurnModel
+
+
+@pytest.fixture
+def scored():
+    rng = np.random.default_rng(0)
+    y_true = rng.random(500) < 0.3
+    # Rounded, so many scores are tied
+    scores = np.round(np.clip(y_true * 0.3 + rng.random(500) * 0.7, 0, 1), 2)
+    return y_true, scores
+
+
+def test_ranking_metrics_match_sklearn(scored):
+    y_true, scores = scored
+    report = classification_report(y_true, scores)
+    assert report["rows"] == 500
+    assert report["positives"] == int(y_true.sum())
+    assert report["roc_auc"] == pytest.approx(roc_auc_score(y_true, scores))
+    assert report["pr_auc"] == pytest.approx(average_precision_score(y_true, scores))
+
+
+def test_threshold_metrics_match_a_rescan(scored):
+    y_true, scores = scored
+    report = classification_report(y_true, scores, thresholds=(0.25, 0.5, 0.75))
+    for row in report["thresholds"]:
+        predicted = scores >= row["threshold"]
+        assert row["precision"] == pytest.approx(y_true[predicted].mean())
+        assert row["recall"] == pytest.approx(predicted[y_true].mean())
+
+    tn, fp, fn, tp = confusion_matrix(y_true, scores >= 0.5).ravel()
+    assert report["confusion_matrix"] == {
+        "threshold": 0.5,
+        "true_negative": tn,
+        "false_positive": fp,
+        "false_negative": fn,
+        "true_positive": tp,
+    }
+
+
+def test_perfect_ranking_and_undefined_metrics():
+    report = classification_report([False, False, True, True], [0.1, 0.2, 0.8, 0.9])
+    assert report["roc_auc"] == 1.0
+    assert report["pr_auc"] == 1.0
+
+    # One class only: no ranking metrics, and no precision above every score
+    report = classification_report([False, False], [0.1, 0.2], thresholds=(0.5,))
+    assert report["roc_auc"] is None and report["pr_auc"] is None
+    assert report["thresholds"] == [
+        {"threshold": 0.5, "precision": None, "recall": None}
+    ]
+
+
+def test_cross_validation_preprocesses_every_fold_on_its_training_rows(monkeypatch):
+    from app.middleware.Preprocessor import Preprocessor
+
+    rng = np.random.default_rng(1)
+    frame = pd.DataFrame(
+        {
+            "Tenure": rng.integers(0, 48, 200).astype(float),
+            "Contract": rng.choice(["Monthly", "Yearly"], 200),
+            "Churn": rng.choice(["Yes", "No"], 200),
+        }
+    )
+    frame.loc[::7, "Tenure"] = np.nan
+    model = ChurnModel(frame, "Churn", backend="logistic_regression")
+    model.preprocess_data()
+
+    fitted = []
+    fit = Preprocessor.fit
+
+    def record_fit(self, rows):
+        fitted.append((set(rows.index), self))
+        return fit(self, rows)
+
+    monkeypatch.setattr(Preprocessor, "fit", record_fit)
+    report = model.cross_validate(folds=4)
+    assert report["folds"] == 4
+    assert report["rows"] == 200
+
+    # One fresh preprocessing per fold, which never saw its held-out rows
+    assert len(fitted) == 4
+    assert len({id(preprocessor) for _, preprocessor in fitted}) == 4
+    held_out = [set(frame.index) - rows for rows, _ in fitted]
+    assert sorted(len(rows) for rows in held_out) == [50, 50, 50, 50]
+    assert set().union(*held_out) == set(frame.index)
+    for rows, preprocessor in fitted:
+        assert preprocessor.fill_values["Tenure"] == pytest.approx(
+            frame.loc[sorted(rows), "Tenure"].mean()
+        )
+        assert preprocessor.scaler is not model.preprocessor.scaler
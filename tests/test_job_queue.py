@@ -0,0 +1,197 @@
+import os
+import time
+
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+
+from app.middleware.JobQueue import JobQueue
+
+
+class FakeJob:
+    def __init__(self, job_id):
+        self.id = job_id
+
+
+@pytest.fixture
+def queue(app):
+    queue = JobQueue(app)
+    yield queue
+    queue.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def test_submit_recovers_from_a_broken_pool(queue):
+    # A worker that dies takes the whole pool down with it
+    broken = queue.executor
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result(timeout=120)
+
+    # The next job gets a new pool instead of failing; run_job returns None
+    # for a job that is not in the database
+    future = queue.submit(FakeJob(12345))
+    assert queue.executor is not broken
+    assert future.result(timeout=120) is None
+
+
+def test_submit_runs_a_job_once(queue):
+    assert queue.submit(FakeJob(1)) is not None
+    assert queue.submit(FakeJob(1)) is None
+
+
+@pytest.fixture
+def make_job(app, dataset):
+    from app.models.JobModel import JobModel
+
+    def make_job(kind="convert", status="queued"):
+        with app.app_context():
+            job = JobModel(data_id=dataset.id, user_id=dataset.user_id, kind=kind)
+            job.status = status
+            job.save()
+            return job.id
+
+    return make_job
+
+
+def job_status(app, job_id):
+    from app.models.JobModel import JobModel
+
+    with app.app_context():
+        return JobModel.find_by_id(job_id).status
+
+
+def test_claim_is_exclusive(app, make_job):
+    from app.models.JobModel import JobModel
+
+    job_id = make_job()
+    with app.app_context():
+        assert JobModel.claim(job_id) is True
+        assert JobModel.claim(job_id) is False
+    assert job_status(app, job_id) == "running"
+
+
+def test_run_job_runs_a_job_only_once(app, make_job, monkeypatch):
+    from app.middleware import JobQueue as job_queue
+
+    calls = []
+    monkeypatch.setattr(job_queue, "_worker_app", app)
+    monkeypatch.setitem(
+        job_queue.JOB_HANDLERS, "convert", lambda job: calls.append(job.id) or {}
+    )
+
+    job_id = make_job()
+    job_queue.run_job(job_id)
+    # Handed to a second process, e.g. by another web worker
+    assert job_queue.run_job(job_id) is None
+    assert calls == [job_id]
+    assert job_status(app, job_id) == "completed"
+
+
+def test_run_job_logs_a_failed_job(app, make_job, monkeypatch, caplog):
+    from app.middleware import JobQueue as job_queue
+
+    def fail(job):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(job_queue, "_worker_app", app)
+    monkeypatch.setitem(job_queue.JOB_HANDLERS, "convert", fail)
+
+    job_id = make_job()
+    job_queue.run_job(job_id)
+    assert job_status(app, job_id) == "failed"
+    (record,) = [r for r in caplog.records if r.name == app.logger.name]
+    assert record.getMessage() == f"Job {job_id} (convert) failed"
+    assert record.exc_info[1].args == ("disk full",)
+
+
+def test_requeue_interrupted(app, make_job):
+    from app.models.JobModel import JobModel
+
+    running = make_job(status="running")
+    completed = make_job(status="completed")
+    with app.app_context():
+        assert JobModel.requeue_interrupted() == 1
+    assert job_status(app, running) == "queued"
+    assert job_status(app, completed) == "completed"
+
+
+def test_worker_runner_leaves_jobs_to_the_worker(app, make_job):
+    from app.middleware.JobQueue import WorkerQueue, get_job_queue
+    from app.models.JobModel import JobModel
+
+    app.config["JOB_RUNNER"] = "worker"
+    job_id = make_job()
+    with app.app_context():
+        queue = get_job_queue()
+        assert isinstance(queue, WorkerQueue)
+        queue.submit(JobModel.find_by_id(job_id))
+    assert job_status(app, job_id) == "queued"
+
+
+def test_run_worker_runs_queued_and_interrupted_jobs(app, make_job):
+    from app.middleware.JobQueue import run_worker
+
+    app.config["JOB_POLL_INTERVAL"] = 0.1
+    queued = make_job()
+    interrupted = make_job(status="running")
+    requeued = []
+
+    run_worker(app, drain=True, on_requeue=requeued.append)
+
+    assert requeued == [1]
+    assert job_status(app, queued) == "completed"
+    assert job_status(app, interrupted) == "completed"
+
+
+def wait_for_status(app, job_id, status, timeout=120):
+    deadline = time.monotonic() + timeout
+    while job_status(app, job_id) != status and time.monotonic() < deadline:
+        time.sleep(0.1)
+    return job_status(app, job_id)
+
+
+def test_local_runner_resumes_interrupted_jobs(app, client, make_job):
+    queued = make_job()
+    interrupted = make_job(status="running")
+
+    # The first request of a restarted web process starts its queue
+    client.get("/metrics")
+    queue = app.extensions["job_queue"]
+    try:
+        assert wait_for_status(app, queued, "completed") == "completed"
+        assert wait_for_status(app, interrupted, "completed") == "completed"
+    finally:
+        queue.executor.shutdown(wait=True)
+
+
+def test_local_runner_of_several_processes_leaves_running_jobs(app, make_job):
+    from app.middleware.JobQueue import get_job_queue
+
+    # Another web process may be running it
+    app.config["WEB_PROCESSES"] = 2
+    running = make_job(status="running")
+    with app.app_context():
+        get_job_queue()
+    assert job_status(app, running) == "running"
+
+
+def test_worker_serves_its_own_metrics():
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+
+    from app.middleware.Metrics import Metrics, serve_metrics
+
+    metrics = Metrics()
+    metrics.inc("churn_jobs_total", kind="train", status="done")
+    server = serve_metrics(0, host="127.0.0.1", metrics=metrics)
+    try:
+        url = f"http://127.0.0.1:{server.server_port}"
+        with urlopen(f"{url}/metrics", timeout=10) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            body = response.read().decode()
+        assert 'churn_jobs_total{kind="train",status="done"} 1' in body
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{url}/other", timeout=10)
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,120 @@
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.controllers.UploadController import FileProcessor
+from app.middleware.ModelRegistry import ModelRegistry
+from app.middleware.TrainModel import ChurnModel
+
+
+@pytest.fixture
+def registry(app, tmp_path):
+    return ModelRegistry(str(tmp_path / "artifacts"))
+
+
+def run_quick(dataset, registry):
+    processor = FileProcessor(
+        dataset.file_path,
+        "Churn",
+        registry=registry,
+        data_id=dataset.id,
+        mode="quick",
+    )
+    processor.run()
+    return processor
+
+
+def test_quick_hit_tests_on_the_rows_of_the_registered_sample(
+    app, dataset, registry, monkeypatch
+):
+    # The timed sample size differs between runs, as it does on a busy machine
+    sizes = iter([150, 120])
+    monkeypatch.setattr(ChurnModel, "quick_sample_rows", lambda self: next(sizes))
+
+    with app.app_context():
+        first = run_quick(dataset, registry)
+        second = run_quick(dataset, registry)
+
+        assert not first.cache_hit and second.cache_hit
+        assert second.registry_entry.get_hyperparams()["sample_rows"] == 150
+        assert second.churn_model.training_rows == first.churn_model.training_rows
+        assert np.array_equal(
+            np.asarray(second.churn_model.X_test), np.asarray(first.churn_model.X_test)
+        )
+        assert list(second.churn_model.y_test) == list(first.churn_model.y_test)
+        assert second.accuracy == first.accuracy
+
+
+@pytest.fixture
+def add_entry(app, registry):
+    """Register fake artifacts of ``size`` bytes, last used ``age`` minutes early."""
+    from app.models.RegistryModel import RegistryModel
+
+    def add_entry(key, size=10, age=0):
+        artifact_dir = os.path.join(registry.artifact_folder, key)
+        os.makedirs(artifact_dir)
+        with open(os.path.join(artifact_dir, "model.pkl"), "wb") as f:
+            f.write(bytes(size))
+        entry = RegistryModel(None, key, "hash", "Churn", {}, artifact_dir, size)
+        entry.last_used_at = datetime(2026, 1, 1) - timedelta(minutes=age)
+        entry.save()
+        return artifact_dir
+
+    return add_entry
+
+
+def registered_keys():
+    from app.models.RegistryModel import RegistryModel
+
+    return [entry.cache_key for entry in RegistryModel.least_recently_used()]
+
+
+def test_evict_removes_least_recently_used_over_the_entry_limit(
+    app, registry, add_entry
+):
+    registry.max_entries = 2
+    with app.app_context():
+        oldest = add_entry("a", age=3)
+        add_entry("b", age=2)
+        add_entry("c", age=1)
+        registry.evict()
+
+        assert registered_keys() == ["b", "c"]
+        assert not os.path.exists(oldest)
+
+
+def test_evict_removes_entries_over_the_size_limit(app, registry, add_entry):
+    registry.max_bytes = 250
+    with app.app_context():
+        add_entry("a", size=100, age=3)
+        add_entry("b", size=100, age=2)
+        add_entry("c", size=100, age=1)
+        registry.evict()
+        assert registered_keys() == ["b", "c"]
+
+        # The most recently used entry stays, however large it is
+        add_entry("d", size=1000)
+        registry.evict()
+        assert registered_keys() == ["d"]
+
+
+def test_lookup_keeps_an_entry_from_eviction(app, registry, add_entry):
+    registry.max_entries = 2
+    with app.app_context():
+        add_entry("a", age=2)
+        add_entry("b", age=1)
+        assert registry.lookup("a").hit_count == 1
+        add_entry("c", age=0)
+        registry.evict()
+        assert registered_keys() == ["c", "a"]
+
+
+def test_lookup_drops_an_entry_without_artifacts(app, registry, add_entry):
+    with app.app_context():
+        shutil.rmtree(add_entry("a"))
+
+        assert registry.lookup("a") is None
+        assert registered_keys() == []
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.middleware.Preprocessor import Preprocessor
+
+
+@pytest.fixture
+def frame():
+    rows = 12
+    return pd.DataFrame(
+        {
+            "CustomerID": [f"C{i:03d}" for i in range(rows)],
+            "RowNumber": np.arange(rows)[::-1],  # Unique, named like an ID
+            "Score": np.array([7, 3, 11, 5, 2, 9, 4, 12, 1, 8, 6, 10]),  # Unique
+            "Tenure": np.arange(rows) % 5,
+            "Charges": np.linspace(20.0, 80.0, rows),
+            "Senior": np.arange(rows) % 2 == 0,
+            "Contract": ["Monthly", "Yearly", None, "Monthly"] * 3,
+            "Comment": [f"free text {i}" for i in range(rows - 1)] + ["free text 0"],
+            "Churn": ["Yes", "No", "No"] * 4,
+        }
+    )
+
+
+def test_columns_are_typed_from_the_data(frame):
+    preprocessor = Preprocessor("Churn", max_categories=5).fit(frame)
+
+    assert preprocessor.id_columns == ["CustomerID", "RowNumber"]
+    assert preprocessor.numeric_columns == ["Score", "Tenure", "Charges", "Senior"]
+    assert preprocessor.categorical_columns == ["Contract"]
+    assert preprocessor.ignored_columns == ["Comment"]
+    assert preprocessor.target_classes == ["No", "Yes"]
+
+
+@pytest.mark.parametrize(
+    "values, name, expected",
+    [
+        (["a", "b", "c"], "Code", True),
+        ([3, 1, 2], "Score", False),
+        ([1, 2, 3], "Score", True),  # Increasing
+        ([3, 1, 2], "AccountNo", True),
+        ([1.5, 2.5, 3.5], "Id", False),  # Floats are measurements
+        (["a", "a", "b"], "Id", False),  # Repeated values
+        (["a"], "Id", False),  # A single value
+    ],
+)
+def test_is_id_like(values, name, expected):
+    values = pd.Series(values, name=name)
+    assert Preprocessor.is_id_like(values, values.nunique()) is expected
+
+
+def test_one_hot_layout_and_missing_categories(frame):
+    preprocessor = Preprocessor("Churn", max_categories=5, scale=False).fit(frame)
+    assert preprocessor.feature_names[-1] == "Contract_Yearly"
+    # Missing contracts are filled with the mode, Monthly
+    assert preprocessor.fill_values["Contract"] == "Monthly"
+
+    X = preprocessor.transform(frame).toarray()
+    np.testing.assert_array_equal(X[:4, -1], [0, 1, 0, 0])
+
+
+def test_codes_without_one_hot_mark_unknown_categories_missing(frame):
+    preprocessor = Preprocessor(
+        "Churn", one_hot=False, scale=False, fill_missing=False, max_categories=5
+    ).fit(frame)
+    assert preprocessor.categorical_mask[-1] is True
+
+    new_rows = frame.head(3).assign(Contract=["Yearly", "Weekly", None])
+    codes = preprocessor.transform(new_rows)[:, -1]
+    assert codes[0] == preprocessor.vocabularies["Contract"].index("Yearly")
+    assert np.isnan(codes[1:]).all()
+
+
+def test_partial_fit_merges_means_without_changing_the_layout(frame):
+    preprocessor = Preprocessor("Churn", max_categories=5).fit(frame.head(6))
+    layout = list(preprocessor.feature_names)
+    preprocessor.partial_fit(frame.tail(6))
+
+    assert preprocessor.feature_names == layout
+    assert preprocessor.n_rows == 12
+    assert preprocessor.fill_values["Charges"] == pytest.approx(frame["Charges"].mean())
+
+
+def test_update_keeps_the_features_of_the_rows_the_model_learned():
+    from app.middleware.TrainModel import ChurnModel
+
+    rng = np.random.default_rng(2)
+
+    def rows(n, charges):
+        frame = pd.DataFrame(
+            {
+                "Tenure": rng.integers(0, 48, n).astype(float),
+                "Charges": rng.normal(charges, 10.0, n),
+                "Contract": rng.choice(["Monthly", "Yearly"], n),
+                "Churn": rng.choice(["Yes", "No"], n),
+            }
+        )
+        frame.loc[::5, "Tenure"] = np.nan
+        return frame
+
+    original = rows(300, 50.0)
+    model = ChurnModel(original, "Churn", backend="logistic_regression")
+    model.preprocess_data()
+    model.train_model()
+    features = model.transform(original).toarray()
+    before = model.predict_proba(original)
+
+    # A delta whose values lie far from the original ones
+    model.data = rows(100, 150.0)
+    model.preprocess_update()
+    np.testing.assert_array_equal(model.transform(original).toarray(), features)
+    np.testing.assert_array_equal(model.predict_proba(original), before)
+
+    model.update_model()
+    np.testing.assert_array_equal(model.transform(original).toarray(), features)
+    assert model.preprocessor.n_rows == 400
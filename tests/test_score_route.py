@@ -0,0 +1,106 @@
+import pytest
+
+from app import db
+
+
+@pytest.fixture
+def model(app, dataset):
+    """A registry entry trained on ``dataset``."""
+    from app.models.RegistryModel import RegistryModel
+
+    with app.app_context():
+        entry = RegistryModel(
+            dataset.id, "0" * 64, "1" * 64, "Churn", {}, "/nonexistent", 0
+        )
+        db.session.add(entry)
+        db.session.commit()
+        return entry.id
+
+
+@pytest.mark.parametrize("chunk_size", ["abc", "1000", 1.5e3, 0, -5, True])
+def test_score_rejects_an_invalid_chunk_size(auth_client, dataset, model, chunk_size):
+    response = auth_client.post(
+        "/api/score",
+        json={"model_id": model, "file_id": dataset.id, "chunk_size": chunk_size},
+    )
+    assert response.status_code == 400
+    assert response.json == {"error": "chunk_size must be a positive integer"}
+
+
+def test_score_queues_a_job_with_a_valid_chunk_size(
+    app, auth_client, dataset, model, no_jobs
+):
+    from app.models.JobModel import JobModel
+
+    response = auth_client.post(
+        "/api/score",
+        json={"model_id": model, "file_id": dataset.id, "chunk_size": 500},
+    )
+    assert response.status_code == 202
+    with app.app_context():
+        job = JobModel.find_by_id(response.json["job_id"])
+        assert job.get_params() == {"model_id": model, "chunk_size": 500}
+
+
+def test_score_hides_other_users_models(app, client, dataset, model):
+    from app.models.DataModel import DataModel
+    from app.models.UserModel import UserModel
+
+    # Another user, scoring their own file with the owner's model
+    with app.app_context():
+        other = UserModel("other@example.com", "password")
+        other.save()
+        other_file = DataModel(other.id, "theirs.csv", dataset.file_path)
+        other_file.save()
+        other_id, other_file_id = other.id, other_file.id
+    with client.session_transaction() as session:
+        session["user_id"] = other_id
+
+    response = client.post(
+        "/api/score", json={"model_id": model, "file_id": other_file_id}
+    )
+    assert response.status_code == 404
+    assert response.json == {"error": "Model not found"}
+
+
+def test_score_accepts_the_owners_model(auth_client, dataset, model, no_jobs):
+    response = auth_client.post(
+        "/api/score", json={"model_id": model, "file_id": dataset.id}
+    )
+    assert response.status_code == 202
+
+
+def test_score_accepts_a_registry_hit_on_another_users_upload(
+    app, client, dataset, no_jobs, tmp_path
+):
+    from app.controllers.UploadController import FileProcessor
+    from app.middleware.ModelRegistry import ModelRegistry
+    from app.models.DataModel import DataModel
+    from app.models.UserModel import UserModel
+
+    registry = ModelRegistry(str(tmp_path / "artifacts"))
+    with app.app_context():
+        # The owner trains a model, then another user uploads the same file
+        # and trains on it: the registry serves the owner's model
+        first = FileProcessor(
+            dataset.file_path, "Churn", registry=registry, data_id=dataset.id
+        )
+        first.run()
+        other = UserModel("other@example.com", "password")
+        other.save()
+        other_file = DataModel(other.id, "same.csv", dataset.file_path)
+        other_file.save()
+        second = FileProcessor(
+            dataset.file_path, "Churn", registry=registry, data_id=other_file.id
+        )
+        result = second.run()
+        assert second.cache_hit
+        assert result["model_id"] == first.registry_entry.id
+        other_id, other_file_id = other.id, other_file.id
+
+    with client.session_transaction() as session:
+        session["user_id"] = other_id
+    response = client.post(
+        "/api/score", json={"model_id": result["model_id"], "file_id": other_file_id}
+    )
+    assert response.status_code == 202